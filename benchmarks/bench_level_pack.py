@@ -0,0 +1,79 @@
+"""
+Level loading benchmark.
+Packs the same level N times and measures, in a fresh process per pack,
+the time to open the pack and load one level and the resident memory it
+took, next to loading the level json.
+
+python -m benchmarks.bench_level_pack --counts 1 100 1000 10000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from src.game.level import Level, get_level_path
+from src.game.level_pack import LevelPack, write_pack
+
+
+def rss_kb():
+    with open("/proc/self/statm") as fp:
+        return int(fp.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+
+
+def measure(source):
+    """Runs in the child process, prints load time (ms) and RSS growth (kB)."""
+    before = rss_kb()
+    started = time.perf_counter()
+    if source.endswith(".json"):
+        with open(source) as fp:
+            payload = json.load(fp)
+        Level(1, payload)
+    else:
+        pack = LevelPack(source)
+        payload, digest = pack.read(len(pack) // 2 + 1)
+        Level(1, payload, digest)
+    elapsed = time.perf_counter() - started
+    print(f"{elapsed * 1000:.3f} {rss_kb() - before}")
+
+
+def run_child(source):
+    output = subprocess.run([sys.executable, "-m", "benchmarks.bench_level_pack",
+                             "--measure", source],
+                            capture_output=True, text=True, check=True).stdout
+    load_ms, rss = output.split()
+    return float(load_ms), int(rss)
+
+
+def run(level, counts):
+    with open(get_level_path(level)) as fp:
+        payload = json.load(fp)
+    load_ms, rss = run_child(get_level_path(level))
+    print(f"{'source':>14} {'file size':>12} {'load':>10} {'rss':>8}")
+    print(f"{'json':>14} {os.path.getsize(get_level_path(level)):>11}B "
+          f"{load_ms:8.3f}ms {rss:>6}kB")
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in counts:
+            path = os.path.join(tmp, f"{count}.pack")
+            write_pack(path, {number: payload for number in range(1, count + 1)})
+            load_ms, rss = run_child(path)
+            print(f"{f'pack x{count}':>14} {os.path.getsize(path):>11}B "
+                  f"{load_ms:8.3f}ms {rss:>6}kB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--level", type=int, default=1)
+    parser.add_argument("--counts", type=int, nargs="+", default=[1, 100, 1000, 10000])
+    parser.add_argument("--measure", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.measure:
+        measure(args.measure)
+    else:
+        run(args.level, args.counts)
+
+
+if __name__ == "__main__":
+    main()
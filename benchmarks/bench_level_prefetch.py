@@ -0,0 +1,171 @@
+"""
+Level prefetch benchmark.
+The game ships a single level, so clearing it only restarts it and the
+prefetch thread never runs. This plays a headless GameRun in a temporary
+copy of the game directory that has a second level (the first one with a
+shorter power up): it eats the dots the game will not reach, lets pacman
+clear level 1, checks that level 2 and its maze layers were prepared on the
+prefetch thread and that those layers match the ones the main thread draws.
+It prints the time spent on the thread and the main thread's stall at the
+level change next to preparing the level on the main thread.
+
+python -m benchmarks.bench_level_prefetch --runs 5
+"""
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import argparse
+import json
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+import pygame
+
+from src.configs import LEVEL_PREFETCH_DOTS
+from src.game.level import get_level_path
+from src.game.simulation import prepare_level
+from src.runner import GameRun
+
+# dots left when the prefetch starts, beyond those eaten before the clear
+SPARE_DOTS = 20
+MAX_TICKS = 20000
+
+
+def game_dir(tmp):
+    """A game directory with two levels and the repository's assets."""
+    with open(get_level_path(1)) as fp:
+        payload = json.load(fp)
+    os.makedirs(os.path.join(tmp, "levels"))
+    second = dict(payload, power_up_time=payload["power_up_time"] * 3 // 4)
+    for number, level in ((1, payload), (2, second)):
+        with open(os.path.join(tmp, get_level_path(number)), "w") as fp:
+            json.dump(level, fp)
+    os.symlink(os.path.abspath("assets"), os.path.join(tmp, "assets"))
+
+
+def wander(simulation, rng, dots):
+    """
+    Steps with a random direction every few ticks until `dots` collectibles
+    were eaten. Returns the inputs (tick -> direction) and the eaten cells.
+    """
+    inputs, eaten = {}, []
+    while len(eaten) < dots:
+        if simulation.tick >= MAX_TICKS:
+            raise RuntimeError(f"only {len(eaten)} dots eaten in {MAX_TICKS} ticks")
+        direction = rng.choice("lrud") if simulation.tick % 8 == 0 else None
+        if direction is not None:
+            inputs[simulation.tick + 1] = direction
+        simulation.step(direction)
+        eaten += [tuple(cell) for event, cell in simulation.events
+                  if event in ("dot", "power")]
+    return inputs, eaten
+
+
+def eat_all_but(collectibles, keep):
+    """Eats collectibles outside `keep` until only len(keep) are left to clear."""
+    for r in range(collectibles.num_rows):
+        for c in range(collectibles.num_cols):
+            if collectibles.remaining == len(keep):
+                return
+            if (r, c) not in keep:
+                collectibles.eat(r, c)
+
+
+def run_once(seed):
+    """Plays level 1 to its clear, returns the timings in ms."""
+    game = GameRun(seed=seed)
+    simulation, grid = game.simulation, game.gui.pacman
+    # where and on which thread the maze layers get drawn
+    drawn_on = []
+    render_layers = grid.render_layers
+
+    def traced_render_layers(level, collectibles):
+        start = time.perf_counter()
+        layers = render_layers(level, collectibles)
+        drawn_on.append((threading.current_thread().name, level.number,
+                         time.perf_counter() - start))
+        return layers
+    grid.render_layers = traced_render_layers
+    try:
+        start = simulation.snapshot()
+        inputs, eaten = wander(simulation, random.Random(seed),
+                               LEVEL_PREFETCH_DOTS + SPARE_DOTS)
+        simulation.restore(start)
+        eat_all_but(simulation.collectibles, set(eaten))
+        game.render_full(1.0)
+        stall = None
+        while simulation.level.number == 1:
+            if simulation.tick >= MAX_TICKS:
+                raise RuntimeError("level 1 was not cleared, did the ghosts change course?")
+            step_start = time.perf_counter()
+            simulation.step(inputs.get(simulation.tick + 1))
+            stall = time.perf_counter() - step_start
+            if simulation.level.number == 1:
+                game.render_full(1.0)
+        frame_start = time.perf_counter()
+        game.render_full(1.0)
+        sync = time.perf_counter() - frame_start
+
+        threads = {name for name, number, _ in drawn_on if number == 2}
+        if threads != {"level-prefetch_0"}:
+            raise RuntimeError(f"level 2 was drawn on {threads or 'no thread'}")
+        # the prefetched layer with the cells eaten since, drawn again here
+        _, maze_layer = render_layers(simulation.level, simulation.collectibles)
+        if pygame.image.tobytes(maze_layer, "RGB") != \
+                pygame.image.tobytes(grid._maze_layer, "RGB"):
+            raise RuntimeError("the prefetched maze differs from the main thread's")
+    finally:
+        simulation.close()
+    thread_draw = next(seconds for _, number, seconds in drawn_on if number == 2)
+    return {"thread_draw": thread_draw * 1000, "level_change_step": stall * 1000,
+            "first_frame": sync * 1000}
+
+
+def main_thread_cost(repeat):
+    """ms to prepare and draw level 2 without the prefetch thread."""
+    game = GameRun(seed=1)
+    grid = game.gui.pacman
+    times = []
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            prepare_level(2, (grid.render_layers,))
+            times.append((time.perf_counter() - start) * 1000)
+    finally:
+        game.simulation.close()
+    return statistics.median(times)
+
+
+def run(runs):
+    results = [run_once(seed) for seed in range(1, runs + 1)]
+    print(f"{runs} level clears, level 2 prepared on the prefetch thread every time")
+    for name in ("thread_draw", "level_change_step", "first_frame"):
+        values = [result[name] for result in results]
+        print(f"{name:>18} median {statistics.median(values):8.3f}ms "
+              f"max {max(values):8.3f}ms")
+    print(f"{'main thread':>18} median {main_thread_cost(runs):8.3f}ms "
+          f"(prepare_level and maze layers without the prefetch)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        game_dir(tmp)
+        cwd = os.getcwd()
+        # the game reads levels/ and assets/ relative to the working directory
+        os.chdir(tmp)
+        try:
+            run(args.runs)
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Path finding benchmark on generated mazes.
+Compares graph_utils.a_star with the list scanning implementation it
+replaced and times paths_to_many against one a_star call per target.
+
+python -m benchmarks.bench_pathfinding --sizes 100 200 400 --queries 20
+"""
+import argparse
+import heapq
+import random
+import time
+
+from src.utils.graph_utils import PathFinder, heuristic
+from src.utils.tile_grid import Tile, TileGrid
+
+
+def generate_maze(size, corridor, seed):
+    """
+    size x size grid of wall / void tiles, a randomised depth first
+    maze whose corridors and walls are `corridor` cells wide.
+    """
+    cells = max(1, (size // corridor - 1) // 2)
+    rng = random.Random(seed)
+    matrix = [['wall'] * size for _ in range(size)]
+
+    def carve(r, c):
+        top, left = (2 * r + 1) * corridor, (2 * c + 1) * corridor
+        for x in range(top, min(top + corridor, size)):
+            for y in range(left, min(left + corridor, size)):
+                matrix[x][y] = 'void'
+
+    visited = {(0, 0)}
+    stack = [(0, 0)]
+    carve(0, 0)
+    while stack:
+        r, c = stack[-1]
+        options = [(r + dr, c + dc) for dr, dc in ((-1, 0), (1, 0), (0, -1), (0, 1))
+                   if 0 <= r + dr < cells and 0 <= c + dc < cells
+                   and (r + dr, c + dc) not in visited]
+        if not options:
+            stack.pop()
+            continue
+        nr, nc = rng.choice(options)
+        # open the wall cell between both maze cells
+        wall_r, wall_c = r + nr, c + nc
+        top, left = (wall_r + 1) * corridor, (wall_c + 1) * corridor
+        for x in range(top, top + corridor):
+            for y in range(left, left + corridor):
+                matrix[x][y] = 'void'
+        carve(nr, nc)
+        visited.add((nr, nc))
+        stack.append((nr, nc))
+    # a few loops so there is more than one route
+    for _ in range(cells):
+        r, c = rng.randrange(1, size - corridor - 1), rng.randrange(1, size - corridor - 1)
+        for x in range(r, r + corridor):
+            for y in range(c, c + corridor):
+                matrix[x][y] = 'void'
+    return TileGrid.from_matrix(matrix)
+
+
+def legacy_a_star(matrix, start, target, subdivs=4):
+    """The previous implementation, kept for comparison only."""
+    rows, cols = len(matrix), len(matrix[0])
+
+    def is_valid(x, y):
+        if not (0 <= x < rows and 0 <= y < cols):
+            return False
+        for dx in range(subdivs*2):
+            for dy in range(subdivs*2):
+                if x + dx >= rows or y + dy >= cols or matrix[x + dx][y + dy] == Tile.WALL:
+                    return False
+        return True
+
+    def path_builder(current, came_from):
+        path = []
+        while current in came_from:
+            path.append(current)
+            current = came_from[current]
+        path.append(start)
+        return path[::-1]
+
+    directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+    open_set = [(0, start)]
+    came_from = {}
+    g_score = {start: 0}
+    closest_node, closest_distance = start, heuristic(start, target)
+    while open_set:
+        _, current = heapq.heappop(open_set)
+        if current == target:
+            return path_builder(current, came_from)
+        for dx, dy in directions:
+            neighbor = (current[0] + dx, current[1] + dy)
+            if is_valid(neighbor[0], neighbor[1]):
+                tentative_g_score = g_score[current] + 1
+                if neighbor not in g_score or tentative_g_score < g_score[neighbor]:
+                    came_from[neighbor] = current
+                    g_score[neighbor] = tentative_g_score
+                    if neighbor not in [pos for _, pos in open_set]:
+                        heapq.heappush(open_set, (tentative_g_score + heuristic(neighbor, target), neighbor))
+                h_dist = heuristic(neighbor, target)
+                if h_dist < closest_distance:
+                    closest_node, closest_distance = neighbor, h_dist
+    return path_builder(closest_node, came_from)
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+def run(sizes, queries, subdivs, legacy_limit, seed):
+    corridor = subdivs * 2
+    rng = random.Random(seed)
+    print(f"{'size':>6} {'clearance':>10} {'a_star':>10} {'legacy':>10} {'many':>10} {'singles':>10}")
+    for size in sizes:
+        matrix = generate_maze(size, corridor, seed)
+        finder, build_time = timed(PathFinder, matrix, subdivs)
+        free = [(r, c) for r in range(size) for c in range(size) if finder.is_valid((r, c))]
+        pairs = [(rng.choice(free), rng.choice(free)) for _ in range(queries)]
+
+        new_time = legacy_time = 0.0
+        for start, target in pairs:
+            path, elapsed = timed(finder.find, start, target)
+            new_time += elapsed
+            if size <= legacy_limit:
+                old_path, elapsed = timed(legacy_a_star, matrix, start, target, subdivs)
+                legacy_time += elapsed
+                if len(old_path) < len(path):
+                    raise AssertionError(f"longer path than before for {start} -> {target}")
+
+        start = pairs[0][0]
+        targets = [target for _, target in pairs]
+        many, many_time = timed(finder.paths_to_many, start, targets)
+        singles_time = 0.0
+        for target in targets:
+            path, elapsed = timed(finder.find, start, target)
+            singles_time += elapsed
+            if len(path) != len(many[target]):
+                raise AssertionError(f"paths_to_many disagrees with a_star for {target}")
+
+        legacy = f"{legacy_time * 1000 / queries:9.2f}ms" if size <= legacy_limit else f"{'-':>10}"
+        print(f"{size:>6} {build_time * 1000:9.2f}ms {new_time * 1000 / queries:9.2f}ms {legacy} "
+              f"{many_time * 1000:9.2f}ms {singles_time * 1000:9.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 200, 400])
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--subdivs", type=int, default=1)
+    parser.add_argument("--legacy-limit", type=int, default=200,
+                        help="largest maze the previous implementation is run on")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    run(args.sizes, args.queries, args.subdivs, args.legacy_limit, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Tile grid benchmark.
+Compares the list of lists of strings the level json holds with the
+TileGrid the game converts it to: memory footprint, the per tick cell
+checks pacman and the ghosts do, a full level scan and a level copy.
+
+python -m benchmarks.bench_tiles --level 1
+"""
+import argparse
+import copy
+import json
+import sys
+import timeit
+
+from src.game.level import get_level_path
+from src.utils.tile_grid import Tile, TileGrid, COLLECTIBLES
+
+
+def footprint(matrix):
+    """Bytes held by the containers, strings are shared so counted once."""
+    if isinstance(matrix, TileGrid):
+        return sys.getsizeof(matrix.data) + sys.getsizeof(matrix) + \
+            sum(sys.getsizeof(row) for row in matrix)
+    strings = {id(cell): sys.getsizeof(cell) for row in matrix for cell in row}
+    return sys.getsizeof(matrix) + sum(sys.getsizeof(row) for row in matrix) + \
+        sum(strings.values())
+
+
+def string_cases(matrix):
+    blockers = ['wall', 'elec']
+
+    def eat_check():
+        # what eating does every tick: read a cell, compare it to collectibles
+        return matrix[13][17] in ('dot', 'power')
+
+    def move_checks():
+        # the 8 cells get_is_move_valid reads for one ghost decision
+        return [matrix[13 + r][17 + c] in blockers
+                for r, c in ((-1, 0), (-1, 1), (0, -1), (1, -1), (2, 0), (2, 1), (0, 2), (1, 2))]
+
+    def scan():
+        return sum(cell in ('dot', 'power') for row in matrix for cell in row)
+
+    def level_copy():
+        return copy.deepcopy(matrix)
+
+    return eat_check, move_checks, scan, level_copy
+
+
+def tile_cases(grid):
+    blockers = frozenset((Tile.WALL, Tile.ELEC))
+
+    def eat_check():
+        return grid[13][17] in COLLECTIBLES
+
+    def move_checks():
+        return [grid[13 + r][17 + c] in blockers
+                for r, c in ((-1, 0), (-1, 1), (0, -1), (1, -1), (2, 0), (2, 1), (0, 2), (1, 2))]
+
+    def scan():
+        return grid.count_tiles(COLLECTIBLES)
+
+    def level_copy():
+        return grid.copy()
+
+    return eat_check, move_checks, scan, level_copy
+
+
+def run(level, number):
+    with open(get_level_path(level)) as fp:
+        matrix = json.load(fp)["matrix"]
+    grid = TileGrid.from_matrix(matrix)
+    convert = min(timeit.repeat(lambda: TileGrid.from_matrix(matrix), number=10, repeat=3)) / 10
+    print(f"{len(matrix)}x{len(matrix[0])} level {level}, conversion at load {convert * 1e6:.1f}us")
+    print(f"memory: strings {footprint(matrix)} bytes, tiles {footprint(grid)} bytes")
+    print(f"{'case':>12} {'strings':>12} {'tiles':>12}")
+    names = ("eat_check", "move_checks", "scan", "level_copy")
+    for name, old, new in zip(names, string_cases(matrix), tile_cases(grid)):
+        if old() != new() and name != "level_copy":
+            raise AssertionError(f"{name} disagrees between representations")
+        loops = number if name in ("eat_check", "move_checks") else max(1, number // 1000)
+        old_time = min(timeit.repeat(old, number=loops, repeat=3)) / loops
+        new_time = min(timeit.repeat(new, number=loops, repeat=3)) / loops
+        print(f"{name:>12} {old_time * 1e9:10.0f}ns {new_time * 1e9:10.0f}ns")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--level", type=int, default=1)
+    parser.add_argument("--number", type=int, default=200000)
+    args = parser.parse_args()
+    run(args.level, args.number)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+"""
+Benchmark suite of the game's hot functions and of full headless frames.
+Runs on machines without a display or sound card (SDL dummy drivers).
+Results are saved as JSON baselines, `compare` flags the cases that got
+slower than a baseline by more than a threshold and exits with 1.
+
+python -m benchmarks.suite run --save benchmarks/baselines/before.json
+python -m benchmarks.suite run --save after.json --compare benchmarks/baselines/before.json
+python -m benchmarks.suite compare benchmarks/baselines/before.json after.json --threshold 0.1
+"""
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+
+# name -> function building the callable to time, filled by @case
+CASES = {}
+
+
+def case(name):
+    def register(setup):
+        CASES[name] = setup
+        return setup
+    return register
+
+
+def new_simulation(seed=1):
+    from src.game.state_management import GameState
+    from src.game.simulation import Simulation
+    return Simulation(GameState(), seed, death_pause=0, level_clear_pause=0,
+                      respawn_pause=0)
+
+
+@case("get_direction")
+def bench_get_direction():
+    from src.game.level import Level
+    from src.utils.ghost_movement_utils import get_direction
+    matrix = Level.load(1).matrix
+    return lambda: get_direction((5, 1), (29, 31), matrix, (-1, 0))
+
+
+@case("navigation_get_direction")
+def bench_navigation_get_direction():
+    from src.game.level import Level
+    navigation = Level.load(1).navigation
+    return lambda: navigation.get_direction((5, 1), (29, 31), (-1, 0))
+
+
+@case("navigation_find_direction")
+def bench_navigation_find_direction():
+    from src.game.level import Level
+    navigation = Level.load(1).navigation
+    return lambda: navigation.find_direction((5, 1), (29, 31), (-1, 0))
+
+
+@case("get_is_intersection")
+def bench_get_is_intersection():
+    from src.game.level import Level
+    from src.utils.ghost_movement_utils import get_is_intersection
+    matrix = Level.load(1).matrix
+    return lambda: get_is_intersection((5, 1), matrix, "up")
+
+
+@case("a_star_100")
+def bench_a_star():
+    from benchmarks.bench_pathfinding import generate_maze
+    from src.utils.graph_utils import PathFinder
+    finder = PathFinder(generate_maze(100, 2, 0), 1)
+    free = [(r, c) for r in range(100) for c in range(100) if finder.is_valid((r, c))]
+    start, target = free[0], free[-1]
+    return lambda: finder.find(start, target)
+
+
+@case("tiny_wall_table")
+def bench_tiny_wall_table():
+    # get_tiny_matrix became the occupancy grid plus its summed area table
+    from src.configs import CELL_SIZE, PACMAN_SPEED
+    from src.game.level import Level
+    from src.utils.coord_utils import SummedAreaTable, get_tiny_occupancy
+    matrix = Level.load(1).matrix
+    return lambda: SummedAreaTable(get_tiny_occupancy(matrix, CELL_SIZE[0], PACMAN_SPEED))
+
+
+@case("get_movable_locations")
+def bench_get_movable_locations():
+    from src.game.level import Level
+    from src.utils.coord_utils import get_movable_locations
+    matrix = Level.load(1).matrix
+    return lambda: get_movable_locations(matrix, 40, 20)
+
+
+@case("precompute_matrix_coords")
+def bench_precompute_matrix_coords():
+    from src.utils.coord_utils import precompute_matrix_coords
+    return lambda: precompute_matrix_coords(290.0, 192.0, 4, 160, 175)
+
+
+@case("pacman_model_update")
+def bench_pacman_model_update():
+    simulation = new_simulation()
+    pacman = simulation.pacman
+    directions = "lurd"
+    state = {"tick": 0}
+
+    def update():
+        state["tick"] += 1
+        simulation.game_state.direction = directions[state["tick"] // 40 % 4]
+        pacman.update()
+    return update
+
+
+@case("ghost_model_update")
+def bench_ghost_model_update():
+    simulation = new_simulation()
+    # released ghosts do the whole decision and movement work
+    simulation.fast_forward(20000)
+    ghosts = simulation.ghosts
+
+    def update():
+        for ghost in ghosts:
+            ghost.update()
+    return update
+
+
+@case("simulation_step")
+def bench_simulation_step():
+    from src.headless import random_inputs
+    simulation = new_simulation()
+    inputs = random_inputs(10 ** 6, 1)
+    return lambda: simulation.step(inputs.get(simulation.tick + 1))
+
+
+@case("mcts_rollouts_x10")
+def bench_mcts_rollouts():
+    from src.ai.mcts import TreeSearch
+    simulation = new_simulation()
+    simulation.run(600, {1: "l"})
+    search = TreeSearch(simulation, seed=1)
+    return lambda: search.search(float("inf"), max_rollouts=10)
+
+
+@case("batch_step_x1024")
+def bench_batch_step():
+    from src.env.batch import BatchSimulation
+    batch = BatchSimulation(1024)
+    return batch.step
+
+
+def new_game(dirty_rendering):
+    from src.runner import GameRun
+    game = GameRun(dirty_rendering=dirty_rendering, seed=1)
+    game.game_state.direction = "l"
+    return game
+
+
+@case("draw_level")
+def bench_draw_level():
+    game = new_game(False)
+    return game.gui.pacman.draw_level
+
+
+@case("sprite_updates")
+def bench_sprite_updates():
+    game = new_game(False)
+    sprites = game.all_sprites
+
+    def update():
+        game.simulation.step()
+        sprites.update(0.5)
+    return update
+
+
+def frames(dirty_rendering, count):
+    import pygame
+    game = new_game(dirty_rendering)
+    render = game.render_dirty if dirty_rendering else game.render_full
+    tick_seconds = game.tick_seconds
+
+    def run_frames():
+        for _ in range(count):
+            pygame.event.pump()
+            _, alpha = game.step_simulation(tick_seconds)
+            render(alpha)
+    return run_frames
+
+
+@case("frames_full_x60")
+def bench_frames_full():
+    return frames(False, 60)
+
+
+@case("frames_dirty_x60")
+def bench_frames_dirty():
+    return frames(True, 60)
+
+
+def measure(func, repeat=5, min_time=0.05):
+    """Per call ns: calls are batched so one batch takes at least `min_time`."""
+    number = 1
+    while True:
+        start = time.perf_counter_ns()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter_ns() - start
+        if elapsed >= min_time * 1e9:
+            break
+        number *= 2 if elapsed * 10 > min_time * 1e9 else 10
+    timings = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter_ns()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter_ns() - start) / number)
+    return {"min_ns": min(timings), "median_ns": statistics.median(timings),
+            "number": number, "repeat": repeat}
+
+
+def run(names, repeat, min_time):
+    import pygame
+    results = {}
+    for name in names:
+        func = CASES[name]()
+        results[name] = measure(func, repeat, min_time)
+        print(f"{name:>26} {format_ns(results[name]['median_ns']):>12}")
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "platform": platform.platform(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def format_ns(value):
+    for unit, scale in (("s", 1e9), ("ms", 1e6), ("us", 1e3)):
+        if value >= scale:
+            return f"{value / scale:.2f}{unit}"
+    return f"{value:.0f}ns"
+
+
+def compare(baseline, current, threshold):
+    """Prints both medians per case, returns the names that regressed."""
+    regressions = []
+    print(f"{'case':>26} {'baseline':>12} {'current':>12} {'change':>9}")
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            print(f"{name:>26} {'-':>12} {format_ns(result['median_ns']):>12}")
+            continue
+        change = result["median_ns"] / before["median_ns"] - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:>26} {format_ns(before['median_ns']):>12} "
+              f"{format_ns(result['median_ns']):>12} {change:+8.1%}{flag}")
+    return regressions
+
+
+def load(path):
+    with open(path) as fp:
+        return json.load(fp)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("-k", "--filter", default="",
+                            help="only the cases whose name contains this")
+    run_parser.add_argument("--repeat", type=int, default=5)
+    run_parser.add_argument("--min-time", type=float, default=0.05,
+                            help="seconds a batch of calls takes at least")
+    run_parser.add_argument("--save", help="write the results to this json file")
+    run_parser.add_argument("--compare", help="baseline json to compare against")
+    run_parser.add_argument("--threshold", type=float, default=0.1)
+    run_parser.add_argument("--list", action="store_true", help="list the cases and exit")
+    compare_parser = commands.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.1,
+                                help="relative slowdown flagged as a regression")
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        regressions = compare(load(args.baseline), load(args.current), args.threshold)
+    else:
+        names = [name for name in CASES if args.filter in name]
+        if args.list:
+            print("\n".join(names))
+            return
+        results = run(names, args.repeat, args.min_time)
+        if args.save:
+            os.makedirs(os.path.dirname(args.save) or ".", exist_ok=True)
+            with open(args.save, "w") as fp:
+                json.dump(results, fp, indent=4)
+        regressions = []
+        if args.compare:
+            regressions = compare(load(args.compare), results, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,47 @@
-from src.runner import GameRun
+import argparse
+
+from src.configs import DIRTY_RENDERING, RENDER_FPS
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Py-Pacman")
+    parser.add_argument("--dirty-rects", action="store_true", default=DIRTY_RENDERING,
+                        help="redraw only the changed rects instead of the whole screen")
+    parser.add_argument("--headless", type=int, metavar="TICKS",
+                        help="simulate TICKS ticks without a window and exit")
+    parser.add_argument("--seed", type=int, help="seed of the ghosts' randomness")
+    parser.add_argument("--speed", type=float, default=1,
+                        help="game speed multiplier")
+    parser.add_argument("--record", metavar="PATH",
+                        help="save a replay of the session to PATH")
+    parser.add_argument("--replay", metavar="PATH",
+                        help="play the replay at PATH instead of a new game")
+    parser.add_argument("--autopilot", action="store_true",
+                        help="let the tree search autopilot play")
+    parser.add_argument("--autopilot-workers", type=int, metavar="N",
+                        help="processes the autopilot searches on, one per CPU "
+                             "by default, 0 searches in the game's process")
+    parser.add_argument("--render-fps", type=int, default=RENDER_FPS,
+                        help="frames drawn per second, 0 for uncapped")
+    parser.add_argument("--profile", action="store_true",
+                        help="record frame timings and show them on screen (F3 toggles)")
+    parser.add_argument("--profile-out", metavar="PATH",
+                        help="write the recorded timings on exit, .csv or Chrome trace .json")
+    return parser.parse_args()
 
 if __name__=='__main__':
-    gr = GameRun()
-    gr.main()
\ No newline at end of file
+    args = parse_args()
+    if args.headless:
+        from src.headless import run_headless
+        run_headless(args.headless, args.seed, record=args.record)
+    else:
+        from src.runner import GameRun
+        from src.game.replay import Replay
+        replay = Replay.load(args.replay) if args.replay else None
+        gr = GameRun(dirty_rendering=args.dirty_rects, seed=args.seed,
+                     speed=args.speed, render_fps=args.render_fps,
+                     profile=args.profile or bool(args.profile_out),
+                     profile_out=args.profile_out,
+                     replay=replay, record=args.record,
+                     autopilot=args.autopilot,
+                     autopilot_workers=args.autopilot_workers)
+        gr.main()
@@ -0,0 +1,218 @@
+"""
+Autopilot: plays pacman with Monte Carlo tree search (src.ai.mcts).
+It takes the place of the keyboard: take_direction() is called once per tick
+like EventHandler's and returns the direction to press, if any. Every
+DECISION_TICKS ticks it searches for `budget_ms` and presses the best move.
+
+The search runs on worker processes. Each worker keeps its own copy of the
+game in sync by stepping the same inputs (the simulation is deterministic,
+see src.game.replay) and searches it with its own rollout seed, the visits
+of each first move are then summed over the workers (root parallel MCTS).
+Only the inputs since the last move and the tick to search from go through
+the pipes. With `workers=0` the search runs in this process.
+
+python -m src.ai.autopilot --ticks 36000 --workers 4 --budget 15
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import time
+import traceback
+
+from src.ai.mcts import DECISION_TICKS, TreeSearch
+from src.configs import AUTOPILOT_BUDGET_MS
+from src.game.replay import Recorder, Replay
+from src.game.simulation import Simulation
+from src.game.state_management import GameState
+from src.log_handle import get_logger
+logger = get_logger(__name__)
+
+
+def search_simulation(replay):
+    """
+    A copy of the game to search. Restores would send it back before the
+    prefetch over and over, so the next level is only prepared on a clear,
+    and its rollouts stay out of the game's profile.
+    """
+    return replay.create_simulation(prefetch_dots=None, profile=False)
+
+
+def _worker(conn, replay, seed, search_kwargs):
+    simulation = None
+    try:
+        simulation = search_simulation(replay)
+        search = TreeSearch(simulation, seed, **search_kwargs)
+        conn.send(None)
+        while True:
+            command = conn.recv()
+            if command is None:
+                break
+            inputs, tick, deadline_seconds = command
+            search.advance(inputs, tick)
+            conn.send(search.search(time.perf_counter() + deadline_seconds))
+    except (KeyboardInterrupt, EOFError):
+        pass
+    except Exception:
+        conn.send(traceback.format_exc())
+    finally:
+        if simulation is not None:
+            simulation.close()
+        conn.close()
+
+
+class Autopilot:
+    def __init__(self, simulation: Simulation, workers: int | None = None,
+                 budget_ms: float = AUTOPILOT_BUDGET_MS, seed: int | None = None,
+                 start_method: str | None = None, **search_kwargs):
+        """
+        `simulation` is the game to play, from its first tick. `workers`
+        defaults to one per CPU, `search_kwargs` go to TreeSearch (depth,
+        exploration).
+        """
+        if simulation.tick != 0:
+            raise ValueError("the autopilot has to start with the game")
+        self.simulation = simulation
+        self.budget = budget_ms / 1000
+        self.decision_ticks = search_kwargs.get("decision_ticks", DECISION_TICKS)
+        replay = Replay.for_simulation(simulation)
+        seeds = random.Random(seed)
+        # inputs the searches have not stepped yet
+        self._inputs = {}
+        self._connections = []
+        self._processes = []
+        self._search = None
+        self.closed = False
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if workers == 0:
+            self._search = TreeSearch(search_simulation(replay), seeds.getrandbits(32),
+                                      **search_kwargs)
+        else:
+            context = multiprocessing.get_context(start_method)
+            for _ in range(workers):
+                conn, worker_conn = context.Pipe()
+                process = context.Process(target=_worker, daemon=True,
+                                          args=(worker_conn, replay, seeds.getrandbits(32),
+                                                search_kwargs))
+                process.start()
+                worker_conn.close()
+                self._connections.append(conn)
+                self._processes.append(process)
+            self._wait()
+        self.moves = 0
+        self.rollouts = 0
+        self.search_seconds = 0.0
+
+    @property
+    def rollouts_per_second(self):
+        return self.rollouts / self.search_seconds if self.search_seconds else 0.0
+
+    def _receive(self, conn):
+        try:
+            return conn.recv()
+        except EOFError:
+            return "worker exited"
+
+    def _wait(self):
+        results = [self._receive(conn) for conn in self._connections]
+        errors = [result for result in results if isinstance(result, str)]
+        if errors:
+            self.close()
+            raise RuntimeError(f"autopilot worker failed:\n{errors[0]}")
+        return results
+
+    def search(self):
+        """The [({action: (visits, value)}, rollouts)] of every searcher."""
+        tick = self.simulation.tick
+        if self._search is not None:
+            self._search.advance(self._inputs, tick)
+            results = [self._search.search(time.perf_counter() + self.budget)]
+        else:
+            for conn in self._connections:
+                conn.send((self._inputs, tick, self.budget))
+            results = self._wait()
+        self._inputs = {}
+        return results
+
+    def decide(self):
+        """Searches the current tick, returns the most visited move."""
+        start = time.perf_counter()
+        totals = {}
+        for stats, rollouts in self.search():
+            self.rollouts += rollouts
+            for action, (visits, value) in stats.items():
+                total_visits, total_value = totals.get(action, (0, 0.0))
+                totals[action] = total_visits + visits, total_value + value
+        self.search_seconds += time.perf_counter() - start
+        self.moves += 1
+        if not totals:
+            return None
+        return max(totals, key=totals.get)
+
+    def take_direction(self):
+        """The direction of the next tick, like EventHandler.take_direction."""
+        simulation = self.simulation
+        if simulation.tick % self.decision_ticks or simulation.game_state.phase != "playing":
+            return None
+        direction = self.decide()
+        if direction is not None:
+            self._inputs[simulation.tick + 1] = direction
+        return direction
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self._search is not None:
+            self._search.simulation.close()
+        for conn, process in zip(self._connections, self._processes):
+            if process.is_alive():
+                try:
+                    conn.send(None)
+                except (BrokenPipeError, OSError):
+                    pass
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+            conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Let the autopilot play headless")
+    parser.add_argument("--ticks", type=int, default=36000)
+    parser.add_argument("--seed", type=int, help="seed of the game")
+    parser.add_argument("--workers", type=int, help="search processes, 0 searches in this one")
+    parser.add_argument("--budget", type=float, default=AUTOPILOT_BUDGET_MS,
+                        help="search time per move, in ms")
+    parser.add_argument("--record", metavar="PATH", help="save a replay of the game")
+    args = parser.parse_args()
+    game_state = GameState()
+    simulation = Simulation(game_state, args.seed)
+    recorder = Recorder(simulation) if args.record else None
+    deaths = 0
+    start = time.perf_counter()
+    try:
+        with Autopilot(simulation, args.workers, args.budget) as autopilot:
+            for _ in range(args.ticks):
+                simulation.step(autopilot.take_direction())
+                deaths += any(event == "death" for event, _ in simulation.events)
+    finally:
+        simulation.close()
+        if recorder is not None:
+            recorder.save(args.record)
+    logger.info("%s ticks in %.1f s, points: %s, deaths: %s", args.ticks,
+                time.perf_counter() - start, game_state.points, deaths)
+    logger.info("%s moves, %.0f rollouts/s, %.1f rollouts per move", autopilot.moves,
+                autopilot.rollouts_per_second, autopilot.rollouts / max(autopilot.moves, 1))
+
+
+if __name__ == "__main__":
+    main()
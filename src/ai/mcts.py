@@ -0,0 +1,121 @@
+"""
+Monte Carlo tree search with the simulation as its forward model.
+A move presses a direction and lets the game run for DECISION_TICKS ticks,
+the time pacman takes to cross a cell. The ghosts move by their own rules
+(determine_target and the rng) since the search plays the real Simulation:
+each iteration restores the root snapshot, walks down the tree with UCB1,
+adds one move and plays random moves up to `depth` moves deep.
+A path is worth the points scored along it, dying costs DEATH_PENALTY and
+ends it.
+"""
+import math
+import random
+import time
+
+from src.configs import AUTOPILOT_DEPTH, CELL_SIZE, PACMAN_SPEED
+from src.game.simulation import Simulation
+
+ACTIONS = ("l", "r", "u", "d")
+DECISION_TICKS = CELL_SIZE[0] // PACMAN_SPEED
+DEATH_PENALTY = 500
+# points per unit of value, keeps the exploration term in proportion
+REWARD_SCALE = 100
+EXPLORATION = 1.0
+
+
+class Node:
+    __slots__ = ("children", "visits", "value")
+
+    def __init__(self):
+        self.children = {}
+        self.visits = 0
+        self.value = 0.0
+
+    def select(self, exploration: float):
+        """The (action, child) with the best UCB1 score."""
+        log_visits = math.log(self.visits)
+
+        def score(item):
+            child = item[1]
+            return child.value / child.visits + \
+                exploration * math.sqrt(log_visits / child.visits)
+        return max(self.children.items(), key=score)
+
+
+class TreeSearch:
+    def __init__(self, simulation: Simulation, seed: int | None = None,
+                 depth: int = AUTOPILOT_DEPTH, decision_ticks: int = DECISION_TICKS,
+                 exploration: float = EXPLORATION):
+        """Searches `simulation`, which it steps and restores at will."""
+        self.simulation = simulation
+        self.rng = random.Random(seed)
+        self.depth = depth
+        self.decision_ticks = decision_ticks
+        self.exploration = exploration
+
+    def advance(self, inputs: dict, tick: int):
+        """Steps the game to `tick` with the inputs (tick -> direction) of the ticks."""
+        simulation = self.simulation
+        while simulation.tick < tick:
+            simulation.step(inputs.get(simulation.tick + 1))
+
+    def play(self, direction: str):
+        """Plays one move, returns its value and whether it ended the path."""
+        simulation = self.simulation
+        game_state = simulation.game_state
+        points = game_state.points
+        simulation.step(direction)
+        for _ in range(self.decision_ticks - 1):
+            if game_state.is_pacman_dead or game_state.level_complete:
+                break
+            simulation.step()
+        if game_state.is_pacman_dead:
+            return (game_state.points - points - DEATH_PENALTY) / REWARD_SCALE, True
+        return (game_state.points - points) / REWARD_SCALE, game_state.level_complete
+
+    def search(self, deadline: float, max_rollouts: int | None = None):
+        """
+        Searches until `deadline` (time.perf_counter) or `max_rollouts`
+        rollouts, at least once.
+        Returns ({action: (visits, value)} of the root moves, rollouts) and
+        leaves the game as it found it.
+        """
+        simulation = self.simulation
+        rng = self.rng
+        root = Node()
+        if simulation.game_state.phase != "playing":
+            return {}, 0
+        start = simulation.snapshot()
+        rollouts = 0
+        while not rollouts or (time.perf_counter() < deadline and
+                               rollouts != max_rollouts):
+            simulation.restore(start)
+            node = root
+            path = [root]
+            value, ended, depth = 0.0, False, 0
+            while not ended and depth < self.depth and len(node.children) == len(ACTIONS):
+                action, node = node.select(self.exploration)
+                reward, ended = self.play(action)
+                value += reward
+                depth += 1
+                path.append(node)
+            if not ended and depth < self.depth:
+                action = rng.choice([action for action in ACTIONS
+                                     if action not in node.children])
+                child = node.children[action] = Node()
+                node = child
+                reward, ended = self.play(action)
+                value += reward
+                depth += 1
+                path.append(node)
+            while not ended and depth < self.depth:
+                reward, ended = self.play(rng.choice(ACTIONS))
+                value += reward
+                depth += 1
+            for node in path:
+                node.visits += 1
+                node.value += value
+            rollouts += 1
+        simulation.restore(start)
+        return {action: (child.visits, child.value)
+                for action, child in root.children.items()}, rollouts
@@ -20,12 +20,34 @@ PACMAN_SPEED = 4
 GHOST_SPEED_FAST = 5
 GHOST_SPEED_SLOW = 2
 GHOST_NORMAL_DELAY = 5000
+# pauses of the game phases, in ms of simulation time
+DEATH_PAUSE = 1000
+LEVEL_CLEAR_PAUSE = 2000
+RESPAWN_PAUSE = 0
+# remaining dots at which the next level starts loading in the background
+LEVEL_PREFETCH_DOTS = 30
+# frames per second next to the scores
+HUD_SHOW_FPS = True
+# redraw only the changed rects instead of flipping the whole screen
+DIRTY_RENDERING = False
+# the simulation always ticks at GameState.fps, the screen is redrawn at
+# RENDER_FPS (0 for uncapped) with positions interpolated between ticks
+RENDER_FPS = 60
+# longest frame (in seconds) the simulation catches up on
+MAX_FRAME_TIME = 0.25
+# time the autopilot searches for each of its moves, in ms of real time
+AUTOPILOT_BUDGET_MS = 15
+# moves the autopilot looks ahead, a move lasts the ticks pacman takes to cross a cell
+AUTOPILOT_DEPTH = 12
 
 DOT_POINT = 10
 POWER_POINT = 15
 GHOST_POINT = 25
 LEVEL_COMP_POINT = 80
 
+# ghost decisions remembered per level, see NavigationIndex.get_direction
+GHOST_DECISION_CACHE_SIZE = 4096
+
 GHOST_DELAYS = {
     "inky": 12000,
     "pinky": 8000,
@@ -46,4 +68,8 @@ GHOST_SCATTER_TARGETS = {
     "inky": (31, 0),
     "clyde": (31, 30)
 }
-loading_screen_gif = "assets/other/loading.gif"
\ No newline at end of file
+loading_screen_gif = "assets/other/loading.gif"
+# compiled levels, see src.game.level_pack. Recompile after editing a level json
+LEVEL_PACK = "levels/levels.pack"
+# generated per level data (distance tables) keyed by level digest
+DISTANCE_CACHE_DIR = "levels/.cache"
\ No newline at end of file
@@ -0,0 +1,617 @@
+"""
+Batch simulation.
+BatchSimulation steps B games of one level in lockstep. The state of every
+game lives in NumPy arrays, one row per game (and one column per ghost),
+so a tick costs a fixed number of array operations whatever B is.
+It follows Simulation, PacmanModel and GhostModel step by step: the same
+timers, targets and float arithmetic, and one random.Random per game drawn
+in the same order, so game i of a batch seeded with seeds[i] plays exactly
+like Simulation(GameState(), seeds[i]) fed the same inputs
+(python -m src.env.parity checks it).
+Games stay on their level, clearing it restarts it like Simulation does
+after the last level.
+
+    batch = BatchSimulation(4096)
+    batch.step(actions)  # per game: -1 keeps the input, else DIRECTION_CODES
+    batch.rewards, batch.pacman_x, batch.ghost_x, batch.dots ...
+"""
+import random
+
+import numpy as np
+
+from src.configs import (CELL_SIZE, PACMAN, PACMAN_SPEED, GHOSTS, GHOST_DELAYS,
+                         GHOST_SCATTER_TARGETS, GHOST_POINT, DOT_POINT, POWER_POINT,
+                         DEATH_PAUSE, LEVEL_CLEAR_PAUSE, RESPAWN_PAUSE)
+from src.game.collectibles import CollectibleSet
+from src.game.ghost_model import GHOST_MODELS
+from src.game.level import Level
+from src.utils.navigation_utils import DIRECTIONS, DIRECTION_DELTAS, POPCOUNT
+from src.utils.tile_grid import Tile
+
+# pacman inputs, as GameState.direction letters
+DIRECTION_CODES = {"": 0, "l": 1, "r": 2, "u": 3, "d": 4}
+DIRECTION_NAMES = {code: name for name, code in DIRECTION_CODES.items()}
+KEEP = -1
+PHASES = ("playing", "dying", "level_clear", "respawn")
+PLAYING, DYING, LEVEL_CLEAR, RESPAWN = range(4)
+GHOST_MODES = ("scatter", "chase")
+SCATTER, CHASE = range(2)
+GHOST_NAMES = [name for name, _ in GHOST_MODELS]
+# what pacman ate on the last tick
+NOTHING, DOT, POWER = range(3)
+
+# pacman moves by input code: rect x, rect y, tiny row, tiny column
+PACMAN_DX = np.array([0, -PACMAN_SPEED, PACMAN_SPEED, 0, 0])
+PACMAN_DY = np.array([0, 0, 0, -PACMAN_SPEED, PACMAN_SPEED])
+PACMAN_DROW = np.array([0, 0, 0, -1, 1])
+PACMAN_DCOL = np.array([0, -1, 1, 0, 0])
+# ghost directions are indexes into navigation_utils.DIRECTIONS, -1 for None
+GHOST_DELTAS = np.array([DIRECTION_DELTAS[name] for name in DIRECTIONS])
+DELTA_CODES = {delta: code for code, delta in enumerate(map(tuple, GHOST_DELTAS.tolist()))}
+_POPCOUNT = np.array(POPCOUNT, np.uint8)
+_FAR = np.iinfo(np.int64).max
+
+# phase timer callbacks
+_RESPAWN, _NEXT_LEVEL, _RESUME = 1, 2, 3
+
+
+def round_coords(values):
+    """round_coord over an array."""
+    rounded = np.floor(np.abs(values) + 0.5)
+    return np.where(values >= 0, rounded, -rounded).astype(np.int64)
+
+
+class BatchSimulation:
+    def __init__(self, batch_size: int, level_number: int = 1, seeds=None,
+                 fps: int = 60,
+                 death_pause: int = DEATH_PAUSE,
+                 level_clear_pause: int = LEVEL_CLEAR_PAUSE,
+                 respawn_pause: int = RESPAWN_PAUSE):
+        seeds = list(range(batch_size) if seeds is None else seeds)
+        if len(seeds) != batch_size:
+            raise ValueError(f"expected {batch_size} seeds, got {len(seeds)}")
+        self.batch_size = batch_size
+        self.seeds = seeds
+        self.rngs = [random.Random(seed) for seed in seeds]
+        self.death_pause = death_pause
+        self.level_clear_pause = level_clear_pause
+        self.respawn_pause = respawn_pause
+        self.tick = 0
+        self.tick_ms = 1000 / fps
+        self.level = Level.load(level_number)
+        self.compile_level()
+        self.allocate()
+        games = np.arange(batch_size)
+        self.build_entities(games)
+        self.schedule_mode_change(games)
+
+    @property
+    def now(self):
+        """Simulation time in ms, the same for every game."""
+        return int(self.tick * self.tick_ms)
+
+    def compile_level(self):
+        """Lookup tables of the level, shared by every game."""
+        level = self.level
+        matrix = level.matrix
+        self.num_rows, self.num_cols = level.num_rows, level.num_cols
+        self.start_x, self.start_y = level.start_pos
+        self.tiles = np.frombuffer(bytes(matrix.data), np.uint8).reshape(
+            self.num_rows, self.num_cols)
+        collectibles = CollectibleSet(matrix)
+        self.initial_dots = np.frombuffer(bytes(collectibles.bits), np.uint8)
+        self.initial_remaining = collectibles.remaining
+        self._eaten_kind = np.where(self.tiles.ravel() == Tile.POWER, POWER, DOT)
+        self.mode_events = np.array(level.scatter_times, np.int64)
+        self.scared_time = level.power_up_time
+
+        navigation = level.navigation
+        self.navigation = navigation
+        self._moves = np.frombuffer(bytes(navigation.moves), np.uint8)
+        self._compiled = np.array([navigation.is_compiled((r, c))
+                                   for r in range(self.num_rows)
+                                   for c in range(self.num_cols)])
+
+        # pacman_walls strips of the four moves from every tiny cell,
+        # the checks PacmanModel.movement_bind and move_pacman make
+        walls = level.pacman_walls
+        subdiv = CELL_SIZE[0] // PACMAN_SPEED
+        size = subdiv * 2
+        self.subdiv = subdiv
+        self.tiny_rows, self.tiny_cols = walls.num_rows, walls.num_cols
+        strips = {1: (0, -1, size, 1), 2: (0, size, size, 1),
+                  3: (-1, 0, 1, size), 4: (size, 0, 1, size)}
+        self._clear = np.zeros((5, self.tiny_rows, self.tiny_cols), bool)
+        for code, (dr, dc, height, width) in strips.items():
+            for r in range(self.tiny_rows):
+                for c in range(self.tiny_cols):
+                    try:
+                        self._clear[code, r, c] = walls.is_strip_clear(r + dr, c + dc,
+                                                                       height, width)
+                    except IndexError:
+                        pass
+        self.wrap_left_x = self.start_x
+        self.wrap_right_x = self.start_x + (self.tiny_cols - size - 4) * PACMAN_SPEED
+        pacman_r, pacman_c = level.pacman_start
+        self.pacman_start = self.coords(np.array(pacman_r), np.array(pacman_c))
+        self.pacman_tiny_start = (pacman_r * subdiv, pacman_c * subdiv)
+
+        den_r, den_c = level.ghost_den
+        den_cols = den_c + np.arange(len(GHOST_NAMES))
+        self.den_coords = self.coords(np.full(len(GHOST_NAMES), den_r), den_cols)
+        self.release_coords = self.coords(np.full(len(GHOST_NAMES), 11), den_cols)
+        self.ghost_delays = np.array([GHOST_DELAYS[name] for name in GHOST_NAMES])
+
+    def allocate(self):
+        size = self.batch_size
+        ghosts = (size, len(GHOST_NAMES))
+        # game state
+        self.input_direction = np.zeros(size, np.int8)
+        self.pacman_direction = np.zeros(size, np.int8)
+        self.phase = np.zeros(size, np.int8)
+        self.phase_due = np.full(size, -1, np.int64)
+        self._phase_callback = np.zeros(size, np.int8)
+        self.ghost_mode = np.zeros(size, np.int8)
+        self.mode_due = np.full(size, -1, np.int64)
+        self._mode_index = np.zeros(size, np.int64)
+        self.powered = np.zeros(size, bool)
+        self.power_due = np.full(size, -1, np.int64)
+        self.power_trigger_time = np.full(size, -1, np.int64)
+        self.points = np.full(size, -DOT_POINT, np.int64)
+        self.level_complete = np.zeros(size, bool)
+        self.dead = np.zeros(size, bool)
+        # GameState.pacman_rect and blinky_matrix_pos, what the ghosts target
+        self.pacman_rect_x = np.zeros(size)
+        self.pacman_rect_y = np.zeros(size)
+        self.blinky_row = np.zeros(size, np.int64)
+        self.blinky_col = np.zeros(size, np.int64)
+        # CollectibleSet.bits of every game
+        self.dots = np.tile(self.initial_dots, (size, 1))
+        self.remaining = np.full(size, self.initial_remaining, np.int64)
+        # pacman
+        self.pacman_x = np.zeros(size)
+        self.pacman_y = np.zeros(size)
+        self.pacman_tiny_row = np.zeros(size, np.int64)
+        self.pacman_tiny_col = np.zeros(size, np.int64)
+        self.move_direction = np.zeros(size, np.int8)
+        # ghosts, in GHOST_NAMES order
+        self.ghost_x = np.zeros(ghosts)
+        self.ghost_y = np.zeros(ghosts)
+        self.ghost_box_x = np.zeros(ghosts, np.int64)
+        self.ghost_box_y = np.zeros(ghosts, np.int64)
+        self.released = np.zeros(ghosts, bool)
+        self.release_due = np.full(ghosts, -1, np.int64)
+        self.release_time = np.full(ghosts, -1, np.int64)
+        self.dead_wait = np.zeros(ghosts, np.int64)
+        self.ghost_t = np.zeros(ghosts)
+        self.ghost_direction = np.full(ghosts, -1, np.int8)
+        self.has_target = np.zeros(ghosts, bool)
+        self.has_next = np.zeros(ghosts, bool)
+        self.next_row = np.zeros(ghosts, np.int64)
+        self.next_col = np.zeros(ghosts, np.int64)
+        self.prev_row = np.zeros(ghosts, np.int64)
+        self.prev_col = np.zeros(ghosts, np.int64)
+        self.scared = np.zeros(ghosts, bool)
+        self.blue = np.zeros(ghosts, bool)
+        self.has_curr = np.zeros(ghosts, bool)
+        self.curr_row = np.zeros(ghosts, np.int64)
+        self.curr_col = np.zeros(ghosts, np.int64)
+        # events of the last step
+        self.ate = np.zeros(size, np.int8)
+        self.died = np.zeros(size, bool)
+        self.ghosts_eaten = np.zeros(size, np.int8)
+        self.rewards = np.zeros(size, np.int64)
+
+    def coords(self, rows, cols):
+        """get_coords_from_idx over arrays."""
+        rows = np.where(rows < 0, rows + self.num_rows, rows)
+        cols = np.where(cols < 0, cols + self.num_cols, cols)
+        return self.start_x + cols * CELL_SIZE[0], self.start_y + rows * CELL_SIZE[1]
+
+    def cells(self, x, y):
+        """get_idx_from_coords over arrays, (rows, cols)."""
+        rows = np.floor_divide(y - self.start_y, CELL_SIZE[0]).astype(np.int64)
+        cols = np.floor_divide(x - self.start_x, CELL_SIZE[0]).astype(np.int64)
+        return rows, cols
+
+    # navigation, cells outside the compiled tables go through
+    # NavigationIndex one by one so they behave exactly the same
+
+    def _nav_index(self, rows, cols):
+        valid = (rows >= 0) & (rows < self.num_rows) & (cols >= 0) & (cols < self.num_cols)
+        idx = np.where(valid, rows * self.num_cols + cols, 0)
+        return idx, valid & self._compiled[idx]
+
+    def get_direction(self, rows, cols, target_rows, target_cols, prev):
+        """NavigationIndex.get_direction over arrays of direction codes."""
+        idx, valid = self._nav_index(rows, cols)
+        moves = self._moves[idx]
+        distances = np.empty((len(rows), len(DIRECTIONS)), np.int64)
+        for code, (dr, dc) in enumerate(GHOST_DELTAS):
+            next_rows, next_cols = rows + dr, cols + dc
+            allowed = ((moves >> code) & 1).astype(bool) & (prev != code) & \
+                (next_rows >= 0) & (next_rows < self.num_rows)
+            distances[:, code] = np.where(
+                allowed, (next_rows - target_rows) ** 2 + (next_cols - target_cols) ** 2, _FAR)
+        codes = distances.argmin(axis=1).astype(np.int8)
+        stuck = valid & (distances.min(axis=1) == _FAR)
+        if stuck.any():
+            i = np.flatnonzero(stuck)[0]
+            raise ValueError(f"ghost at {(int(rows[i]), int(cols[i]))} can not move")
+        for i in np.flatnonzero(~valid):
+            prev_delta = tuple(GHOST_DELTAS[prev[i]]) if prev[i] >= 0 else None
+            delta = self.navigation.get_direction((int(rows[i]), int(cols[i])),
+                                                  (int(target_rows[i]), int(target_cols[i])),
+                                                  prev_delta)
+            codes[i] = DELTA_CODES[delta]
+        return codes
+
+    def is_intersection(self, rows, cols, prev):
+        idx, valid = self._nav_index(rows, cols)
+        excluded = np.where(prev >= 0, 1 << np.maximum(prev, 0), 0).astype(np.uint8)
+        result = _POPCOUNT[self._moves[idx] & ~excluded] > 1
+        for i in np.flatnonzero(~valid):
+            result[i] = self.navigation.is_intersection(
+                (int(rows[i]), int(cols[i])), DIRECTIONS[prev[i]] if prev[i] >= 0 else None)
+        return result
+
+    def can_move(self, rows, cols, directions):
+        idx, valid = self._nav_index(rows, cols)
+        result = ((self._moves[idx] >> directions) & 1).astype(bool)
+        for i in np.flatnonzero(~valid):
+            result[i] = self.navigation.can_move((int(rows[i]), int(cols[i])),
+                                                 DIRECTIONS[directions[i]])
+        return result
+
+    # entities
+
+    def build_entities(self, games):
+        """A new pacman and new ghosts, like Simulation.build_entities."""
+        x, y = self.pacman_start
+        self.pacman_x[games] = x
+        self.pacman_y[games] = y
+        self.pacman_tiny_row[games], self.pacman_tiny_col[games] = self.pacman_tiny_start
+        self.move_direction[games] = self.input_direction[games]
+        for ghost in range(len(GHOST_NAMES)):
+            self.dead_wait[games, ghost] = self.ghost_delays[ghost]
+            self.blue[games, ghost] = False
+            self.has_curr[games, ghost] = False
+            self.reset_ghosts(ghost, games)
+
+    def reset_ghosts(self, ghost, games):
+        """GhostModel.reset_ghost: back to the den, released again later."""
+        if not len(games):
+            return
+        self.ghost_t[games, ghost] = 0
+        self.ghost_direction[games, ghost] = -1
+        self.has_target[games, ghost] = False
+        self.has_next[games, ghost] = False
+        self.release_time[games, ghost] = -1
+        self.scared[games, ghost] = False
+        x, y = self.den_coords[0][ghost], self.den_coords[1][ghost]
+        self.ghost_box_x[games, ghost] = round_coords(np.array(x))
+        self.ghost_box_y[games, ghost] = round_coords(np.array(y))
+        self.ghost_x[games, ghost] = x
+        self.ghost_y[games, ghost] = y
+        self.released[games, ghost] = False
+        self.release_due[games, ghost] = self.now + self.dead_wait[games, ghost] + 1
+
+    def release(self, ghost, games):
+        self.released[games, ghost] = True
+        self.dead_wait[games, ghost] = 1500
+        self.ghost_x[games, ghost] = self.release_coords[0][ghost]
+        self.ghost_y[games, ghost] = self.release_coords[1][ghost]
+        self.release_time[games, ghost] = self.now
+        self.release_due[games, ghost] = -1
+
+    # timers, fired in an order that ends in the same state as the
+    # scheduler's: the phase callbacks replace the ghosts last
+
+    def schedule_mode_change(self, games):
+        # GameState.next_mode_change: the next scatter time, the last one forever
+        index = self._mode_index[games]
+        events = len(self.mode_events)
+        self.mode_due[games] = self.now + self.mode_events[np.minimum(index, events - 1)] * 1000
+        self._mode_index[games] = np.where(index < events, index + 1, index)
+
+    def start_phase(self, games, phase, duration, callback):
+        self.phase[games] = phase
+        self.phase_due[games] = self.now + duration
+        self._phase_callback[games] = callback
+
+    def start_level_clear(self, games):
+        self.start_phase(games, LEVEL_CLEAR, self.level_clear_pause, _NEXT_LEVEL)
+
+    def respawn(self, games):
+        self.dead[games] = False
+        self.input_direction[games] = 0
+        self.pacman_direction[games] = 0
+        self.build_entities(games)
+        cleared = self.level_complete[games]
+        self.start_level_clear(games[cleared])
+        self.start_phase(games[~cleared], RESPAWN, self.respawn_pause, _RESUME)
+
+    def next_level(self, games):
+        self.dots[games] = self.initial_dots
+        self.remaining[games] = self.initial_remaining
+        self.build_entities(games)
+        self.level_complete[games] = False
+        self.start_phase(games, RESPAWN, self.respawn_pause, _RESUME)
+
+    def advance_timers(self):
+        now = self.now
+        games = np.flatnonzero(self.mode_due <= now)
+        if len(games):
+            self.ghost_mode[games] ^= 1
+            self.schedule_mode_change(games)
+        games = np.flatnonzero((self.power_due >= 0) & (self.power_due <= now))
+        self.powered[games] = False
+        self.power_due[games] = -1
+        for ghost in range(len(GHOST_NAMES)):
+            due = self.release_due[:, ghost]
+            games = np.flatnonzero((due >= 0) & (due <= now))
+            if len(games):
+                self.release(ghost, games)
+        callbacks = {_RESPAWN: self.respawn, _NEXT_LEVEL: self.next_level,
+                     _RESUME: self.resume}
+        while True:
+            games = np.flatnonzero((self.phase_due >= 0) & (self.phase_due <= now))
+            if not len(games):
+                break
+            fired = self._phase_callback[games]
+            self.phase_due[games] = -1
+            for callback, handler in callbacks.items():
+                selected = games[fired == callback]
+                if len(selected):
+                    handler(selected)
+
+    def resume(self, games):
+        self.phase[games] = PLAYING
+
+    def power_up(self, games):
+        self.powered[games] = True
+        self.power_trigger_time[games] = self.now
+        self.power_due[games] = self.now + self.scared_time
+
+    def check_phase(self, games):
+        dead = self.dead[games]
+        self.start_phase(games[dead], DYING, self.death_pause, _RESPAWN)
+        self.start_level_clear(games[~dead & self.level_complete[games]])
+
+    # pacman
+
+    def update_pacman(self, games):
+        """PacmanModel.update, returns what each game ate."""
+        x, y = self.pacman_x[games], self.pacman_y[games]
+        box_x = round_coords(x + (CELL_SIZE[0] * 2 - PACMAN[0]) // 2)
+        box_y = round_coords(y + (CELL_SIZE[1] * 2 - PACMAN[1]) // 2)
+        rows, cols = self.pacman_tiny_row[games], self.pacman_tiny_col[games]
+        pressed = self.input_direction[games]
+        bound = self._clear[pressed, rows, cols]
+        move = np.where(bound, pressed, self.move_direction[games])
+        self.move_direction[games] = move
+        self.pacman_direction[games] = np.where(bound, pressed, self.pacman_direction[games])
+        step = np.where(self._clear[move, rows, cols], move, 0)
+        x = x + PACMAN_DX[step]
+        y = y + PACMAN_DY[step]
+        rows = rows + PACMAN_DROW[step]
+        cols = cols + PACMAN_DCOL[step]
+        self.pacman_rect_x[games] = x
+        self.pacman_rect_y[games] = y
+
+        right = cols + self.subdiv * 2 >= self.tiny_cols - 1
+        left = ~right & (cols - 1 < 0)
+        cols = np.where(right, 0, np.where(left, self.tiny_cols - self.subdiv * 3, cols))
+        x = np.where(right, self.wrap_left_x, np.where(left, self.wrap_right_x, x))
+        self.pacman_x[games] = x
+        self.pacman_y[games] = y
+        self.pacman_tiny_row[games] = rows
+        self.pacman_tiny_col[games] = cols
+
+        # eaten with the box of the position pacman had before moving
+        r, c = self.cells(box_x, box_y)
+        r = np.where(r < 0, r + self.num_rows, r)
+        c = np.where(c < 0, c + self.num_cols, c)
+        idx = r * self.num_cols + c
+        byte, mask = idx >> 3, (1 << (idx & 7)).astype(np.uint8)
+        present = (self.dots[games, byte] & mask) != 0
+        eaters = games[present]
+        self.dots[eaters, byte[present]] &= ~mask[present]
+        self.remaining[eaters] -= 1
+        self.level_complete[games] |= self.remaining[games] == 0
+        return np.where(present, self._eaten_kind[idx], NOTHING).astype(np.int8)
+
+    # ghosts
+
+    def ahead_of_pacman(self, rows, cols, directions, look_ahead):
+        """GhostModel.get_target_pacman_dir over arrays."""
+        left, right = cols - look_ahead, cols + look_ahead
+        left = np.where(left < 0, self.num_cols - look_ahead - 1, left)
+        right = np.where(right > self.num_cols, 0, right)
+        target_cols = np.select([directions == 1, directions == 2], [left, right], cols)
+        target_rows = np.select([directions == 3, directions == 4],
+                                [rows - look_ahead, rows + look_ahead], rows)
+        return target_rows, target_cols
+
+    def targets(self, ghost, games):
+        """Targets of determine_target, or random ones for scared ghosts."""
+        name = GHOST_NAMES[ghost]
+        scatter_row, scatter_col = GHOST_SCATTER_TARGETS[name]
+        rows = np.full(len(games), scatter_row, np.int64)
+        cols = np.full(len(games), scatter_col, np.int64)
+        scared = self.scared[games, ghost]
+        randoms = scared.copy()
+        chase = ~scared & (self.ghost_mode[games] == CHASE)
+        if chase.any():
+            pacman_rows, pacman_cols = self.cells(self.pacman_rect_x[games],
+                                                  self.pacman_rect_y[games])
+            directions = self.pacman_direction[games]
+            if name == "pinky":
+                chase_rows, chase_cols = self.ahead_of_pacman(pacman_rows, pacman_cols,
+                                                              directions, 4)
+            elif name == "inky":
+                ahead_rows, ahead_cols = self.ahead_of_pacman(pacman_rows, pacman_cols,
+                                                              directions, 2)
+                blinky_rows, blinky_cols = self.blinky_row[games], self.blinky_col[games]
+                chase_rows = blinky_rows + (ahead_rows - blinky_rows) * 2
+                chase_cols = blinky_cols + (ahead_cols - blinky_cols) * 2
+            else:
+                chase_rows, chase_cols = pacman_rows, pacman_cols
+                if name == "clyde":
+                    distance = np.abs(pacman_rows - self.curr_row[games, ghost]) + \
+                        np.abs(pacman_cols - self.curr_col[games, ghost])
+                    randoms |= chase & self.has_curr[games, ghost] & (distance > 8)
+            rows = np.where(chase, chase_rows, rows)
+            cols = np.where(chase, chase_cols, cols)
+        for i in np.flatnonzero(randoms):
+            rng = self.rngs[games[i]]
+            rows[i] = rng.randrange(0, self.num_rows)
+            cols[i] = rng.randrange(0, self.num_cols)
+        return rows, cols
+
+    def prepare_movement(self, ghost, games):
+        """GhostModel.prepare_movement: picks the next tile towards the target."""
+        if not len(games):
+            return
+        rows, cols = self.cells(self.ghost_x[games, ghost], self.ghost_y[games, ghost])
+        has_next = self.has_next[games, ghost]
+        rows = np.where(has_next, self.next_row[games, ghost], rows)
+        cols = np.where(has_next, self.next_col[games, ghost], cols)
+        target_rows, target_cols = self.targets(ghost, games)
+        direction = self.ghost_direction[games, ghost]
+        prev = np.where(direction >= 0, (direction + 2) % 4, -1)
+        codes = self.get_direction(rows, cols, target_rows, target_cols, prev)
+        self.ghost_direction[games, ghost] = codes
+        self.has_target[games, ghost] = True
+        self.ghost_t[games, ghost] = 0
+        self.next_row[games, ghost] = rows + GHOST_DELTAS[codes, 0]
+        self.next_col[games, ghost] = cols + GHOST_DELTAS[codes, 1]
+        self.has_next[games, ghost] = True
+        self.prev_row[games, ghost] = rows
+        self.prev_col[games, ghost] = cols
+
+    def move_ghosts(self, ghost, games):
+        """GhostModel.move_ghost for released ghosts."""
+        if not len(games):
+            return
+        self.prepare_movement(ghost, games[~self.has_target[games, ghost]])
+        source_x, source_y = self.coords(self.prev_row[games, ghost], self.prev_col[games, ghost])
+        dest_x, dest_y = self.coords(self.next_row[games, ghost], self.next_col[games, ghost])
+        t = self.ghost_t[games, ghost]
+        done = t == 1
+        t = np.where(done, t, np.where(t < 1, t + 0.2, 1.0))
+        x = np.where(done, source_x, (1 - t) * source_x + t * dest_x)
+        y = np.where(done, source_y, (1 - t) * source_y + t * dest_y)
+        self.ghost_t[games, ghost] = t
+        self.ghost_x[games, ghost] = x
+        self.ghost_y[games, ghost] = y
+        rows, cols = self.cells(x, y)
+        if GHOST_NAMES[ghost] == "blinky":
+            self.blinky_row[games] = rows
+            self.blinky_col[games] = cols
+        self.curr_row[games, ghost] = rows
+        self.curr_col[games, ghost] = cols
+        self.has_curr[games, ghost] = True
+
+        arrived = (t == 1) | ((x == dest_x) & (y == dest_y))
+        if not arrived.any():
+            return
+        games = games[arrived]
+        rows, cols = self.next_row[games, ghost], self.next_col[games, ghost]
+        direction = self.ghost_direction[games, ghost]
+        turn = self.is_intersection(rows, cols, (direction + 2) % 4)
+        ahead = ~turn
+        turn[ahead] = ~self.can_move(rows[ahead], cols[ahead], direction[ahead])
+        ahead = ~turn
+        going = games[ahead]
+        self.prev_row[going, ghost] = rows[ahead]
+        self.prev_col[going, ghost] = cols[ahead]
+        self.next_row[going, ghost] = rows[ahead] + GHOST_DELTAS[direction[ahead], 0]
+        self.next_col[going, ghost] = cols[ahead] + GHOST_DELTAS[direction[ahead], 1]
+        self.ghost_t[going, ghost] = 0
+        self.prepare_movement(ghost, games[turn])
+
+    def check_if_pacman_powered(self, ghost, games):
+        released = self.released[games, ghost]
+        self.blue[games[~released], ghost] = False
+        games = games[released]
+        trigger = self.power_trigger_time[games]
+        # released after the pellet was eaten, it is not affected
+        games = games[~((trigger >= 0) & (self.release_time[games, ghost] > trigger))]
+        powered = self.powered[games]
+        blue = self.blue[games, ghost]
+        calm = games[~powered & blue]
+        self.blue[calm, ghost] = False
+        self.scared[calm, ghost] = False
+        scare = games[powered & ~blue]
+        self.blue[scare, ghost] = True
+        self.ghost_direction[scare, ghost] = (self.ghost_direction[scare, ghost] + 2) % 4
+        self.scared[scare, ghost] = True
+        self.prepare_movement(ghost, scare)
+
+    def check_collisions(self, ghost, games):
+        ghost_x, ghost_y = self.ghost_box_x[games, ghost], self.ghost_box_y[games, ghost]
+        pacman_x = self.pacman_rect_x[games].astype(np.int64)
+        pacman_y = self.pacman_rect_y[games].astype(np.int64)
+        ghost_w, ghost_h = PACMAN[0] // 2, PACMAN[1] // 2
+        pacman_w = pacman_h = CELL_SIZE[0] * 2 // 2
+        hit = (ghost_x < pacman_x + pacman_w) & (ghost_y < pacman_y + pacman_h) & \
+            (ghost_x + ghost_w > pacman_x) & (ghost_y + ghost_h > pacman_y)
+        games = games[hit]
+        scared = self.scared[games, ghost]
+        eaten = games[scared]
+        self.reset_ghosts(ghost, eaten)
+        self.points[eaten] += GHOST_POINT
+        self.ghosts_eaten[eaten] += 1
+        killers = games[~scared]
+        self.dead[killers] = True
+        self.died[killers] = True
+
+    def update_ghost(self, ghost, games):
+        """GhostModel.update of one ghost in every game."""
+        x, y = self.ghost_x[games, ghost], self.ghost_y[games, ghost]
+        self.ghost_box_x[games, ghost] = round_coords(x + (CELL_SIZE[0] * 2 - GHOSTS[0]) // 2)
+        self.ghost_box_y[games, ghost] = round_coords(y + (CELL_SIZE[1] * 2 - GHOSTS[1]) // 2)
+        cols = self.next_col[games, ghost]
+        has_next = self.has_next[games, ghost]
+        self.next_col[games, ghost] = np.where(
+            has_next & (cols >= self.num_cols), 0,
+            np.where(has_next & (cols < 0), self.num_cols - 1, cols))
+        self.move_ghosts(ghost, games[self.released[games, ghost]])
+        self.check_if_pacman_powered(ghost, games)
+        self.check_collisions(ghost, games)
+
+    def step(self, directions=None):
+        """
+        Advances every game by one tick. `directions` holds one
+        DIRECTION_CODES input per game, KEEP (-1) keeps the current one,
+        None keeps them all. Rewards are the points scored this tick.
+        """
+        self.tick += 1
+        self.ate[:] = NOTHING
+        self.died[:] = False
+        self.ghosts_eaten[:] = 0
+        points = self.points.copy()
+        if directions is not None:
+            directions = np.asarray(directions)
+            self.input_direction = np.where(directions >= 0, directions,
+                                            self.input_direction).astype(np.int8)
+        self.advance_timers()
+        games = np.flatnonzero(self.phase == PLAYING)
+        if len(games):
+            ate = self.update_pacman(games)
+            self.ate[games] = ate
+            self.power_up(games[ate == POWER])
+            self.points[games] += np.select([ate == DOT, ate == POWER],
+                                            [DOT_POINT, POWER_POINT], 0)
+            for ghost in range(len(GHOST_NAMES)):
+                self.update_ghost(ghost, games)
+            self.check_phase(games)
+        self.rewards = self.points - points
+        return self.rewards
+
+    def run(self, ticks: int, actions=None):
+        """Steps `ticks` times, `actions[i]` holds the directions of tick i."""
+        for i in range(ticks):
+            self.step(None if actions is None else actions[i])
+        return self.points
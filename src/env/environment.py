@@ -0,0 +1,109 @@
+"""
+Gym style environment over the headless simulation.
+
+    env = PacmanEnv(seed=0)
+    observation, info = env.reset()
+    observation, reward, terminated, truncated, info = env.step(action)
+
+Actions index ACTIONS: 0 keeps the current input, 1 to 4 press l, r, u, d.
+The reward is the points scored during the step. An episode ends
+(terminated) when pacman dies or clears the level, and is cut short
+(truncated) after `max_ticks` ticks.
+Observations are uint8 planes of the level grid, one per CHANNELS entry.
+The level is prepared once per environment and shared by the simulation of
+every episode, a reset only builds a new Simulation on it.
+"""
+import random
+
+import numpy as np
+
+from src.game.simulation import Simulation, prepare_level
+from src.game.state_management import GameState
+from src.game.level import Level
+from src.configs import CELL_SIZE
+from src.utils.coord_utils import get_idx_from_coords
+from src.utils.tile_grid import Tile
+
+ACTIONS = (None, "l", "r", "u", "d")
+CHANNELS = ("walls", "dots", "power", "pacman", "ghosts", "scared_ghosts")
+
+
+def observation_shape(level: Level):
+    return len(CHANNELS), level.num_rows, level.num_cols
+
+
+class PacmanEnv:
+    def __init__(self, level_number: int = 1, seed: int | None = None,
+                 frame_skip: int = 1, max_ticks: int | None = None,
+                 **simulation_kwargs):
+        """`frame_skip` ticks are stepped per action, the rest of the
+        keyword arguments go to Simulation (pauses, prefetch_dots)."""
+        self.level, _ = prepare_level(level_number)
+        self.frame_skip = frame_skip
+        self.max_ticks = max_ticks
+        self.simulation_kwargs = simulation_kwargs
+        self.observation_shape = observation_shape(self.level)
+        self.num_actions = len(ACTIONS)
+        tiles = np.frombuffer(bytes(self.level.matrix.data), np.uint8)
+        self._walls = np.isin(tiles, (Tile.WALL, Tile.ELEC)).reshape(self.observation_shape[1:])
+        self._dot_cells = (tiles == Tile.DOT).view(np.uint8)
+        self._power_cells = (tiles == Tile.POWER).view(np.uint8)
+        # episode seeds, so a seeded environment replays the same episodes
+        self._seeds = random.Random(seed)
+        self.simulation = None
+        self.game_state = None
+
+    def reset(self, seed: int | None = None, out: np.ndarray | None = None):
+        """Starts a new episode, returns (observation, info)."""
+        if seed is None:
+            seed = self._seeds.getrandbits(32)
+        self.close()
+        self.game_state = GameState()
+        self.simulation = Simulation(self.game_state, seed, level=self.level,
+                                     **self.simulation_kwargs)
+        return self.observe(out), self.info()
+
+    def step(self, action: int, out: np.ndarray | None = None):
+        """Returns (observation, reward, terminated, truncated, info)."""
+        game_state = self.game_state
+        points = game_state.points
+        direction = ACTIONS[action]
+        terminated = False
+        for _ in range(self.frame_skip):
+            self.simulation.step(direction)
+            if game_state.is_pacman_dead or game_state.level_complete:
+                terminated = True
+                break
+        truncated = not terminated and self.max_ticks is not None and \
+            self.simulation.tick >= self.max_ticks
+        return (self.observe(out), game_state.points - points, terminated,
+                truncated, self.info())
+
+    def info(self):
+        return {"points": self.game_state.points, "tick": self.simulation.tick}
+
+    def _mark(self, plane, rect_x, rect_y):
+        r, c = get_idx_from_coords(rect_x, rect_y, *self.level.start_pos, CELL_SIZE[0])
+        # sprites cover 2x2 cells from their top left one
+        plane[max(r, 0):r + 2, max(c, 0):c + 2] = 1
+
+    def observe(self, out: np.ndarray | None = None):
+        """The observation of the current state, written into `out` if given."""
+        if out is None:
+            out = np.empty(self.observation_shape, np.uint8)
+        num_cells = self._dot_cells.size
+        present = np.unpackbits(np.frombuffer(self.simulation.collectibles.bits, np.uint8),
+                                count=num_cells, bitorder="little")
+        out[0] = self._walls
+        out[1] = (present & self._dot_cells).reshape(out.shape[1:])
+        out[2] = (present & self._power_cells).reshape(out.shape[1:])
+        out[3:] = 0
+        pacman = self.simulation.pacman
+        self._mark(out[3], pacman.rect_x, pacman.rect_y)
+        for ghost in self.simulation.ghosts:
+            self._mark(out[5] if ghost.is_scared else out[4], ghost.rect_x, ghost.rect_y)
+        return out
+
+    def close(self):
+        if self.simulation is not None:
+            self.simulation.close()
@@ -0,0 +1,119 @@
+"""
+Parity check of BatchSimulation against Simulation.
+Plays recorded games (the seeded random inputs headless runs use) with one
+Simulation per game and with one BatchSimulation holding all of them, and
+compares the state of every game after every tick.
+
+python -m src.env.parity --games 8 --ticks 20000
+"""
+import argparse
+
+import numpy as np
+
+from src.env.batch import (BatchSimulation, DIRECTION_CODES, DIRECTION_NAMES,
+                           GHOST_MODES, GHOST_NAMES, PHASES)
+from src.game.simulation import Simulation
+from src.game.state_management import GameState
+from src.headless import random_inputs
+from src.log_handle import get_logger
+logger = get_logger(__name__)
+
+
+def simulation_state(simulation: Simulation):
+    """What is compared of a game, from the scalar simulation."""
+    game_state = simulation.game_state
+    pacman = simulation.pacman
+    state = {
+        "points": game_state.points,
+        "phase": game_state.phase,
+        "ghost_mode": game_state.ghost_mode,
+        "powered": game_state.is_pacman_powered,
+        "level_complete": game_state.level_complete,
+        "remaining": simulation.collectibles.remaining,
+        "dots": bytes(simulation.collectibles.bits),
+        "pacman": (pacman.rect_x, pacman.rect_y, pacman.tiny_start_x,
+                   pacman.tiny_start_y, pacman.move_direction),
+    }
+    for ghost in simulation.ghosts:
+        state[ghost.name] = (ghost.rect_x, ghost.rect_y, ghost.is_released,
+                             ghost.is_scared, ghost.is_blue, ghost.next_tile)
+    return state
+
+
+def batch_state(batch: BatchSimulation, game: int):
+    """The same for one game of a batch."""
+    state = {
+        "points": int(batch.points[game]),
+        "phase": PHASES[batch.phase[game]],
+        "ghost_mode": GHOST_MODES[batch.ghost_mode[game]],
+        "powered": bool(batch.powered[game]),
+        "level_complete": bool(batch.level_complete[game]),
+        "remaining": int(batch.remaining[game]),
+        "dots": batch.dots[game].tobytes(),
+        "pacman": (float(batch.pacman_x[game]), float(batch.pacman_y[game]),
+                   int(batch.pacman_tiny_row[game]), int(batch.pacman_tiny_col[game]),
+                   DIRECTION_NAMES[batch.move_direction[game]]),
+    }
+    for ghost, name in enumerate(GHOST_NAMES):
+        next_tile = None
+        if batch.has_next[game, ghost]:
+            next_tile = (int(batch.next_row[game, ghost]), int(batch.next_col[game, ghost]))
+        state[name] = (float(batch.ghost_x[game, ghost]), float(batch.ghost_y[game, ghost]),
+                       bool(batch.released[game, ghost]), bool(batch.scared[game, ghost]),
+                       bool(batch.blue[game, ghost]), next_tile)
+    return state
+
+
+def check_parity(seeds, ticks: int, level_number: int = 1):
+    """
+    Returns None when every game matched on every tick, else
+    (tick, seed, {field: (scalar value, batch value)}) of the first mismatch.
+    """
+    simulations = []
+    for seed in seeds:
+        game_state = GameState()
+        game_state.level = level_number
+        simulations.append(Simulation(game_state, seed))
+    inputs = [random_inputs(ticks, seed) for seed in seeds]
+    batch = BatchSimulation(len(seeds), level_number, seeds)
+    actions = np.full(len(seeds), -1, np.int8)
+    try:
+        for tick in range(1, ticks + 1):
+            for game, (simulation, game_inputs) in enumerate(zip(simulations, inputs)):
+                direction = game_inputs.get(tick)
+                simulation.step(direction)
+                actions[game] = -1 if direction is None else DIRECTION_CODES[direction]
+            batch.step(actions)
+            for game, (simulation, seed) in enumerate(zip(simulations, seeds)):
+                expected = simulation_state(simulation)
+                actual = batch_state(batch, game)
+                if expected != actual:
+                    return tick, seed, {field: (value, actual[field])
+                                        for field, value in expected.items()
+                                        if actual[field] != value}
+    finally:
+        for simulation in simulations:
+            simulation.close()
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare BatchSimulation with Simulation")
+    parser.add_argument("--games", type=int, default=8)
+    parser.add_argument("--ticks", type=int, default=20000)
+    parser.add_argument("--first-seed", type=int, default=0)
+    args = parser.parse_args()
+    seeds = range(args.first_seed, args.first_seed + args.games)
+    mismatch = check_parity(list(seeds), args.ticks)
+    if mismatch is None:
+        logger.info("%s games matched for %s ticks", args.games, args.ticks)
+        return
+    tick, seed, fields = mismatch
+    logger.error("seed %s differs on tick %s:", seed, tick)
+    for field, (expected, actual) in fields.items():
+        logger.error("  %s: simulation %s, batch %s", field, expected, actual)
+    raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+PacmanEnvs stepped in parallel worker processes.
+SubprocEnv spreads K environments over worker processes, each worker steps
+its contiguous slice of them. Actions, observations, rewards and done flags
+live in shared memory (multiprocessing RawArrays seen as NumPy arrays):
+the workers read and write them in place and the pipes only carry short
+commands, nothing is pickled per step.
+Environments that finish are reset right away, their observation is then
+the first one of the next episode.
+
+    with SubprocEnv(64, seed=0) as envs:
+        observations = envs.reset()
+        observations, rewards, terminated, truncated = envs.step(actions)
+
+The returned arrays are the shared buffers, the next step overwrites them.
+"""
+import multiprocessing
+import os
+import random
+import traceback
+
+import numpy as np
+
+from src.env.environment import PacmanEnv, observation_shape
+from src.game.level import Level
+
+
+def _views(buffers, shape):
+    observations, rewards, terminated, truncated, actions = buffers
+    return (np.frombuffer(observations, np.uint8).reshape(-1, *shape),
+            np.frombuffer(rewards, np.float64),
+            np.frombuffer(terminated, np.bool_),
+            np.frombuffer(truncated, np.bool_),
+            np.frombuffer(actions, np.int8))
+
+
+def _worker(conn, buffers, start, seeds, env_kwargs):
+    envs = []
+    try:
+        envs = [PacmanEnv(seed=seed, **env_kwargs) for seed in seeds]
+        observations, rewards, terminated, truncated, actions = \
+            _views(buffers, envs[0].observation_shape)
+        conn.send(None)
+        while True:
+            command = conn.recv()
+            if command == "step":
+                for i, env in enumerate(envs, start):
+                    _, reward, ended, cut, _ = env.step(int(actions[i]), out=observations[i])
+                    rewards[i] = reward
+                    terminated[i] = ended
+                    truncated[i] = cut
+                    if ended or cut:
+                        env.reset(out=observations[i])
+            elif command == "reset":
+                for i, env in enumerate(envs, start):
+                    env.reset(out=observations[i])
+            elif command == "close":
+                break
+            conn.send(None)
+    except (KeyboardInterrupt, EOFError):
+        pass
+    except Exception:
+        conn.send(traceback.format_exc())
+    finally:
+        for env in envs:
+            env.close()
+        conn.close()
+
+
+class SubprocEnv:
+    def __init__(self, num_envs: int, num_workers: int | None = None,
+                 seed: int | None = None, start_method: str | None = None,
+                 **env_kwargs):
+        """`env_kwargs` go to every PacmanEnv, `start_method` picks the
+        multiprocessing context (fork, spawn, forkserver)."""
+        self.num_envs = num_envs
+        self.num_workers = min(num_envs, num_workers or os.cpu_count() or 1)
+        level = Level.load(env_kwargs.get("level_number", 1))
+        self.observation_shape = observation_shape(level)
+        context = multiprocessing.get_context(start_method)
+        self._buffers = (
+            context.RawArray("B", num_envs * int(np.prod(self.observation_shape))),
+            context.RawArray("d", num_envs),
+            context.RawArray("b", num_envs),
+            context.RawArray("b", num_envs),
+            context.RawArray("b", num_envs),
+        )
+        (self.observations, self.rewards, self.terminated, self.truncated,
+         self.actions) = _views(self._buffers, self.observation_shape)
+        seeds = random.Random(seed)
+        env_seeds = [seeds.getrandbits(32) for _ in range(num_envs)]
+        bounds = np.linspace(0, num_envs, self.num_workers + 1).astype(int)
+        self._connections = []
+        self._processes = []
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            conn, worker_conn = context.Pipe()
+            process = context.Process(target=_worker, daemon=True,
+                                      args=(worker_conn, self._buffers, int(start),
+                                            env_seeds[start:stop], env_kwargs))
+            process.start()
+            worker_conn.close()
+            self._connections.append(conn)
+            self._processes.append(process)
+        self.closed = False
+        self._wait()
+
+    def _send(self, command):
+        for conn in self._connections:
+            conn.send(command)
+
+    def _receive(self, conn):
+        try:
+            return conn.recv()
+        except EOFError:
+            return "worker exited"
+
+    def _wait(self):
+        errors = [error for error in map(self._receive, self._connections)
+                  if error is not None]
+        if errors:
+            self.close()
+            raise RuntimeError(f"environment worker failed:\n{errors[0]}")
+
+    def reset(self):
+        self._send("reset")
+        self._wait()
+        return self.observations
+
+    def step_async(self, actions):
+        """Starts a step, collect it with step_wait."""
+        self.actions[:] = actions
+        self._send("step")
+
+    def step_wait(self):
+        self._wait()
+        return self.observations, self.rewards, self.terminated, self.truncated
+
+    def step(self, actions):
+        self.step_async(actions)
+        return self.step_wait()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        for conn, process in zip(self._connections, self._processes):
+            if process.is_alive():
+                try:
+                    conn.send("close")
+                except (BrokenPipeError, OSError):
+                    pass
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+            conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
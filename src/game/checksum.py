@@ -0,0 +1,188 @@
+"""
+Per tick state checksums, the determinism gate for performance work.
+state_fields() flattens the game state, pacman, the ghosts, the collectibles,
+the pending timers and the rng state into named values. Each tick's checksum is a hash of
+those values chained with the previous tick's checksum, so two runs agree on
+a tick exactly when they agreed on every tick so far. That makes finding the
+first divergence a bisection over the two checksum streams.
+
+    python -m src.game.checksum record session.rpl -o before.sums
+    (change the code)
+    python -m src.game.checksum record session.rpl -o after.sums
+    python -m src.game.checksum bisect before.sums after.sums
+
+bisect prints the first tick that differs. Record both runs again with
+`--fields-at TICK` and it also prints the fields that differ on that tick.
+"""
+import argparse
+import hashlib
+import json
+import struct
+
+from src.game.simulation import Simulation
+from src.game.replay import Replay
+from src.log_handle import get_logger
+logger = get_logger(__name__)
+
+MAGIC = b"PACSUM01"
+# magic, number of checksums, length of the json with the stored fields
+HEADER = struct.Struct("<8sII")
+DIGEST_SIZE = 8
+
+GAME_STATE_FIELDS = ("level", "direction", "pacman_direction", "points", "phase",
+                     "ghost_mode", "is_pacman_powered", "is_pacman_dead",
+                     "level_complete", "current_time", "scared_time",
+                     "power_event_trigger_time", "blinky_matrix_pos", "pacman_rect")
+PACMAN_FIELDS = ("rect_x", "rect_y", "box_x", "box_y", "tiny_start_x",
+                 "tiny_start_y", "move_direction")
+GHOST_FIELDS = ("rect_x", "rect_y", "box_x", "box_y", "prev", "next_tile", "_t",
+                "_direction", "_target", "_is_released", "_dead_wait",
+                "_creation_time", "release_time", "is_scared", "is_blue", "curr_pos")
+
+
+def state_fields(simulation: Simulation):
+    """Everything that decides the following ticks, by field name."""
+    game_state = simulation.game_state
+    fields = {f"game_state.{name}": getattr(game_state, name)
+              for name in GAME_STATE_FIELDS}
+    fields["scheduler"] = simulation.scheduler.pending()
+    fields["tick"] = simulation.tick
+    # an extra or missing draw shows on its own tick, not when a ghost uses it
+    fields["rng"] = simulation.rng.digest()
+    pacman = simulation.pacman
+    for name in PACMAN_FIELDS:
+        fields[f"pacman.{name}"] = getattr(pacman, name)
+    for ghost in simulation.ghosts:
+        for name in GHOST_FIELDS:
+            fields[f"{ghost.name}.{name}"] = getattr(ghost, name)
+    collectibles = simulation.collectibles
+    fields["collectibles.remaining"] = collectibles.remaining
+    fields["collectibles.bits"] = collectibles.bits.hex()
+    return fields
+
+
+def state_checksum(simulation: Simulation, previous: bytes = b""):
+    """The checksum of the current state chained to `previous`."""
+    payload = repr(tuple(state_fields(simulation).values())).encode()
+    return hashlib.blake2b(previous + payload, digest_size=DIGEST_SIZE).digest()
+
+
+class ChecksumStream:
+    """The checksum of every tick of a run, from tick 0 (the initial state)."""
+    def __init__(self, fields_at=()):
+        self.digests = bytearray()
+        # tick -> state_fields() of the ticks asked for
+        self.fields = {}
+        self.fields_at = set(fields_at)
+
+    def __len__(self):
+        return len(self.digests) // DIGEST_SIZE
+
+    def __getitem__(self, tick):
+        return bytes(self.digests[tick * DIGEST_SIZE:(tick + 1) * DIGEST_SIZE])
+
+    def update(self, simulation: Simulation):
+        """Adds the checksum of the simulation's current tick."""
+        previous = self[len(self) - 1] if len(self) else b""
+        self.digests += state_checksum(simulation, previous)
+        if simulation.tick in self.fields_at:
+            # through json, so stored and loaded fields compare equal
+            self.fields[simulation.tick] = json.loads(json.dumps(state_fields(simulation)))
+
+    def save(self, path: str):
+        fields = json.dumps({str(tick): values for tick, values in self.fields.items()}).encode()
+        with open(path, "wb") as fp:
+            fp.write(HEADER.pack(MAGIC, len(self), len(fields)))
+            fp.write(self.digests)
+            fp.write(fields)
+
+    @classmethod
+    def load(cls, path: str):
+        with open(path, "rb") as fp:
+            data = fp.read()
+        magic, count, fields_size = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("not a checksum stream")
+        stream = cls()
+        start = HEADER.size
+        stream.digests = bytearray(data[start:start + count * DIGEST_SIZE])
+        start += count * DIGEST_SIZE
+        fields = json.loads(data[start:start + fields_size])
+        stream.fields = {int(tick): values for tick, values in fields.items()}
+        stream.fields_at = set(stream.fields)
+        return stream
+
+
+def record(replay: Replay, fields_at=()):
+    """Plays the replay and returns the checksum stream of its ticks."""
+    stream = ChecksumStream(fields_at)
+    simulation = replay.create_simulation()
+    try:
+        stream.update(simulation)
+        inputs = replay.inputs
+        for tick in range(1, replay.ticks + 1):
+            simulation.step(inputs.get(tick))
+            stream.update(simulation)
+    finally:
+        simulation.close()
+    return stream
+
+
+def first_divergence(a: ChecksumStream, b: ChecksumStream):
+    """
+    The first tick the two runs differ on, None when they match.
+    A run that stopped early differs on the first tick it is missing.
+    """
+    common = min(len(a), len(b))
+    lo, hi = 0, common
+    # chained checksums: once different they stay different
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if a[mid] == b[mid]:
+            lo = mid + 1
+        else:
+            hi = mid
+    if lo == common and len(a) == len(b):
+        return None
+    return lo
+
+
+def diff_fields(a: dict, b: dict):
+    """{field: (value in a, value in b)} of the fields that differ."""
+    return {name: (value, b.get(name)) for name, value in a.items()
+            if b.get(name) != value}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per tick state checksums")
+    commands = parser.add_subparsers(dest="command", required=True)
+    rec = commands.add_parser("record", help="checksum every tick of a replay")
+    rec.add_argument("replay")
+    rec.add_argument("-o", "--out", required=True)
+    rec.add_argument("--fields-at", type=int, nargs="*", default=(), metavar="TICK",
+                     help="also store the field values of these ticks")
+    bis = commands.add_parser("bisect", help="find the first tick two runs differ on")
+    bis.add_argument("a")
+    bis.add_argument("b")
+    args = parser.parse_args()
+    if args.command == "record":
+        stream = record(Replay.load(args.replay), args.fields_at)
+        stream.save(args.out)
+        logger.info("%s checksums saved to %s", len(stream), args.out)
+        return
+    a, b = ChecksumStream.load(args.a), ChecksumStream.load(args.b)
+    tick = first_divergence(a, b)
+    if tick is None:
+        logger.info("the runs match on all %s ticks", len(a))
+        return
+    logger.error("the runs diverge on tick %s", tick)
+    if tick in a.fields and tick in b.fields:
+        for name, (value_a, value_b) in diff_fields(a.fields[tick], b.fields[tick]).items():
+            logger.error("  %s: %s != %s", name, value_a, value_b)
+    else:
+        logger.error("record both runs with --fields-at %s to see the fields", tick)
+    raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
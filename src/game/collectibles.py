@@ -0,0 +1,95 @@
+"""
+Dots and power pellets still on the board.
+The level's tile grid is the immutable base, what has been eaten lives in
+this overlay: one bit per cell, set while the dot or pellet of the cell is
+still there. Restarting a level copies the initial bits back, nothing is
+read from disk and the base is never touched.
+"""
+from src.utils.tile_grid import Tile, TileGrid, COLLECTIBLES, NAMES_BY_TILE
+
+
+class CollectibleSet:
+    __slots__ = ("_base", "num_rows", "num_cols", "_initial", "_initial_remaining",
+                 "bits", "remaining", "changed", "generation", "restores")
+
+    def __init__(self, base: TileGrid):
+        self._base = base
+        self.num_rows = base.num_rows
+        self.num_cols = base.num_cols
+        initial = bytearray((len(base.data) + 7) // 8)
+        for idx, tile in enumerate(base.data):
+            if tile in COLLECTIBLES:
+                initial[idx >> 3] |= 1 << (idx & 7)
+        self._initial = bytes(initial)
+        self._initial_remaining = self.count_remaining(base)
+        self.bits = bytearray(self._initial)
+        self.remaining = self._initial_remaining
+        # cells eaten since begin_tick
+        self.changed = []
+        # bumped on every reset, renderers compare it to know when to redraw
+        self.generation = 0
+        # bumped on every restore, the bits are then those of the snapshot
+        self.restores = 0
+
+    @staticmethod
+    def count_remaining(base: TileGrid):
+        """Collectibles that finish the level: those with a free cell below."""
+        remaining = 0
+        unreachable = frozenset((Tile.WALL, Tile.ELEC, Tile.NULL))
+        for row in range(len(base)):
+            for col in range(base.num_cols - 1):
+                if base[row][col] in COLLECTIBLES and \
+                        base[row+1][col] not in unreachable:
+                    remaining += 1
+        return remaining
+
+    def _index(self, r: int, c: int):
+        # negative indexes wrap around like they do on the grid rows
+        if r < 0:
+            r += self.num_rows
+        if c < 0:
+            c += self.num_cols
+        return r * self.num_cols + c
+
+    def has(self, r: int, c: int):
+        idx = self._index(r, c)
+        return bool(self.bits[idx >> 3] & (1 << (idx & 7)))
+
+    def tile(self, r: int, c: int):
+        """Tile of the cell as it is now, eaten collectibles read as void."""
+        tile = self._base[r][c]
+        if tile in COLLECTIBLES and not self.has(r, c):
+            return Tile.VOID
+        return tile
+
+    def eat(self, r: int, c: int):
+        """Removes the collectible of the cell, returns its name ("dot" or
+        "power") or None if there was nothing to eat."""
+        idx = self._index(r, c)
+        mask = 1 << (idx & 7)
+        if not self.bits[idx >> 3] & mask:
+            return None
+        self.bits[idx >> 3] &= ~mask
+        self.remaining -= 1
+        self.changed.append((r, c))
+        return NAMES_BY_TILE[self._base[r][c]]
+
+    def begin_tick(self):
+        self.changed = []
+
+    def reset(self):
+        """Puts every dot and power pellet back."""
+        self.bits[:] = self._initial
+        self.remaining = self._initial_remaining
+        self.changed = []
+        self.generation += 1
+
+    def snapshot(self):
+        return bytes(self.bits), self.remaining
+
+    def restore(self, snapshot):
+        """Puts the collectibles back as they were at snapshot()."""
+        bits, self.remaining = snapshot
+        self.bits[:] = bits
+        self.changed = []
+        self.restores += 1
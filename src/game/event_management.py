@@ -1,25 +1,36 @@
 from pygame import (K_DOWN, K_ESCAPE, K_LEFT, K_RIGHT, K_SPACE, K_UP, KEYDOWN,
-                    QUIT, K_q)
-from pygame import USEREVENT
-from pygame.time import set_timer
+                    QUIT, K_q, K_F3)
+
+from src.utils.profiler import Profiler
 
 class EventHandler:
     def __init__(self, screen, game_state):
         self._screen = screen
         self._game_screen = game_state
+        # direction pressed since the last simulation tick
+        self._direction = None
 
     def pygame_quit(self):
         self._game_screen.running = False
 
     def key_bindings(self, key):
         if key == K_LEFT:
-            self._game_screen.direction = "l"
+            self._direction = "l"
         elif key == K_RIGHT:
-            self._game_screen.direction = "r"
+            self._direction = "r"
         elif key == K_UP:
-            self._game_screen.direction = "u"
+            self._direction = "u"
         elif key == K_DOWN:
-            self._game_screen.direction = "d"
+            self._direction = "d"
+        elif key == K_F3:
+            # profiling and its overlay
+            Profiler().enabled = not Profiler().enabled
+
+    def take_direction(self):
+        """The direction pressed since the last call, the next tick's input."""
+        direction = self._direction
+        self._direction = None
+        return direction
 
     def handle_events(self, event):
         if event.type == QUIT:
@@ -27,18 +38,3 @@ class EventHandler:
 
         if event.type == KEYDOWN:
             self.key_bindings(event.key)
-        
-        if event.type == self._game_screen.custom_event:
-            curr_mode = self._game_screen.ghost_mode
-            if curr_mode == 'scatter':
-                self._game_screen.ghost_mode = 'chase'
-            elif curr_mode == 'chase':
-                self._game_screen.ghost_mode = 'scatter'
-            CUSTOM_EVENT = USEREVENT + 1
-            set_timer(CUSTOM_EVENT, 
-                                self._game_screen.mode_change_events * 1000)
-            self._game_screen.custom_event = CUSTOM_EVENT
-        
-        if event.type == self._game_screen.power_up_event:
-            self._game_screen.is_pacman_powered=False
-
@@ -0,0 +1,399 @@
+"""
+Display free ghost logic.
+GhostModel moves a ghost tile by tile with lerp, picks the next tile from the
+ghost's target, handles release from the den, scaring and collisions with pacman.
+Blinky, Pinky, Inky and Clyde only differ in the way they pick their target.
+Time comes from game_state.current_time (simulation ms), the release from the
+den is a timer on the game state's scheduler and randomness comes from the
+rng handed over by the simulation, so a run is reproducible.
+"""
+from abc import abstractmethod, ABC
+from operator import attrgetter
+import random
+
+from src.game.state_management import GameState
+from src.configs import PACMAN, GHOSTS, CELL_SIZE, GHOST_DELAYS, GHOST_SCATTER_TARGETS, GHOST_POINT
+from src.utils.coord_utils import round_coord
+from src.utils.navigation_utils import NavigationIndex
+from src.utils.tile_grid import TileGrid
+
+# sprite rect to collision box
+BOX_OFFSET_X = (CELL_SIZE[0] * 2 - GHOSTS[0]) // 2
+BOX_OFFSET_Y = (CELL_SIZE[1] * 2 - GHOSTS[1]) // 2
+HIT_WIDTH, HIT_HEIGHT = PACMAN[0] // 2, PACMAN[1] // 2
+
+
+class GhostModel(ABC):
+    __slots__ = ("name", "_ghost_matrix_pos", "_grid_start_pos", "_matrix",
+                 "_navigation", "num_rows", "num_cols", "_game_state", "_rng",
+                 "_is_released", "_creation_time", "_dead_wait", "_t", "_accelerate",
+                 "_direction", "_target", "prev", "next_tile", "_direction_prevent",
+                 "is_scared", "is_blue", "curr_pos", "release_time",
+                 "rect_x", "rect_y", "box_x", "box_y")
+    # what changes while the ghost moves, the rest is fixed by the level
+    SNAPSHOT_SLOTS = ("_is_released", "_creation_time", "_dead_wait", "_t",
+                      "_direction", "_target", "prev", "next_tile", "is_scared",
+                      "is_blue", "curr_pos", "release_time",
+                      "rect_x", "rect_y", "box_x", "box_y")
+
+    def __init__(self,
+                 name: str,
+                 ghost_matrix_pos: tuple[int, int],
+                 grid_start_pos: tuple[int | float, int | float],
+                 matrix: TileGrid,
+                 game_state: GameState,
+                 rng: random.Random | None = None,
+                 navigation: NavigationIndex | None = None
+                 ):
+        self.name = name
+        self._ghost_matrix_pos = ghost_matrix_pos
+        self._grid_start_pos = grid_start_pos
+        self._matrix = matrix
+        self._navigation = navigation or NavigationIndex(matrix)
+        self.num_rows = len(self._matrix)
+        self.num_cols = len(self._matrix[0])
+        self._game_state = game_state
+        self._rng = rng or random.Random()
+        self._is_released = False
+        self._creation_time = self._game_state.current_time
+        self._dead_wait = GHOST_DELAYS[self.name]
+        self._t = 0
+        self._accelerate = 0.2
+        self._direction = None
+        self._target = None
+        self.prev = None
+        self.next_tile = None
+        self._direction_prevent = {(-1, 0): (1, 0), (1, 0): (-1, 0),
+                                     (0, 1): (0, -1), (0, -1): (0, 1)}
+        self.is_scared = False
+        # whether the ghost is drawn blue, scaring only happens on the switch
+        self.is_blue = False
+        self.curr_pos = None
+        self.release_time = None
+        x, y = self._get_coords_from_idx(self._ghost_matrix_pos)
+        self.rect_x = x
+        self.rect_y = y
+        self.box_x = round_coord(x)
+        self.box_y = round_coord(y)
+        self.schedule_release()
+
+    @property
+    def is_released(self):
+        return self._is_released
+
+    def snapshot(self):
+        return _snapshot_fields(self)
+
+    def restore(self, snapshot):
+        for name, value in zip(self.SNAPSHOT_SLOTS, snapshot):
+            setattr(self, name, value)
+
+    # get_coords_from_idx and get_idx_from_coords spelled out, both run
+    # several times per ghost and tick
+    def _get_coords_from_idx(self, p1):
+        row, col = p1
+        if row < 0:
+            row += self.num_rows
+        if col < 0:
+            col += self.num_cols
+        start_x, start_y = self._grid_start_pos
+        return start_x + col * CELL_SIZE[0], start_y + row * CELL_SIZE[1]
+
+    def _get_idx_from_coords(self, p1):
+        start_x, start_y = self._grid_start_pos
+        return (int((p1[1] - start_y) // CELL_SIZE[0]),
+                int((p1[0] - start_x) // CELL_SIZE[0]))
+
+    def build_bounding_boxes(self, x, y):
+        self.box_x = round_coord(x + BOX_OFFSET_X)
+        self.box_y = round_coord(y + BOX_OFFSET_Y)
+
+    def lerp(self, source, dest):
+        x1, y1 = source
+        x2, y2 = dest
+        if self._target is None or self._t == 1:
+            return x1, y1
+        if self._t < 1:
+            self._t += self._accelerate
+        else:
+            self._t = 1
+
+        x = (1 - self._t) * x1 + self._t * x2
+        y = (1 - self._t) * y1 + self._t * y2
+        return x, y
+
+    def schedule_release(self):
+        # released on the first ms strictly after the wait is over
+        self._game_state.scheduler.schedule_at(f"release_{self.name}",
+                                               self._creation_time + self._dead_wait + 1,
+                                               self.release)
+
+    def release(self):
+        self._is_released = True
+        self._dead_wait = 1500
+        self.rect_x, self.rect_y = self._get_coords_from_idx((11, self._ghost_matrix_pos[1]))
+        self.release_time = self._game_state.scheduler.now
+
+    def move_ghost(self):
+        if not self._is_released:
+            return
+        if self._target is None:
+            self.prepare_movement()
+        source = self._get_coords_from_idx(self.prev)
+        dest = self._get_coords_from_idx(self.next_tile)
+        self.rect_x, self.rect_y = self.lerp(source, dest)
+        curr_mat_x, curr_mat_y = self._get_idx_from_coords((self.rect_x, self.rect_y))
+        if self.name == 'blinky':
+            self._game_state.blinky_matrix_pos = (curr_mat_x, curr_mat_y)
+        self.curr_pos = (curr_mat_x, curr_mat_y)
+        if (self._t == 1) \
+            or (self.rect_x == dest[0] and self.rect_y == dest[1]):
+            check_prev = self._direction_prevent.get(self._direction)
+            prev_val = self._get_direction_reverse_map(check_prev)
+            if self._navigation.is_intersection(self.next_tile, prev_val):
+
+                self.prepare_movement()
+            else:
+                if not self._navigation.can_move(self.next_tile,
+                                                 self._get_direction_reverse_map(self._direction)):
+                    self.prepare_movement()
+                else:
+                    self.prev = self.next_tile
+                    self.next_tile = (self.next_tile[0] + self._direction[0],
+                                  self.next_tile[1] + self._direction[1])
+
+                self._t = 0
+
+    def _get_direction_reverse_map(self, direction):
+        match direction:
+            case (-1, 0):
+                return 'up'
+            case (1, 0):
+                return "down"
+            case (0, -1):
+                return "left"
+            case(0, 1):
+                return "right"
+
+    def _boundary_check(self):
+        if not self.next_tile:
+            return
+        if (self.next_tile[1] >= self.num_cols):
+            self.next_tile = (self.next_tile[0], 0)
+            return
+        if self.next_tile[1] < 0:
+            self.next_tile = (self.next_tile[0], self.num_cols - 1)
+
+    def prepare_movement(self):
+        ghost_x, ghost_y = self._get_idx_from_coords((self.rect_x, self.rect_y))
+        if self.next_tile:
+            ghost_x, ghost_y = self.next_tile
+        if self.is_scared:
+            self._target = self.get_random_target()
+        else:
+            self._target = self.determine_target()
+        prev = self._direction_prevent.get(self._direction)
+        self._direction = self._navigation.get_direction((ghost_x, ghost_y),
+                                                         self._target,
+                                                         prev)
+        self._t = 0
+        self.next_tile = (ghost_x + self._direction[0],
+                          ghost_y + self._direction[1])
+        self.prev = (ghost_x, ghost_y)
+
+    @abstractmethod
+    def determine_target(self):
+        ...
+
+    def get_target_pacman_dir(self, pacman_rect: tuple,
+                              pacman_dir: tuple,
+                              look_ahead: int=4):
+        match pacman_dir:
+            case "l":
+                target = (pacman_rect[0], pacman_rect[1] - look_ahead)
+                if target[1] < 0:
+                    target = (pacman_rect[0], self.num_cols - look_ahead - 1)
+                return target
+
+            case "r":
+                target = (pacman_rect[0], pacman_rect[1] + look_ahead)
+                if target[1] > self.num_cols:
+                    target = (pacman_rect[0], 0)
+                return target
+            case "u":
+                return (pacman_rect[0] - look_ahead, pacman_rect[1])
+            case "d":
+                return (pacman_rect[0] + look_ahead, pacman_rect[1])
+            case _:
+                return pacman_rect
+
+    def get_random_target(self):
+        rand_row = self._rng.randrange(0, self.num_rows)
+        rand_col = self._rng.randrange(0, self.num_cols)
+        return rand_row, rand_col
+
+    def make_ghost_scared(self):
+        self._direction = self._direction_prevent[self._direction]
+        self.is_scared = True
+        self.prepare_movement()
+
+    def check_if_pacman_powered(self):
+        if not self._is_released:
+            self.is_blue = False
+            return
+        if self._game_state.power_event_trigger_time is not None and \
+                self.release_time > self._game_state.power_event_trigger_time:
+            return
+        if self._game_state.is_pacman_powered:
+            if not self.is_blue:
+                self.is_blue = True
+                self.make_ghost_scared()
+        else:
+            if self.is_blue:
+                self.is_blue = False
+                self.is_scared = False
+
+    def reset_ghost(self):
+        self._t = 0
+        self._direction = None
+        self._target = None
+        self.prev = None
+        self.next_tile = None
+        self.release_time = None
+        self.is_scared = False
+        x, y = self._get_coords_from_idx(self._ghost_matrix_pos)
+        self.box_x = round_coord(x)
+        self.box_y = round_coord(y)
+        self.rect_x = x
+        self.rect_y = y
+        self._is_released = False
+        self._creation_time = self._game_state.current_time
+        self.schedule_release()
+
+    def check_collisions(self):
+        """Returns "eat_ghost" or "death" when the ghost touches pacman."""
+        x, y, w, h = self._game_state.pacman_rect
+        # rects_collide inlined, the hit box is never empty
+        x, y, w, h = int(x), int(y), w // 2, h // 2
+        box_x, box_y = self.box_x, self.box_y
+        if w and h and box_x < x + w and box_y < y + h and \
+                box_x + HIT_WIDTH > x and box_y + HIT_HEIGHT > y:
+            if self.is_scared:
+                self.reset_ghost()
+                self._game_state.points += GHOST_POINT
+                return "eat_ghost"
+            else:
+                self._game_state.is_pacman_dead = True
+                return "death"
+        return None
+
+    def update(self):
+        self.build_bounding_boxes(self.rect_x, self.rect_y)
+        self._boundary_check()
+        self.move_ghost()
+        self.check_if_pacman_powered()
+        return self.check_collisions()
+
+
+class Blinky(GhostModel):
+    __slots__ = ()
+
+    def determine_target(self):
+        mode = self._game_state.ghost_mode
+        match mode:
+            case "scatter":
+                target = GHOST_SCATTER_TARGETS[self.name]
+            case "chase":
+                pacman_rect = self._game_state.pacman_rect
+                target = self._get_idx_from_coords((pacman_rect[0], pacman_rect[1]))
+        return target
+
+class Pinky(GhostModel):
+    __slots__ = ()
+
+    def calculate_pacman_direction(self):
+        pacman_dir = self._game_state.pacman_direction
+        pacman_rect = self._game_state.pacman_rect
+        pacman_rect = self._get_idx_from_coords((pacman_rect[0],
+                                                        pacman_rect[1]))
+        return self.get_target_pacman_dir(pacman_rect,
+                                          pacman_dir,
+                                          )
+
+    def determine_target(self):
+        mode = self._game_state.ghost_mode
+        match mode:
+            case "scatter":
+                return GHOST_SCATTER_TARGETS[self.name]
+            case "chase":
+                return self.calculate_pacman_direction()
+
+class Inky(GhostModel):
+    __slots__ = ()
+
+    def calculate_inky_target(self):
+        pacman_rect = self._game_state.pacman_rect
+        pacman_rect = self._get_idx_from_coords((pacman_rect[0], pacman_rect[1]))
+        pacman_dir = self._game_state.pacman_direction
+        blinky_cell = self._game_state.blinky_matrix_pos
+        inky_pacman_target = self.get_target_pacman_dir(pacman_rect,
+                                                        pacman_dir,
+                                                        2)
+        vec_row = inky_pacman_target[0] - blinky_cell[0]
+        vec_col = inky_pacman_target[1] - blinky_cell[1]
+        target_row = blinky_cell[0] + vec_row * 2
+        target_col = blinky_cell[1] + vec_col * 2
+        return target_row, target_col
+
+    def determine_target(self):
+        mode = self._game_state.ghost_mode
+        match mode:
+            case "scatter":
+                return GHOST_SCATTER_TARGETS[self.name]
+            case "chase":
+                return self.calculate_inky_target()
+
+class Clyde(GhostModel):
+    __slots__ = ()
+
+    def get_clyde_random_target(self):
+        pacman_rect = self._game_state.pacman_rect
+        pacman_rect = self._get_idx_from_coords((pacman_rect[0], pacman_rect[1]))
+        if not self.curr_pos:
+            return pacman_rect
+        dis = abs(pacman_rect[0] - self.curr_pos[0]) + abs(pacman_rect[1] - self.curr_pos[1])
+        if dis > 8:
+            return self.get_random_target()
+        return pacman_rect
+
+    def determine_target(self):
+        mode = self._game_state.ghost_mode
+        match mode:
+            case "scatter":
+                return GHOST_SCATTER_TARGETS[self.name]
+            case "chase":
+                return self.get_clyde_random_target()
+
+
+_snapshot_fields = attrgetter(*GhostModel.SNAPSHOT_SLOTS)
+
+GHOST_MODELS = [('blinky', Blinky),
+                ('pinky', Pinky),
+                ('inky', Inky),
+                ('clyde', Clyde)]
+
+
+def create_ghosts(game_state, matrix, ghost_matrix_pos, grid_start_pos, rng=None,
+                  navigation=None):
+    """Creates the four ghosts side by side starting at the ghost den."""
+    ghosts = []
+    for adder, (ghost_name, ghost) in enumerate(GHOST_MODELS):
+        ghost_pos = (ghost_matrix_pos[0], ghost_matrix_pos[1] + adder)
+        ghosts.append(ghost(ghost_name,
+                            ghost_pos,
+                            grid_start_pos,
+                            matrix,
+                            game_state,
+                            rng,
+                            navigation))
+    return ghosts
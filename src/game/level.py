@@ -0,0 +1,129 @@
+import json
+import os
+
+from src.configs import (SCREEN_WIDTH, SCREEN_HEIGHT, CELL_SIZE, DISTANCE_CACHE_DIR,
+                         LEVEL_PACK, PACMAN_SPEED)
+from src.game.level_pack import LevelPack, payload_digest
+from src.utils.coord_utils import (place_elements_offset, get_tiny_occupancy,
+                                   SummedAreaTable)
+from src.utils.navigation_utils import NavigationIndex
+from src.utils.distance_utils import DistanceTable
+from src.utils.tile_grid import TileGrid
+from src.log_handle import get_logger
+logger = get_logger(__name__)
+
+
+# packs opened so far, by path
+_level_packs = {}
+# level jsons already reported as newer than the pack
+_stale_warned = set()
+
+
+def get_level_path(level_number):
+    return f"levels/level{level_number}.json"
+
+
+def get_level_pack(path=LEVEL_PACK):
+    """The compiled level pack at `path`, None if there is none."""
+    if path not in _level_packs:
+        _level_packs[path] = LevelPack(path) if os.path.exists(path) else None
+    return _level_packs[path]
+
+
+def pack_is_stale(pack, level_number):
+    """Whether the level's json was edited after the pack was compiled."""
+    try:
+        json_mtime = os.stat(get_level_path(level_number)).st_mtime_ns
+    except OSError:
+        return False
+    return json_mtime > pack.mtime_ns
+
+
+def level_exists(level_number):
+    pack = get_level_pack()
+    if pack is not None and level_number in pack:
+        return True
+    return os.path.exists(get_level_path(level_number))
+
+
+class Level:
+    """
+    Plain data of a single level as stored in levels/level{n}.json or in a
+    compiled level pack, which also carries the digest of the json.
+    The level is laid out on the screen the same way with or without a
+    display, so the pixel origin of the grid is part of the level.
+    """
+    def __init__(self, number: int, payload: dict, digest: str | None = None):
+        self.number = number
+        # identifies the level content, whatever file it came from
+        self.digest = digest or payload_digest(payload)
+        self.num_rows = payload["num_rows"]
+        self.num_cols = payload["num_cols"]
+        # converted once, everything past loading works on tile codes
+        self.matrix = payload["matrix"]
+        if not isinstance(self.matrix, TileGrid):
+            self.matrix = TileGrid.from_matrix(self.matrix)
+        self.pacman_start = payload["pacman_start"]
+        self.ghost_den = payload["ghost_den"]
+        self.elec = payload["elec"]
+        self.scatter_times = payload["scatter_times"]
+        self.power_up_time = payload["power_up_time"]
+        self.start_x, self.start_y = place_elements_offset(
+            SCREEN_WIDTH,
+            SCREEN_HEIGHT,
+            CELL_SIZE[0] * self.num_cols,
+            CELL_SIZE[0] * self.num_rows,
+            0.5,
+            0.5,
+        )
+        self._navigation = None
+        self._distances = None
+        self._pacman_walls = None
+
+    @property
+    def navigation(self):
+        """Ghost navigation index, compiled on first use. Walls and elec
+        bars never change, so eating dots does not invalidate it."""
+        if self._navigation is None:
+            self._navigation = NavigationIndex(self.matrix)
+        return self._navigation
+
+    @property
+    def distances(self):
+        """All pairs ghost distances, see DistanceTable. Built or read from
+        the disk cache on first use, the simulation itself never needs it."""
+        if self._distances is None:
+            self._distances = DistanceTable.for_level(self.navigation, self.digest,
+                                                      DISTANCE_CACHE_DIR)
+        return self._distances
+
+    @property
+    def pacman_walls(self):
+        """Walls of pacman's step grid as a summed area table."""
+        if self._pacman_walls is None:
+            self._pacman_walls = SummedAreaTable(
+                get_tiny_occupancy(self.matrix, CELL_SIZE[0], PACMAN_SPEED)
+            )
+        return self._pacman_walls
+
+    @property
+    def start_pos(self):
+        return self.start_x, self.start_y
+
+    @classmethod
+    def load(cls, level_number: int):
+        """From the level pack when it has the level, else from the json.
+        A json edited after the pack was compiled wins over the pack."""
+        pack = get_level_pack()
+        if pack is not None and level_number in pack:
+            if not pack_is_stale(pack, level_number):
+                payload, digest = pack.read(level_number)
+                return cls(level_number, payload, digest)
+            path = get_level_path(level_number)
+            if path not in _stale_warned:
+                _stale_warned.add(path)
+                logger.warning("%s is newer than %s, loading the json, recompile the pack",
+                               path, pack.path)
+        with open(get_level_path(level_number)) as fp:
+            payload = json.load(fp)
+        return cls(level_number, payload)
@@ -0,0 +1,174 @@
+"""
+Compiled binary levels.
+A pack holds any number of levels in one file:
+
+    header  8s magic, I level count
+    index   count x (I level number, I offset, I size), sorted by number
+    records one per level, see RECORD
+
+A record stores the digest of its json source, the level fields the game
+uses and the tiles as one byte per cell (src.utils.tile_grid codes).
+LevelPack maps the file and only binary searches the index and decodes a
+record when that level is asked for, so opening a pack and loading a level
+cost the same whatever the number of levels in it.
+
+python -m src.game.level_pack levels/level1.json -o levels/levels.pack
+"""
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+
+from src.utils.tile_grid import TileGrid, TILE_NAMES
+from src.log_handle import get_logger
+logger = get_logger(__name__)
+
+MAGIC = b"PACLVL01"
+HEADER = struct.Struct("<8sI")
+INDEX_ENTRY = struct.Struct("<III")
+# digest, rows, cols, pacman_start, ghost_den, elec, power_up_time,
+# number of scatter times (followed by that many I and then the tiles)
+RECORD = struct.Struct("<20sHHhhhhhhIB")
+SCATTER_TIME = struct.Struct("<I")
+
+
+def payload_digest(payload: dict):
+    """Digest of a level json payload, the key of its generated caches."""
+    return hashlib.sha1(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def encode_level(payload: dict):
+    num_rows, num_cols = payload["num_rows"], payload["num_cols"]
+    tiles = bytes(TILE_NAMES[cell] for row in payload["matrix"] for cell in row)
+    if len(tiles) != num_rows * num_cols:
+        raise ValueError(f"matrix is not {num_rows}x{num_cols}")
+    scatter_times = payload["scatter_times"]
+    record = RECORD.pack(bytes.fromhex(payload_digest(payload)),
+                         num_rows, num_cols,
+                         *payload["pacman_start"],
+                         *payload["ghost_den"],
+                         *payload["elec"],
+                         payload["power_up_time"],
+                         len(scatter_times))
+    record += b"".join(SCATTER_TIME.pack(time) for time in scatter_times)
+    return record + tiles
+
+
+def decode_level(buffer, offset: int):
+    """The payload (matrix as a TileGrid) and digest of the record at `offset`."""
+    (digest, num_rows, num_cols, pacman_r, pacman_c, den_r, den_c, elec_r, elec_c,
+     power_up_time, num_scatter) = RECORD.unpack_from(buffer, offset)
+    offset += RECORD.size
+    scatter_times = [SCATTER_TIME.unpack_from(buffer, offset + i * SCATTER_TIME.size)[0]
+                     for i in range(num_scatter)]
+    offset += num_scatter * SCATTER_TIME.size
+    tiles = bytearray(buffer[offset:offset + num_rows * num_cols])
+    payload = {
+        "num_rows": num_rows,
+        "num_cols": num_cols,
+        "matrix": TileGrid(num_rows, num_cols, tiles),
+        "pacman_start": [pacman_r, pacman_c],
+        "ghost_den": [den_r, den_c],
+        "elec": [elec_r, elec_c],
+        "scatter_times": scatter_times,
+        "power_up_time": power_up_time,
+    }
+    return payload, digest.hex()
+
+
+def write_pack(path: str, levels: dict):
+    """Writes {level number: json payload} into a pack at `path`."""
+    numbers = sorted(levels)
+    records = [encode_level(levels[number]) for number in numbers]
+    offset = HEADER.size + INDEX_ENTRY.size * len(numbers)
+    index = []
+    for number, record in zip(numbers, records):
+        index.append(INDEX_ENTRY.pack(number, offset, len(record)))
+        offset += len(record)
+    with open(path, "wb") as fp:
+        fp.write(HEADER.pack(MAGIC, len(numbers)))
+        fp.write(b"".join(index))
+        for record in records:
+            fp.write(record)
+
+
+class LevelPack:
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as fp:
+            self._map = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+            # when the pack was compiled, level sources edited since are newer
+            self.mtime_ns = os.fstat(fp.fileno()).st_mtime_ns
+        magic, self.count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self._map.close()
+            raise ValueError(f"{path} is not a level pack")
+        self._decoded = {}
+
+    def _find(self, level_number: int):
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            number, offset, _ = INDEX_ENTRY.unpack_from(
+                self._map, HEADER.size + middle * INDEX_ENTRY.size)
+            if number == level_number:
+                return offset
+            if number < level_number:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def __contains__(self, level_number: int):
+        return self._find(level_number) is not None
+
+    def __len__(self):
+        return self.count
+
+    def level_numbers(self):
+        return [INDEX_ENTRY.unpack_from(self._map, HEADER.size + i * INDEX_ENTRY.size)[0]
+                for i in range(self.count)]
+
+    def read(self, level_number: int):
+        """(payload, digest) of a level, decoded on first access."""
+        if level_number not in self._decoded:
+            offset = self._find(level_number)
+            if offset is None:
+                raise KeyError(f"level {level_number} is not in {self.path}")
+            self._decoded[level_number] = decode_level(self._map, offset)
+        payload, digest = self._decoded[level_number]
+        # every caller gets its own tiles, the decoded record stays pristine
+        payload = dict(payload, matrix=payload["matrix"].copy())
+        return payload, digest
+
+    def close(self):
+        self._map.close()
+
+
+def compile_levels(sources: list[str], output: str):
+    """Compiles levels/level{n}.json files into one pack."""
+    levels = {}
+    for source in sources:
+        match = re.search(r"level(\d+)\.json$", os.path.basename(source))
+        if match is None:
+            raise ValueError(f"{source} is not named level<number>.json")
+        with open(source) as fp:
+            levels[int(match.group(1))] = json.load(fp)
+    write_pack(output, levels)
+    logger.info("compiled %s levels into %s (%s bytes)", len(levels), output,
+                os.path.getsize(output))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile level json files into a level pack")
+    parser.add_argument("sources", nargs="+", help="levels/level<number>.json files")
+    parser.add_argument("-o", "--output", default="levels/levels.pack")
+    args = parser.parse_args()
+    compile_levels(args.sources, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Display free pacman logic: movement on the tiny matrix, wrapping through the
+tunnel and eating dots. Positions are kept in the same pixel coordinates the
+Pacman sprite is drawn at, so the sprite only has to copy them.
+"""
+from operator import attrgetter
+
+from src.configs import CELL_SIZE, PACMAN_SPEED, PACMAN
+from src.game.state_management import GameState
+from src.game.collectibles import CollectibleSet
+from src.utils.coord_utils import (get_coords_from_idx,
+                                   get_idx_from_coords,
+                                   get_tiny_occupancy,
+                                   round_coord,
+                                   SummedAreaTable)
+from src.utils.tile_grid import TileGrid
+
+
+class PacmanModel:
+    __slots__ = ("game_state", "pacman_pos", "matrix", "start_pos", "move_direction",
+                 "pacman_x_coord", "pacman_y_coord", "tiny_rows", "tiny_cols",
+                 "wall_table", "subdiv", "tiny_start_x", "tiny_start_y",
+                 "wrap_left_x", "wrap_right_x", "collectibles", "rect_x", "rect_y",
+                 "box_x", "box_y")
+    # what changes while pacman moves, the rest is fixed by the level
+    SNAPSHOT_SLOTS = ("move_direction", "tiny_start_x", "tiny_start_y",
+                      "rect_x", "rect_y", "box_x", "box_y")
+
+    def __init__(self,
+                 game_state: GameState,
+                 matrix: TileGrid,
+                 pacman_pos: tuple,
+                 start_pos: tuple,
+                 collectibles: CollectibleSet,
+                 wall_table: SummedAreaTable | None = None):
+        self.game_state = game_state
+        self.pacman_pos = pacman_pos
+        self.matrix = matrix
+        self.start_pos = start_pos
+        self.move_direction = self.game_state.direction
+        self.calculate_pacman_coords()
+        self.calculate_tiny_matrix(wall_table)
+        self.calculate_wrap_coords()
+        # shared with the simulation, outlives this pacman across deaths
+        self.collectibles = collectibles
+        self.rect_x = self.pacman_x_coord
+        self.rect_y = self.pacman_y_coord
+        # top left of the sprite rect, which is what dots are eaten with
+        self.box_x = round_coord(self.rect_x)
+        self.box_y = round_coord(self.rect_y)
+
+    def snapshot(self):
+        return _snapshot_fields(self)
+
+    def restore(self, snapshot):
+        for name, value in zip(self.SNAPSHOT_SLOTS, snapshot):
+            setattr(self, name, value)
+
+    def build_bounding_boxes(self, x: int | float, y: int | float):
+        self.box_x = round_coord(x + (CELL_SIZE[0] * 2 - PACMAN[0]) // 2)
+        self.box_y = round_coord(y + (CELL_SIZE[1] * 2 - PACMAN[1]) // 2)
+
+    def calculate_pacman_coords(self):
+        x, y = get_coords_from_idx(
+            self.pacman_pos,
+            self.start_pos[0],
+            self.start_pos[1],
+            CELL_SIZE[0],
+            CELL_SIZE[1],
+            len(self.matrix),
+            len(self.matrix[0])
+        )
+        self.pacman_x_coord = x
+        self.pacman_y_coord = y
+
+    def calculate_tiny_matrix(self, wall_table=None):
+        if wall_table is None:
+            wall_table = SummedAreaTable(get_tiny_occupancy(self.matrix,
+                                                            CELL_SIZE[0],
+                                                            PACMAN_SPEED))
+        self.tiny_rows = wall_table.num_rows
+        self.tiny_cols = wall_table.num_cols
+        # walls per rectangle of the tiny matrix in constant time
+        self.wall_table = wall_table
+        self.subdiv = CELL_SIZE[0] // PACMAN_SPEED
+        self.tiny_start_x = self.pacman_pos[0] * self.subdiv
+        self.tiny_start_y = self.pacman_pos[1] * self.subdiv
+
+    def calculate_wrap_coords(self):
+        # x of the tiny columns pacman lands on when going through the tunnel
+        self.wrap_left_x = self.start_pos[0]
+        self.wrap_right_x = self.start_pos[0] + \
+            (self.tiny_cols - self.subdiv * 2 - 4) * PACMAN_SPEED
+
+    def edges_helper_vertical(self, row: int,
+                              col: int,
+                              additive: int):
+        return self.wall_table.is_strip_clear(row, col + additive,
+                                              self.subdiv * 2, 1)
+
+    def edge_helper_horizontal(self, row: int,
+                               col: int,
+                               additive: int):
+        return self.wall_table.is_strip_clear(row + additive, col,
+                                              1, self.subdiv * 2)
+
+    def boundary_check(self):
+        if (self.tiny_start_y + self.subdiv * 2) >= self.tiny_cols - 1:
+            self.tiny_start_y = 0
+            self.rect_x = self.wrap_left_x
+
+        elif (self.tiny_start_y - 1) < 0:
+            self.tiny_start_y = self.tiny_cols - (self.subdiv * 3)
+            self.rect_x = self.wrap_right_x
+
+    def eat_dots(self):
+        """Returns the (tile, cell) eaten this tick, if any."""
+        r, c = get_idx_from_coords(
+            self.box_x, self.box_y, *self.start_pos, CELL_SIZE[0]
+        )
+        tile = self.collectibles.eat(r, c)
+        if tile is None:
+            return None
+        return tile, (r, c)
+
+    def movement_bind(self):
+        match self.game_state.direction:
+            case 'l':
+                if self.edges_helper_vertical(self.tiny_start_x, self.tiny_start_y, -1):
+                    self.move_direction = "l"
+                    self.game_state.pacman_direction = 'l'
+
+            case 'r':
+                if self.edges_helper_vertical(
+                    self.tiny_start_x, self.tiny_start_y, self.subdiv * 2
+                ):
+                    self.move_direction = "r"
+                    self.game_state.pacman_direction = 'r'
+
+            case 'u':
+                if self.edge_helper_horizontal(self.tiny_start_x, self.tiny_start_y, -1):
+                    self.move_direction = "u"
+                    self.game_state.pacman_direction = 'u'
+
+            case 'd':
+                if self.edge_helper_horizontal(
+                    self.tiny_start_x, self.tiny_start_y, self.subdiv * 2
+                ):
+                    self.move_direction = "d"
+                    self.game_state.pacman_direction = 'd'
+
+    def move_pacman(self):
+        match self.move_direction:
+            case "l":
+                if self.edges_helper_vertical(self.tiny_start_x, self.tiny_start_y, -1):
+                    self.rect_x -= PACMAN_SPEED
+                    self.tiny_start_y -= 1
+            case "r":
+                if self.edges_helper_vertical(
+                self.tiny_start_x, self.tiny_start_y, self.subdiv * 2
+            ):
+                    self.rect_x += PACMAN_SPEED
+                    self.tiny_start_y += 1
+
+            case "u":
+                if self.edge_helper_horizontal(self.tiny_start_x, self.tiny_start_y, -1):
+                    self.rect_y -= PACMAN_SPEED
+                    self.tiny_start_x -= 1
+
+            case "d":
+                if self.edge_helper_horizontal(
+                self.tiny_start_x, self.tiny_start_y, self.subdiv * 2
+            ):
+                    self.rect_y += PACMAN_SPEED
+                    self.tiny_start_x += 1
+
+        self.game_state.pacman_rect = (self.rect_x, self.rect_y,
+                                       CELL_SIZE[0]*2, CELL_SIZE[0]*2)
+
+    def update(self):
+        """Advances pacman by one tick and returns what it ate, if anything."""
+        self.build_bounding_boxes(self.rect_x, self.rect_y)
+        self.movement_bind()
+        self.move_pacman()
+        self.boundary_check()
+        eaten = self.eat_dots()
+        if self.collectibles.remaining == 0:
+            self.game_state.level_complete = True
+        return eaten
+
+
+_snapshot_fields = attrgetter(*PacmanModel.SNAPSHOT_SLOTS)
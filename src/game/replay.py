@@ -0,0 +1,169 @@
+"""
+Replays: everything needed to re-simulate a session exactly.
+The simulation is deterministic given its seed, level, timings and the
+direction pressed on each tick, so that is all a replay stores:
+
+    header  see HEADER (seed, level number and digest, fps, pauses, ticks)
+    inputs  one unsigned LEB128 varint per input,
+            (ticks since the previous input << 3) | DIRECTION_CODES[direction]
+
+A ten minute session is a few KB. Recorder is attached to the simulation
+and collects the inputs as they are stepped, play_headless re-simulates a
+replay as fast as possible, GameRun(replay=...) draws it at any speed.
+
+python -m src.game.replay play session.rpl [--render] [--speed 4]
+"""
+import argparse
+import struct
+
+from src.configs import DEATH_PAUSE, LEVEL_CLEAR_PAUSE, RESPAWN_PAUSE
+from src.game.state_management import GameState
+from src.game.simulation import Simulation
+from src.log_handle import get_logger
+logger = get_logger(__name__)
+
+MAGIC = b"PACRPL01"
+# magic, seed, level number, level digest, fps, death pause,
+# level clear pause, respawn pause, ticks
+HEADER = struct.Struct("<8sqH20sHIIII")
+DIRECTION_CODES = {"": 0, "l": 1, "r": 2, "u": 3, "d": 4}
+DIRECTIONS_BY_CODE = {code: direction for direction, code in DIRECTION_CODES.items()}
+
+
+class Replay:
+    def __init__(self, seed: int, level: int, digest: str, fps: int = 60,
+                 death_pause: int = DEATH_PAUSE,
+                 level_clear_pause: int = LEVEL_CLEAR_PAUSE,
+                 respawn_pause: int = RESPAWN_PAUSE,
+                 ticks: int = 0, inputs: dict | None = None):
+        self.seed = seed
+        self.level = level
+        self.digest = digest
+        self.fps = fps
+        self.death_pause = death_pause
+        self.level_clear_pause = level_clear_pause
+        self.respawn_pause = respawn_pause
+        self.ticks = ticks
+        # tick number -> direction pressed on that tick
+        self.inputs = inputs if inputs is not None else {}
+
+    def encode(self):
+        data = bytearray(HEADER.pack(MAGIC, self.seed, self.level,
+                                     bytes.fromhex(self.digest), self.fps,
+                                     self.death_pause, self.level_clear_pause,
+                                     self.respawn_pause, self.ticks))
+        previous = 0
+        for tick in sorted(self.inputs):
+            value = (tick - previous) << 3 | DIRECTION_CODES[self.inputs[tick]]
+            previous = tick
+            while value >= 0x80:
+                data.append(value & 0x7F | 0x80)
+                value >>= 7
+            data.append(value)
+        return bytes(data)
+
+    @classmethod
+    def decode(cls, data: bytes):
+        (magic, seed, level, digest, fps, death_pause, level_clear_pause,
+         respawn_pause, ticks) = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("not a replay file")
+        inputs = {}
+        tick = value = shift = 0
+        for byte in data[HEADER.size:]:
+            value |= (byte & 0x7F) << shift
+            shift += 7
+            if byte & 0x80:
+                continue
+            tick += value >> 3
+            inputs[tick] = DIRECTIONS_BY_CODE[value & 7]
+            value = shift = 0
+        return cls(seed, level, digest.hex(), fps, death_pause, level_clear_pause,
+                   respawn_pause, ticks, inputs)
+
+    def save(self, path: str):
+        with open(path, "wb") as fp:
+            fp.write(self.encode())
+
+    @classmethod
+    def load(cls, path: str):
+        with open(path, "rb") as fp:
+            return cls.decode(fp.read())
+
+    @classmethod
+    def for_simulation(cls, simulation: Simulation):
+        """An empty replay of a simulation's setup, to add its inputs to."""
+        return cls(simulation.seed, simulation.level.number, simulation.level.digest,
+                   simulation.game_state.fps, simulation.death_pause,
+                   simulation.level_clear_pause, simulation.respawn_pause)
+
+    def create_simulation(self, **simulation_kwargs):
+        """A simulation set up like the recorded one, at tick 0.
+        `simulation_kwargs` go to Simulation (prefetch_dots, profile)."""
+        game_state = GameState()
+        game_state.level = self.level
+        game_state.fps = self.fps
+        simulation = Simulation(game_state, self.seed, self.death_pause,
+                                self.level_clear_pause, self.respawn_pause,
+                                **simulation_kwargs)
+        if simulation.level.digest != self.digest:
+            simulation.close()
+            raise ValueError(f"level {self.level} changed since the replay was recorded")
+        return simulation
+
+
+class Recorder:
+    """Collects the inputs of a simulation into a Replay."""
+    def __init__(self, simulation: Simulation):
+        self.simulation = simulation
+        self.replay = Replay.for_simulation(simulation)
+        simulation.recorder = self
+
+    def record(self, tick: int, direction: str):
+        self.replay.inputs[tick] = direction
+
+    def save(self, path: str):
+        self.replay.ticks = self.simulation.tick
+        self.replay.save(path)
+        logger.info("replay of %s ticks saved to %s", self.replay.ticks, path)
+        return self.replay
+
+
+def play_headless(replay: Replay):
+    """Re-simulates the whole replay as fast as possible, returns the simulation."""
+    simulation = replay.create_simulation()
+    try:
+        simulation.run(replay.ticks, replay.inputs)
+    finally:
+        simulation.close()
+    return simulation
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded session")
+    commands = parser.add_subparsers(dest="command", required=True)
+    play = commands.add_parser("play", help="re-simulate a replay")
+    play.add_argument("path")
+    play.add_argument("--render", action="store_true", help="draw it in a window")
+    play.add_argument("--speed", type=float, default=1,
+                      help="speed multiplier of the rendered playback")
+    info = commands.add_parser("info", help="print what a replay holds")
+    info.add_argument("path")
+    args = parser.parse_args()
+    replay = Replay.load(args.path)
+    if args.command == "info":
+        print(f"seed {replay.seed}, level {replay.level} ({replay.digest}), "
+              f"{replay.ticks} ticks, {len(replay.inputs)} inputs")
+    elif args.render:
+        from src.runner import GameRun
+        GameRun(replay=replay, speed=args.speed).main()
+    else:
+        import time
+        start = time.perf_counter()
+        simulation = play_headless(replay)
+        logger.info("replayed %s ticks in %.3f s, points: %s", replay.ticks,
+                    time.perf_counter() - start, simulation.game_state.points)
+
+
+if __name__ == "__main__":
+    main()
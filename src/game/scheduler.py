@@ -0,0 +1,83 @@
+import heapq
+
+
+class Scheduler:
+    """
+    Deterministic timer queue driven by simulation time instead of the wall clock.
+    Timers are named, scheduling a name again replaces the pending timer
+    (like pygame.time.set_timer did). Due timers fire in (due time, insertion)
+    order when the simulation advances the clock, so a run fires exactly the
+    same timers no matter how fast the ticks are stepped.
+    """
+    __slots__ = ("_queue", "_pending", "_counter", "now")
+
+    def __init__(self):
+        self._queue = []
+        self._pending = {}
+        self._counter = 0
+        self.now = 0
+
+    def schedule(self, name, delay, callback, *args):
+        """Fires `callback(*args)` once `delay` ms of simulation time passed."""
+        return self.schedule_at(name, self.now + delay, callback, *args)
+
+    def schedule_at(self, name, due, callback, *args):
+        self._counter += 1
+        entry = [due, self._counter, name, callback, args]
+        self._pending[name] = entry
+        heapq.heappush(self._queue, entry)
+        return entry
+
+    def cancel(self, name):
+        # the heap entry stays behind and is skipped once it is popped
+        return self._pending.pop(name, None) is not None
+
+    def is_pending(self, name):
+        return name in self._pending
+
+    def due_time(self, name):
+        entry = self._pending.get(name)
+        return entry[0] if entry else None
+
+    def pending(self):
+        """(name, due time) of the pending timers, sorted by name."""
+        return sorted((name, entry[0]) for name, entry in self._pending.items())
+
+    def next_due(self):
+        while self._queue and self._pending.get(self._queue[0][2]) is not self._queue[0]:
+            heapq.heappop(self._queue)
+        return self._queue[0][0] if self._queue else None
+
+    def advance(self, now):
+        """Moves the clock to `now` and fires every timer due by then.
+        Returns the number of timers fired."""
+        self.now = now
+        fired = 0
+        queue = self._queue
+        while queue and queue[0][0] <= now:
+            entry = heapq.heappop(queue)
+            name = entry[2]
+            if self._pending.get(name) is not entry:
+                continue
+            del self._pending[name]
+            entry[3](*entry[4])
+            fired += 1
+        return fired
+
+    def snapshot(self):
+        """The pending timers and the clock, for restore().
+        Timers keep their callbacks, so they call back the same objects."""
+        return tuple(self._queue), dict(self._pending), self._counter, self.now
+
+    def restore(self, snapshot):
+        queue, pending, self._counter, self.now = snapshot
+        # a copy of a heap is still a heap
+        self._queue = list(queue)
+        self._pending = dict(pending)
+
+    def clear(self):
+        self._queue.clear()
+        self._pending.clear()
+
+    def __len__(self):
+        return len(self._pending)
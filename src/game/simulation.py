@@ -0,0 +1,399 @@
+"""
+Headless simulation core.
+Simulation owns the level, pacman and the ghosts and advances all of them one
+fixed tick at a time with `step`. The ghost mode, power up and ghost release
+timers run on the game state's scheduler, which is advanced by the same ticks.
+Deaths and cleared levels go through the game phases
+(playing -> dying -> respawn -> playing, playing -> level_clear -> respawn
+-> playing): the pauses are scheduled like any other timer and the entities
+are frozen outside of the playing phase, so nothing ever blocks.
+It never touches pygame: no display, no mixer and no real time clock, time
+is the number of ticks stepped so far. The sprites only render its state.
+The next level is prepared on a worker thread once few dots are left, the
+level clear pause then only swaps it in.
+"""
+from concurrent.futures import Future, ThreadPoolExecutor
+import hashlib
+from itertools import count
+import random
+
+from src.game.state_management import GameState
+from src.game.level import Level, level_exists
+from src.game.collectibles import CollectibleSet
+from src.game.pacman_model import PacmanModel
+from src.game.ghost_model import GHOST_MODELS, create_ghosts
+from src.configs import (DOT_POINT, POWER_POINT, DEATH_PAUSE, LEVEL_CLEAR_PAUSE,
+                         RESPAWN_PAUSE, LEVEL_PREFETCH_DOTS)
+from src.utils.profiler import NullProfiler, Profiler
+from src.log_handle import get_logger
+logger = get_logger(__name__)
+
+GHOST_SPANS = {name: f"update_{name}" for name, _ in GHOST_MODELS}
+
+
+def prepare_level(level_number, hooks=()):
+    """
+    Everything a level needs before play, built off the main thread.
+    `hooks` get the level and its collectibles on the same thread, e.g. for
+    the renderer to draw the maze ahead of time.
+    """
+    level = Level.load(level_number)
+    level.navigation
+    level.pacman_walls
+    collectibles = CollectibleSet(level.matrix)
+    for hook in hooks:
+        hook(level, collectibles)
+    return level, collectibles
+
+
+_rng_versions = count()
+
+
+class SnapshotRandom(random.Random):
+    """
+    random.Random that knows when it was last drawn from: `version` changes
+    on every draw, so saving or restoring a state it already holds is skipped.
+    Draws the same numbers as random.Random.
+    """
+    def __init__(self, seed=None):
+        super().__init__(seed)
+        self.version = next(_rng_versions)
+        self._saved = None
+        self._digest = None
+
+    def getrandbits(self, k):
+        self.version = next(_rng_versions)
+        return super().getrandbits(k)
+
+    def random(self):
+        self.version = next(_rng_versions)
+        return super().random()
+
+    def snapshot(self):
+        if self._saved is None or self._saved[0] != self.version:
+            self._saved = self.version, self.getstate()
+        return self._saved
+
+    def digest(self):
+        """Hex digest of the state, the same in every process."""
+        if self._digest is None or self._digest[0] != self.version:
+            state = repr(self.snapshot()[1]).encode()
+            self._digest = self.version, hashlib.blake2b(state, digest_size=8).hexdigest()
+        return self._digest[1]
+
+    def restore(self, snapshot):
+        version, state = snapshot
+        if version != self.version:
+            self.setstate(state)
+            self.version = version
+
+
+class SimulationSnapshot:
+    """A point of a simulation to go back to, see Simulation.snapshot()."""
+    __slots__ = ("tick", "game_state", "scheduler", "rng", "level", "collectibles",
+                 "dots", "pacman", "pacman_state", "ghosts", "ghost_states",
+                 "prefetch")
+
+
+class Simulation:
+    def __init__(self, game_state: GameState, seed: int | None = None,
+                 death_pause: int = DEATH_PAUSE,
+                 level_clear_pause: int = LEVEL_CLEAR_PAUSE,
+                 respawn_pause: int = RESPAWN_PAUSE,
+                 prefetch_dots: int | None = LEVEL_PREFETCH_DOTS,
+                 level: Level | None = None, profile: bool = True):
+        """`level` is an already prepared level to start on instead of
+        loading game_state.level, e.g. one shared by many simulations.
+        Without a seed one is picked and logged, so any game can be replayed.
+        `prefetch_dots` None prepares the next level on this thread when the
+        level is cleared, `profile` False keeps the steps out of the Profiler."""
+        self.game_state = game_state
+        if seed is None:
+            seed = random.getrandbits(63)
+            logger.info("simulation seed: %s", seed)
+        self.seed = seed
+        self.death_pause = death_pause
+        self.level_clear_pause = level_clear_pause
+        self.respawn_pause = respawn_pause
+        self.prefetch_dots = prefetch_dots
+        # called with (level, collectibles) on the prefetch thread
+        self.prefetch_hooks = []
+        # per entity logic spans, the profiler is a no-op until enabled
+        self.profiler = Profiler() if profile else NullProfiler()
+        # gets record(tick, direction) for every input that changes the direction
+        self.recorder = None
+        self.rng = SnapshotRandom(seed)
+        self.tick = 0
+        self.tick_ms = 1000 / self.game_state.fps
+        # events of the last step, e.g. ("dot", (r, c)), ("death", "blinky")
+        self.events = []
+        # cells eaten since the renderer last drained them
+        self.eaten_cells = []
+        # future of the (level, collectibles) played after this one
+        self._prefetch = None
+        self._executor = None
+        # levels prepared without the prefetch thread, by number
+        self._prepared = {}
+        self.level = None
+        self.collectibles = None
+        self.scheduler = self.game_state.scheduler
+        self.game_state.current_time = self.now
+        self.scheduler.advance(self.now)
+        if level is None:
+            self.load_level(self.game_state.level)
+        else:
+            self.game_state.level = level.number
+            self.set_level(level)
+        self.schedule_mode_change()
+
+    @property
+    def now(self):
+        """Simulation time in ms."""
+        return self.int_time(self.tick)
+
+    def load_level(self, level_number):
+        self.set_level(Level.load(level_number))
+
+    def set_level(self, level, collectibles=None):
+        if level is self.level:
+            # restarting the same level only puts the dots back
+            self.collectibles.reset()
+        else:
+            if self.level is not None:
+                # the ghosts' decisions only hold on their own level
+                self.level.navigation.clear_decisions()
+            self.collectibles = collectibles or CollectibleSet(level.matrix)
+        self.level = level
+        self.game_state.scared_time = self.level.power_up_time
+        self.game_state.mode_change_events = self.level.scatter_times
+        self.eaten_cells = []
+        self.build_entities()
+        logger.info("level %s loaded", level.number)
+
+    def build_entities(self):
+        level = self.level
+        self.pacman = PacmanModel(self.game_state,
+                                  level.matrix,
+                                  level.pacman_start,
+                                  level.start_pos,
+                                  self.collectibles,
+                                  level.pacman_walls)
+        self.ghosts = create_ghosts(self.game_state,
+                                    level.matrix,
+                                    level.ghost_den,
+                                    level.start_pos,
+                                    self.rng,
+                                    level.navigation)
+
+    def reset_stage(self):
+        self.game_state.is_pacman_dead = False
+        self.game_state.direction = ""
+        self.game_state.pacman_direction = None
+        self.build_entities()
+
+    def schedule_mode_change(self):
+        self.scheduler.schedule("ghost_mode",
+                                self.game_state.next_mode_change() * 1000,
+                                self.change_ghost_mode)
+
+    def change_ghost_mode(self):
+        game_state = self.game_state
+        if game_state.ghost_mode == 'scatter':
+            game_state.ghost_mode = 'chase'
+        elif game_state.ghost_mode == 'chase':
+            game_state.ghost_mode = 'scatter'
+        self.schedule_mode_change()
+
+    def power_down(self):
+        self.game_state.is_pacman_powered = False
+
+    def power_up(self):
+        self.game_state.is_pacman_powered = True
+        self.game_state.power_event_trigger_time = self.now
+        self.scheduler.schedule("power_up", self.game_state.scared_time,
+                                self.power_down)
+
+    def start_phase(self, phase, duration, callback):
+        self.game_state.phase = phase
+        self.scheduler.schedule("phase", duration, callback)
+
+    def check_phase(self):
+        if self.game_state.is_pacman_dead:
+            self.start_phase("dying", self.death_pause, self.respawn)
+        elif self.game_state.level_complete:
+            self.start_level_clear()
+
+    def respawn(self):
+        self.reset_stage()
+        if self.game_state.level_complete:
+            self.start_level_clear()
+        else:
+            self.start_phase("respawn", self.respawn_pause, self.resume)
+
+    def next_level_number(self):
+        """The following level, or this one again when it is the last."""
+        number = self.level.number + 1
+        return number if level_exists(number) else self.level.number
+
+    def prefetch_next_level(self):
+        """Starts preparing the next level, once per level."""
+        if self._prefetch is not None:
+            return
+        number = self.next_level_number()
+        if number == self.level.number:
+            # a restart only resets the collectibles, nothing to prepare
+            self._prefetch = Future()
+            self._prefetch.set_result((self.level, None))
+            return
+        if self.prefetch_dots is None:
+            # restores bring every clear back here, the level is loaded once
+            level = self._prepared.get(number)
+            if level is None:
+                level = self._prepared[number] = prepare_level(number)[0]
+            self._prefetch = Future()
+            self._prefetch.set_result((level, CollectibleSet(level.matrix)))
+            return
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1,
+                                                thread_name_prefix="level-prefetch")
+        logger.info("prefetching level %s", number)
+        self._prefetch = self._executor.submit(prepare_level, number,
+                                               tuple(self.prefetch_hooks))
+
+    def start_level_clear(self):
+        self.prefetch_next_level()
+        self.start_phase("level_clear", self.level_clear_pause, self.next_level)
+
+    def next_level(self):
+        # normally done long ago, only waits if the level was cleared
+        # right after the prefetch started
+        level, collectibles = self._prefetch.result()
+        self._prefetch = None
+        self.game_state.level = level.number
+        self.set_level(level, collectibles)
+        self.game_state.level_complete = False
+        self.start_phase("respawn", self.respawn_pause, self.resume)
+
+    def resume(self):
+        self.game_state.phase = "playing"
+
+    def step(self, direction: str | None = None):
+        """
+        Advances the game by one tick.
+        `direction` is the player input for this tick ("l", "r", "u", "d"),
+        None keeps the current one. Returns the game state.
+        """
+        game_state = self.game_state
+        self.events = []
+        self.collectibles.begin_tick()
+        self.tick += 1
+        now = game_state.current_time = self.now
+        if direction is not None and direction != game_state.direction:
+            game_state.direction = direction
+            if self.recorder is not None:
+                self.recorder.record(self.tick, direction)
+        self.scheduler.advance(now)
+        if game_state.phase != "playing":
+            return game_state
+
+        # the spans only wrap the updates while profiling, a disabled span
+        # still costs two calls per entity and tick
+        profiling = self.profiler.enabled
+        if profiling:
+            span = self.profiler.span
+            with span("update_pacman"):
+                eaten = self.pacman.update()
+        else:
+            eaten = self.pacman.update()
+        if eaten is not None:
+            tile, cell = eaten
+            self.events.append(eaten)
+            if self.prefetch_dots is not None and \
+                    self.collectibles.remaining <= self.prefetch_dots:
+                self.prefetch_next_level()
+            if tile == "power":
+                self.power_up()
+                game_state.points += POWER_POINT
+            else:
+                game_state.points += DOT_POINT
+        for ghost in self.ghosts:
+            if profiling:
+                with span(GHOST_SPANS[ghost.name]):
+                    collision = ghost.update()
+            else:
+                collision = ghost.update()
+            if collision is not None:
+                self.events.append((collision, ghost.name))
+        self.eaten_cells.extend(self.collectibles.changed)
+        self.check_phase()
+        return game_state
+
+    def snapshot(self):
+        """
+        Saves where the game is, to come back to with restore(), e.g. for
+        lookahead search, rollback or save states. Only the changing fields
+        are copied, the level is shared. The entities are kept along with
+        their fields, so pending timers still call back the right objects.
+        """
+        snapshot = SimulationSnapshot()
+        snapshot.tick = self.tick
+        snapshot.game_state = self.game_state.snapshot()
+        snapshot.scheduler = self.scheduler.snapshot()
+        snapshot.rng = self.rng.snapshot()
+        snapshot.level = self.level
+        snapshot.collectibles = self.collectibles
+        snapshot.dots = self.collectibles.snapshot()
+        snapshot.pacman = self.pacman
+        snapshot.pacman_state = self.pacman.snapshot()
+        snapshot.ghosts = self.ghosts
+        snapshot.ghost_states = [ghost.snapshot() for ghost in self.ghosts]
+        snapshot.prefetch = self._prefetch
+        return snapshot
+
+    def restore(self, snapshot: SimulationSnapshot):
+        """Goes back to a snapshot of this simulation, any number of times."""
+        self.tick = snapshot.tick
+        self.game_state.restore(snapshot.game_state)
+        self.scheduler.restore(snapshot.scheduler)
+        self.rng.restore(snapshot.rng)
+        self.level = snapshot.level
+        self.collectibles = snapshot.collectibles
+        self.collectibles.restore(snapshot.dots)
+        self.pacman = snapshot.pacman
+        self.pacman.restore(snapshot.pacman_state)
+        self.ghosts = snapshot.ghosts
+        for ghost, state in zip(self.ghosts, snapshot.ghost_states):
+            ghost.restore(state)
+        self._prefetch = snapshot.prefetch
+        self.events = []
+        self.eaten_cells = []
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def drain_eaten_cells(self):
+        eaten_cells = self.eaten_cells
+        self.eaten_cells = []
+        return eaten_cells
+
+    def run(self, ticks: int, inputs=None):
+        """
+        Steps `ticks` times as fast as possible.
+        `inputs` maps a tick number to the direction pressed on that tick.
+        """
+        inputs = inputs or {}
+        for _ in range(ticks):
+            self.step(inputs.get(self.tick + 1))
+        return self.game_state
+
+    def fast_forward(self, ms: int, inputs=None):
+        """Steps until `ms` of simulation time have passed."""
+        ticks = 0
+        target = self.now + ms
+        while self.int_time(self.tick + ticks) < target:
+            ticks += 1
+        return self.run(ticks, inputs)
+
+    def int_time(self, tick):
+        return int(tick * self.tick_ms)
@@ -0,0 +1,117 @@
+"""
+Cached HUD text.
+Labels are rasterized once and kept in a TextCache, numbers are composed
+from a DigitAtlas of pre-rendered glyphs, so a HUD element costs a couple of
+blits when its value changes and nothing otherwise.
+Everything is rendered onto the HUD background colour, which makes the
+surfaces opaque and cheap to blit.
+"""
+from collections import OrderedDict
+
+from pygame import Surface
+from pygame.font import Font
+
+from src.configs import Colors
+
+
+class TextCache:
+    """Rendered text surfaces by (text, color), the oldest are evicted past max_size."""
+    def __init__(self, font: Font, background=Colors.BLACK, max_size: int = 64):
+        self.font = font
+        self.background = background
+        self.max_size = max_size
+        self._surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, text: str, color):
+        key = (text, color)
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+        self.misses += 1
+        surface = self.font.render(text, True, color, self.background)
+        self._surfaces[key] = surface
+        if len(self._surfaces) > self.max_size:
+            self._surfaces.popitem(last=False)
+        return surface
+
+
+class DigitAtlas:
+    """Glyphs of one font and colour, composed into numbers without the font."""
+    GLYPHS = "0123456789-"
+
+    def __init__(self, font: Font, color, background=Colors.BLACK, max_numbers: int = 32):
+        self.background = background
+        self.max_numbers = max_numbers
+        # recently composed numbers, values like the fps flip back and forth
+        self._numbers = OrderedDict()
+        self.glyphs = {glyph: font.render(glyph, True, color, background)
+                       for glyph in self.GLYPHS}
+        self.height = max(glyph.get_height() for glyph in self.glyphs.values())
+
+    def render(self, value: int):
+        surface = self._numbers.get(value)
+        if surface is not None:
+            self._numbers.move_to_end(value)
+            return surface
+        surface = self.compose(value)
+        self._numbers[value] = surface
+        if len(self._numbers) > self.max_numbers:
+            self._numbers.popitem(last=False)
+        return surface
+
+    def compose(self, value: int):
+        text = str(value)
+        glyphs = [self.glyphs[char] for char in text]
+        surface = Surface((sum(glyph.get_width() for glyph in glyphs), self.height))
+        surface.fill(self.background)
+        x = 0
+        for glyph in glyphs:
+            surface.blit(glyph, (x, 0))
+            x += glyph.get_width()
+        return surface
+
+
+class HudElement:
+    """A cached label followed by a number read from `get_value`."""
+    def __init__(self, label: str, get_value, position: tuple,
+                 text_cache: TextCache, atlas: DigitAtlas, color=Colors.WHITE):
+        self.get_value = get_value
+        self.position = position
+        self._atlas = atlas
+        self._label = text_cache.render(label, color)
+        self._value = None
+        self._value_surface = None
+        self._drawn_rect = None
+
+    def _refresh(self):
+        value = self.get_value()
+        if value != self._value or self._value_surface is None:
+            self._value = value
+            self._value_surface = self._atlas.render(value)
+        return self._value_surface
+
+    def draw(self, surface: Surface):
+        value_surface = self._refresh()
+        x, y = self.position
+        label_rect = surface.blit(self._label, (x, y))
+        value_rect = surface.blit(value_surface, (label_rect.right, y))
+        self._drawn_rect = label_rect.union(value_rect)
+        return self._drawn_rect
+
+    def draw_dirty(self, surface: Surface):
+        """Draws only when the value changed, returns the rects to update."""
+        if self._drawn_rect is not None and self.get_value() == self._value:
+            return []
+        previous = self._drawn_rect
+        if previous is not None:
+            surface.fill(self._atlas.background, previous)
+        rect = self.draw(surface)
+        return [rect] if previous is None else [previous, rect]
+
+    def invalidate(self):
+        """Forces the next draw_dirty to draw, e.g. after a full redraw elsewhere."""
+        self._drawn_rect = None
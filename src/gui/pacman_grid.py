@@ -1,78 +1,78 @@
-import json
+from pygame import Rect, Surface
 
 from src.configs import *
 from src.sprites.pacman import Pacman
 from src.sprites.ghosts import GhostManager
-from src.utils.coord_utils import (get_coords_from_idx, place_elements_offset,
-                                   precompute_matrix_coords)
+from src.utils.coord_utils import get_coords_from_idx, place_elements_offset
 from src.utils.draw_utils import (draw_circle, draw_debug_rects, draw_rect)
+from src.utils.tile_grid import Tile
 from src.log_handle import get_logger
 logger = get_logger(__name__)
 
 class PacmanGrid:
-    def __init__(self, screen, game_state):
+    def __init__(self, screen, game_state, simulation):
         logger.info("initializing pacman grid")
         self.function_mapper = {
-            "void": self.draw_void,
-            "wall": self.draw_wall,
-            "dot": self.draw_dot,
-            "spoint": self.draw_special_point,
-            "power": self.draw_power,
-            "null": self.draw_void,
-            "elec": self.draw_elec,
+            Tile.VOID: self.draw_void,
+            Tile.WALL: self.draw_wall,
+            Tile.DOT: self.draw_dot,
+            Tile.SPOINT: self.draw_special_point,
+            Tile.POWER: self.draw_power,
+            Tile.NULL: self.draw_void,
+            Tile.ELEC: self.draw_elec,
         }
         self._screen = screen
         self._game_state = game_state
-        self._level_number = self._game_state.level
-        self.load_level(self._level_number)
+        self._simulation = simulation
+        # maze layers drawn ahead of time by the prefetch thread, by level
+        self._prebuilt = {}
+        self._simulation.prefetch_hooks.append(self.prebuild_layers)
+        self.load_level()
         logger.info("level loaded")
-        self.pacman = Pacman(
-            self._screen,
-            self._game_state,
-            self._matrix,
-            self._pacman_pos,
-            (self.start_x, self.start_y)
-        )
-        self.ghost = GhostManager(
-            self._screen,
-            self._game_state,
-            self._matrix,
-            self.ghost_den,
-            (self.start_x, self.start_y)
-        )
+        self.build_maze_layers()
+        self.pacman = Pacman(self._screen, self._simulation)
+        self.ghost = GhostManager(self._screen, self._simulation)
         logger.info("pacman created")
-        
-    def get_json(self, path):
-        with open(path) as fp:
-            payload = json.load(fp)
-        return payload
-
-    def load_level(self, level_number):
-        level_path = f"levels/level{level_number}.json"
-        level_json = self.get_json(level_path)
-        num_rows = level_json["num_rows"]
-        num_cols = level_json["num_cols"]
-        self.ghost_den = level_json['ghost_den']
-        self._matrix = level_json["matrix"]
-        self._pacman_pos = level_json["pacman_start"]
-        self.elec_pos = level_json['elec']
-        self.mode_change_times = level_json['scatter_times']
-        self.power_up_time = level_json['power_up_time']
-        self._game_state.scared_time = self.power_up_time
-        self._game_state.mode_change_events = self.mode_change_times
-        self.start_x, self.start_y = place_elements_offset(
-            SCREEN_WIDTH,
-            SCREEN_HEIGHT,
-            CELL_SIZE[0] * num_cols,
-            CELL_SIZE[0] * num_rows,
-            0.5,
-            0.5,
-        )
-        self._coord_matrix = precompute_matrix_coords(
-            self.start_x, self.start_y, CELL_SIZE[0], num_rows, num_cols
-        )
-        self.num_rows = num_rows
-        self.num_cols = num_cols
+
+    def load_level(self):
+        level = self._simulation.level
+        self._level = level
+        self._level_number = level.number
+        self.ghost_den = level.ghost_den
+        self._matrix = level.matrix
+        self._collectibles = self._simulation.collectibles
+        self._generation = self._collectibles.generation
+        self._restores = self._collectibles.restores
+        self._pacman_pos = level.pacman_start
+        self.elec_pos = level.elec
+        self.mode_change_times = level.scatter_times
+        self.power_up_time = level.power_up_time
+        self.start_x, self.start_y = level.start_pos
+        self.num_rows = level.num_rows
+        self.num_cols = level.num_cols
+
+    def sync_level(self):
+        """Picks up a level loaded or restarted by the simulation.
+        Returns True if it changed."""
+        collectibles = self._simulation.collectibles
+        if self._simulation.level is self._level and \
+                collectibles is self._collectibles:
+            if collectibles.restores != self._restores:
+                # back to a snapshot, only the dots it still had are drawn
+                self._generation = collectibles.generation
+                self._restores = collectibles.restores
+                self._maze_layer = self._static_layer.copy()
+                self.render_cells(self._maze_layer, self._level, collectibles)
+                return True
+            if collectibles.generation == self._generation:
+                return False
+            # same level restarted, every dot is back
+            self._generation = collectibles.generation
+            self._maze_layer = self._initial_maze_layer.copy()
+            return True
+        self.load_level()
+        self.build_maze_layers()
+        return True
 
     def draw_void(self, **kwargs): ...
 
@@ -82,51 +82,95 @@ class PacmanGrid:
             kwargs["y"],
             kwargs["w"],
             kwargs["h"],
-            self._screen,
+            kwargs["surface"],
             Colors.WALL_BLUE,
         )
 
     def draw_dot(self, **kwargs):
         dot_x = kwargs["x"] + kwargs["w"]
         dot_y = kwargs["y"] + kwargs["h"]
-        draw_rect(dot_x, dot_y, 5, 5, self._screen, Colors.WHITE)
+        draw_rect(dot_x, dot_y, 5, 5, kwargs["surface"], Colors.WHITE)
 
-    def draw_special_point(self): ...
+    def draw_special_point(self, **kwargs): ...
 
     def draw_power(self, **kwargs):
         circle_x = kwargs["x"] + kwargs["w"]
         circle_y = kwargs["y"] + kwargs["h"]
-        draw_circle(circle_x, circle_y, 7, self._screen, Colors.YELLOW)
+        draw_circle(circle_x, circle_y, 7, kwargs["surface"], Colors.YELLOW)
 
     def draw_elec(self, **kwargs):
-        draw_rect(kwargs["x"], kwargs["y"], kwargs["w"], 1, self._screen, Colors.RED)
-
-    def draw_level(self):
-        curr_x, curr_y = self.start_x, self.start_y
-        for _, row in enumerate(self._matrix):
-            for _, col in enumerate(row):
-                draw_func = self.function_mapper[col]
-                draw_func(x=curr_x, y=curr_y, w=CELL_SIZE[0], h=CELL_SIZE[0])
+        draw_rect(kwargs["x"], kwargs["y"], kwargs["w"], 1, kwargs["surface"], Colors.RED)
+
+    def render_cells(self, surface, level, collectibles, cell_types=None):
+        """Draws every cell (or only `cell_types`) of the level onto `surface`,
+        using coordinates local to the maze origin."""
+        curr_x, curr_y = 0, 0
+        for r, row in enumerate(level.matrix):
+            for c in range(len(row)):
+                tile = collectibles.tile(r, c)
+                if cell_types is None or tile in cell_types:
+                    draw_func = self.function_mapper[tile]
+                    draw_func(x=curr_x, y=curr_y, w=CELL_SIZE[0], h=CELL_SIZE[0],
+                              surface=surface)
                 curr_x += CELL_SIZE[0]
-            curr_x = self.start_x
+            curr_x = 0
             curr_y += CELL_SIZE[0]
 
-    def reset_stage(self):
-        self.pacman = Pacman(
-            self._screen,
-            self._game_state,
-            self._matrix,
-            self._pacman_pos,
-            (self.start_x, self.start_y)
-        )
-        self.ghost = GhostManager(
-            self._screen,
-            self._game_state,
-            self._matrix,
-            self.ghost_den,
-            (self.start_x, self.start_y)
-        )
-        
+    def render_layers(self, level, collectibles):
+        """
+        Bakes the maze into two surfaces:
+        the static layer holds only walls and elec bars, the maze layer holds
+        the full level (drawn in matrix order so walls still cover dots).
+        Eaten cells are later erased from the maze layer by copying the
+        static layer back over them.
+        """
+        # one extra cell because dots and power pellets are drawn
+        # on the bottom right corner of their cell.
+        size = ((level.num_cols + 1) * CELL_SIZE[0],
+                (level.num_rows + 1) * CELL_SIZE[0])
+        static_layer = Surface(size, 0, self._screen)
+        static_layer.fill(Colors.BLACK)
+        self.render_cells(static_layer, level, collectibles, (Tile.WALL, Tile.ELEC))
+        maze_layer = static_layer.copy()
+        self.render_cells(maze_layer, level, collectibles)
+        return static_layer, maze_layer
+
+    def prebuild_layers(self, level, collectibles):
+        """Prefetch hook, draws the next level on the prefetch thread."""
+        self._prebuilt[level] = self.render_layers(level, collectibles)
+
+    def build_maze_layers(self):
+        layers = self._prebuilt.pop(self._level, None)
+        if layers is None:
+            layers = self.render_layers(self._level, self._collectibles)
+        self._static_layer, self._maze_layer = layers
+        # the level as it starts, restarting it only copies this back
+        self._initial_maze_layer = self._maze_layer.copy()
+
+    def erase_cell(self, r, c):
+        # covers both the 5x5 dot and the radius 7 power pellet of the cell
+        rect = Rect((c + 1) * CELL_SIZE[0] - 7, (r + 1) * CELL_SIZE[0] - 7, 15, 15)
+        self._maze_layer.blit(self._static_layer, rect, rect)
+        return rect.move(self.start_x, self.start_y)
+
+    def update_level(self):
+        eaten_cells = self._simulation.drain_eaten_cells()
+        return [self.erase_cell(r, c) for r, c in eaten_cells]
+
+    def draw_level(self, surface=None):
+        self.update_level()
+        surface = surface or self._screen
+        surface.blit(self._maze_layer, (self.start_x, self.start_y))
+
+    def draw_dirty_level(self, surface):
+        """Copies only the cells eaten since the last frame onto `surface`
+        and returns their screen rects."""
+        dirty = self.update_level()
+        for rect in dirty:
+            surface.blit(self._maze_layer, rect,
+                         rect.move(-self.start_x, -self.start_y))
+        return dirty
+
     def draw_outliners(self):
         draw_debug_rects(
             self.start_x, self.start_y, 128, 140, 5, Colors.GREEN, self._screen
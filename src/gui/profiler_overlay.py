@@ -0,0 +1,81 @@
+"""
+On screen table of the profiler's p50 / p95 / p99 per stage, in ms, over
+the latest spans of each stage (Profiler.recent_percentiles).
+The table is re-rendered every `refresh_frames` frames only, the frames in
+between just blit the last one.
+"""
+from pygame import Surface, font
+
+from src.configs import Colors
+from src.utils.profiler import Profiler
+
+NAME_WIDTH = 110
+COLUMN_WIDTH = 55
+
+
+class ProfilerOverlay:
+    def __init__(self, position=(5, 200), refresh_frames=30):
+        self.position = position
+        self.refresh_frames = refresh_frames
+        self.profiler = Profiler()
+        font.init()
+        self.font = font.Font(None, 22)
+        self._surface = None
+        self._rendered_frame = None
+        self._drawn_rect = None
+
+    @property
+    def visible(self):
+        return self.profiler.enabled
+
+    def render(self):
+        rows = [("stage", "p50", "p95", "p99")]
+        for stage, values in sorted(self.profiler.recent_percentiles().items()):
+            rows.append((stage, *(f"{value / 1e6:.2f}" for value in values)))
+        line_height = self.font.get_linesize()
+        surface = Surface((NAME_WIDTH + COLUMN_WIDTH * 3, line_height * len(rows)))
+        surface.fill(Colors.BLACK)
+        for idx, (stage, *values) in enumerate(rows):
+            y = idx * line_height
+            surface.blit(self.font.render(stage, True, Colors.GREEN, Colors.BLACK), (0, y))
+            for column, value in enumerate(values, 1):
+                text = self.font.render(value, True, Colors.GREEN, Colors.BLACK)
+                # numbers are right aligned in their column
+                surface.blit(text, (NAME_WIDTH + COLUMN_WIDTH * column - text.get_width(), y))
+        self._surface = surface
+        self._rendered_frame = self.profiler.frame
+
+    def _refresh(self):
+        """Re-renders when due, returns True if the table changed."""
+        if self._rendered_frame is not None and \
+                self.profiler.frame - self._rendered_frame < self.refresh_frames:
+            return False
+        self.render()
+        return True
+
+    def draw(self, surface):
+        if not self.visible:
+            return None
+        self._refresh()
+        self._drawn_rect = surface.blit(self._surface, self.position)
+        return self._drawn_rect
+
+    def draw_dirty(self, surface):
+        """Draws onto `surface` when the table changed or the overlay was
+        toggled, returns the rects to update."""
+        previous = self._drawn_rect
+        if not self.visible:
+            if previous is None:
+                return []
+            surface.fill(Colors.BLACK, previous)
+            self._drawn_rect = None
+            return [previous]
+        if not self._refresh() and previous is not None:
+            return []
+        if previous is not None:
+            surface.fill(Colors.BLACK, previous)
+        rect = self.draw(surface)
+        return [rect] if previous is None else [previous, rect]
+
+    def invalidate(self):
+        self._drawn_rect = None
@@ -3,6 +3,7 @@ from pygame import font
 
 from src.game.state_management import GameState
 from src.configs import *
+from src.gui.hud import TextCache, DigitAtlas, HudElement
 from src.utils.coord_utils import place_elements_offset
 
 class ScoreScreen:
@@ -21,13 +22,34 @@ class ScoreScreen:
         )
         font.init()
         self.font = font.Font(None, 36)
+        self.text_cache = TextCache(self.font)
+        self.atlas = DigitAtlas(self.font, Colors.WHITE)
+        # frames per second measured by the game loop
+        self.fps = 0
+        self.elements = [
+            self.create_element("SCORE: ", lambda: self._game_state.points, 0),
+            self.create_element("HIGHSCORE: ", lambda: self._game_state.highscore, 300),
+            self.create_element("LEVEL: ", lambda: self._game_state.level, 600),
+        ]
+        if HUD_SHOW_FPS:
+            self.elements.append(self.create_element("FPS: ", lambda: round(self.fps), 850))
 
-    def draw_scores(self):
-        score_text = "SCORE: " + str(self._game_state.points)
-        score_surface = self.font.render(score_text, True, Colors.WHITE)
-        self._screen.blit(score_surface, (self.start_x, self.start_y))
+    def create_element(self, label, get_value, x_offset):
+        return HudElement(label, get_value, (self.start_x + x_offset, self.start_y),
+                          self.text_cache, self.atlas)
 
-        highscore_text = "HIGHSCORE: "+str(self._game_state.highscore)
-        hs_surface = self.font.render(highscore_text, True, Colors.WHITE)
-        self._screen.blit(hs_surface, (self.start_x + 300, self.start_y))
-        
\ No newline at end of file
+    def draw_scores(self, surface=None):
+        surface = surface or self._screen
+        return [element.draw(surface) for element in self.elements]
+
+    def draw_dirty_scores(self, surface):
+        """Redraws the elements onto `surface` only when their value changed.
+        Returns the rects that need to be pushed to the display."""
+        dirty = []
+        for element in self.elements:
+            dirty += element.draw_dirty(surface)
+        return dirty
+
+    def invalidate(self):
+        for element in self.elements:
+            element.invalidate()
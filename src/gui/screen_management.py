@@ -2,51 +2,76 @@ from src.configs import *
 from src.gui.pacman_grid import *
 from src.gui.loading_screen import LoadingScreen
 from src.gui.score_screen import ScoreScreen
+from src.gui.profiler_overlay import ProfilerOverlay
 from src.log_handle import get_logger
 
-from pygame.time import wait
+from pygame import Surface
 
 logger = get_logger(__name__)
 
 class ScreenManager:
-    def __init__(self, screen, game_state, all_sprites):
+    def __init__(self, screen, game_state, all_sprites, simulation,
+                 dirty_rendering=False):
         logger.info("screen manager initializing")
         self._screen = screen
         self._game_state = game_state
         self.all_sprites = all_sprites
+        self.simulation = simulation
+        self.dirty_rendering = dirty_rendering
+        self.background = None
+        self._full_redraw = True
+        if self.dirty_rendering:
+            self.background = Surface(self._screen.get_size(), 0, self._screen)
         self.loading_screen = LoadingScreen(self._screen)
-        self.pacman = PacmanGrid(screen, game_state)
+        self.pacman = PacmanGrid(screen, game_state, simulation)
         self.score_screen = ScoreScreen(self._screen, self._game_state)
+        self.profiler_overlay = ProfilerOverlay()
         logger.info("pacman grid created")
         self.all_sprites.add(self.pacman.pacman)
         for ghost in self.pacman.ghost.ghosts_list:
             self.all_sprites.add(ghost)
 
-    def pacman_dead_reset(self):
-        if self._game_state.is_pacman_dead:
-            self._game_state.is_pacman_dead = False
-            self._game_state.direction = ""
-            self._game_state.pacman_direction = None
-            self.all_sprites.empty()
-            self.pacman.reset_stage()
-            self.all_sprites.add(self.pacman.pacman)
-            for ghost in self.pacman.ghost.ghosts_list:
-                self.all_sprites.add(ghost)
-    
-    def check_level_complete(self):
-        if self._game_state.level_complete:
-            wait(2000)
-            self.all_sprites.empty()
-            self.pacman = PacmanGrid(self._screen, self._game_state)
-            self.score_screen = ScoreScreen(self._screen, self._game_state)
-            logger.info("pacman grid created")
-            self.all_sprites.add(self.pacman.pacman)
-            for ghost in self.pacman.ghost.ghosts_list:
-                self.all_sprites.add(ghost)
-            self._game_state.level_complete = False
+    def remember_positions(self):
+        """Called before every simulation tick so sprites can interpolate."""
+        for sprite in self.all_sprites:
+            sprite.remember_position()
+
+    def check_level_changed(self):
+        if self.pacman.sync_level():
+            logger.info("pacman grid rebuilt")
+            self._full_redraw = True
 
     def draw_screens(self):
+        self.check_level_changed()
         self.pacman.draw_level()
-        self.pacman_dead_reset()
         self.score_screen.draw_scores()
-        self.check_level_complete()
+        self.profiler_overlay.draw(self._screen)
+
+    def redraw_background(self):
+        self.background.fill(Colors.BLACK)
+        self.pacman.draw_level(self.background)
+        self.score_screen.invalidate()
+        self.profiler_overlay.invalidate()
+        self.score_screen.draw_dirty_scores(self.background)
+        self.profiler_overlay.draw_dirty(self.background)
+        self._screen.blit(self.background, (0, 0))
+        self._full_redraw = False
+        return [self._screen.get_rect()]
+
+    def draw_dirty_screens(self):
+        """
+        Dirty rect counterpart of draw_screens.
+        The maze and the scores are composed on `background` (which the
+        sprite group also uses to clear old sprite positions) and only the
+        changed parts are copied to the screen.
+        Returns the list of screen rects that changed.
+        """
+        self.check_level_changed()
+        if self._full_redraw:
+            return self.redraw_background()
+        dirty = self.pacman.draw_dirty_level(self.background)
+        dirty += self.score_screen.draw_dirty_scores(self.background)
+        dirty += self.profiler_overlay.draw_dirty(self.background)
+        for rect in dirty:
+            self._screen.blit(self.background, rect, rect)
+        return dirty
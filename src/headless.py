@@ -0,0 +1,39 @@
+"""
+Runs the simulation without pygame, as fast as the CPU allows.
+Used for bots, testing and analytics on machines without a display.
+"""
+import random
+import time
+
+from src.game.state_management import GameState
+from src.game.simulation import Simulation
+from src.game.replay import Recorder
+from src.log_handle import get_logger
+logger = get_logger(__name__)
+
+
+def random_inputs(ticks, seed=None, every=20):
+    """A direction change every `every` ticks, keyed by tick number."""
+    rng = random.Random(seed)
+    return {tick: rng.choice("lrud") for tick in range(1, ticks + 1, every)}
+
+
+def run_headless(ticks, seed=None, inputs=None, record=None):
+    """`record` is a path to save the run's replay to."""
+    game_state = GameState()
+    simulation = Simulation(game_state, seed)
+    recorder = Recorder(simulation) if record else None
+    if inputs is None:
+        inputs = random_inputs(ticks, simulation.seed)
+    start = time.perf_counter()
+    try:
+        simulation.run(ticks, inputs)
+    finally:
+        elapsed = time.perf_counter() - start
+        simulation.close()
+        if recorder is not None:
+            recorder.save(record)
+    logger.info("simulated %s ticks in %.3f s (%.0f ticks/s), points: %s",
+                ticks, elapsed, ticks / elapsed, game_state.points)
+    logger.info("ghost decisions: %s", simulation.level.navigation.decision_stats())
+    return simulation
@@ -1,29 +1,78 @@
+import math
 import sys
+import time
 
 import pygame
 import json
 
 from src.configs import *
+from src.ai.autopilot import Autopilot
 from src.game.event_management import EventHandler
 from src.game.state_management import GameState
+from src.game.simulation import Simulation
+from src.game.replay import Recorder
 from src.gui.screen_management import ScreenManager
 from src.sounds import SoundManager
+from src.sprites.sprite_cache import SpriteCache
+from src.utils.profiler import Profiler
 from src.log_handle import get_logger
 logger = get_logger(__name__)
 
+# simulation events that come with a sound
+EVENT_SOUNDS = {
+    "dot": "dot",
+    "power": "dot",
+    "eat_ghost": "eat_ghost",
+    "death": "death",
+}
+
 class GameRun:
-    def __init__(self):
+    def __init__(self, dirty_rendering=DIRTY_RENDERING, seed=None, speed=1,
+                 render_fps=RENDER_FPS, profile=False, profile_out=None,
+                 replay=None, record=None, autopilot=False, autopilot_workers=None):
+        """
+        `replay` plays a Replay instead of taking the keyboard's input,
+        `record` is the path the session's replay is saved to on exit.
+        `autopilot` lets an Autopilot play instead of the keyboard, searching
+        on `autopilot_workers` processes.
+        """
         logger.info("About to initialize pygame")
         pygame.init()
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption("Py-Pacman")
         logger.info("pygame initialized")
-        self.game_state = GameState()
+        SpriteCache().preload()
+        logger.info("sprites preloaded: %s", SpriteCache().stats())
+        self.replay = replay
+        if replay is None:
+            self.game_state = GameState()
+            self.simulation = Simulation(self.game_state, seed)
+        else:
+            self.simulation = replay.create_simulation()
+            self.game_state = self.simulation.game_state
         logger.info("game state object created")
+        self.record = record
+        self.recorder = Recorder(self.simulation) if record else None
+        self.autopilot = None
+        if autopilot and replay is None:
+            self.autopilot = Autopilot(self.simulation, autopilot_workers)
+        self.speed = speed
+        self.render_fps = render_fps
+        self.profiler = Profiler()
+        self.profiler.enabled = profile
+        self.profile_out = profile_out
+        self.tick_seconds = 1 / self.game_state.fps
+        self._accumulator = 0.0
+        logger.info("simulation created")
         self.events = EventHandler(self.screen, self.game_state)
         logger.info("event handler object created")
-        self.all_sprites = pygame.sprite.Group()
-        self.gui = ScreenManager(self.screen, self.game_state, self.all_sprites)
+        self.dirty_rendering = dirty_rendering
+        if self.dirty_rendering:
+            self.all_sprites = pygame.sprite.LayeredDirty()
+        else:
+            self.all_sprites = pygame.sprite.Group()
+        self.gui = ScreenManager(self.screen, self.game_state, self.all_sprites,
+                                 self.simulation, self.dirty_rendering)
         logger.info("screen manager object created")
 
     def initialize_highscore(self):
@@ -32,20 +81,47 @@ class GameRun:
             self.game_state.highscore = stats['highscore']
             self.game_state.mins_played = stats['mins_played']
     
-    def create_ghost_mode_event(self):
-        CUSTOM_EVENT = pygame.USEREVENT + 1
-        pygame.time.set_timer(CUSTOM_EVENT, 
-                              self.game_state.mode_change_events * 1000)
-        self.game_state.custom_event = CUSTOM_EVENT
-
     def initialize_sounds(self):
-        sound_manager = SoundManager()
+        self.sound_manager = sound_manager = SoundManager()
         sound_manager.load_sound("dot", "assets/sounds/pacman_chomp.wav", channel=0)
         sound_manager.load_sound("death","assets/sounds/pacman_death.wav", 0.7, 500, 1)
         sound_manager.load_sound("eat_ghost","assets/sounds/pacman_eatghost.wav", 0.6, 100, 2)
         sound_manager.set_background_music("assets/sounds/backgroud.mp3")
         sound_manager.play_background_music()
 
+    def step_simulation(self, frame_seconds):
+        """
+        Fixed timestep: runs as many simulation ticks as fit in the real time
+        that passed (scaled by `speed`), carrying the remainder to the next
+        frame. Returns the events of all the ticks and how far (0 to 1) the
+        render is between the last two ticks.
+        """
+        self._accumulator += min(frame_seconds, MAX_FRAME_TIME) * self.speed
+        events = []
+        while self._accumulator >= self.tick_seconds and self.game_state.running:
+            self.gui.remember_positions()
+            self.simulation.step(self.next_input())
+            events += self.simulation.events
+            self._accumulator -= self.tick_seconds
+        return events, self._accumulator / self.tick_seconds
+
+    def next_input(self):
+        """The direction of the next tick, from the replay when playing one."""
+        if self.autopilot is not None:
+            return self.autopilot.take_direction()
+        if self.replay is None:
+            return self.events.take_direction()
+        tick = self.simulation.tick + 1
+        if tick >= self.replay.ticks:
+            self.game_state.running = False
+        return self.replay.inputs.get(tick)
+
+    def play_event_sounds(self, events):
+        for event, _ in events:
+            sound = EVENT_SOUNDS.get(event)
+            if sound is not None:
+                self.sound_manager.play_sound(sound)
+
     def check_highscores(self):
         if self.game_state.points > self.game_state.highscore:
             self.game_state.highscore = self.game_state.points
@@ -55,24 +131,77 @@ class GameRun:
             json.dump({"highscore":self.game_state.highscore,
                        "mins_played": self.game_state.mins_played}, fp, indent=4)
             
-    def main(self):
-        clock = pygame.time.Clock()
-        dt = None
-        self.create_ghost_mode_event()
-        self.initialize_sounds()
-        self.initialize_highscore()
-        while self.game_state.running:
-            self.game_state.current_time = pygame.time.get_ticks()
-            for event in pygame.event.get():
-                self.events.handle_events(event)
+    def render_full(self, alpha):
+        profiler = self.profiler
+        with profiler.span("draw_screens"):
             self.screen.fill(Colors.BLACK)
             self.gui.draw_screens()
+        with profiler.span("sprites_update"):
+            self.all_sprites.update(alpha)
+        with profiler.span("sprites_draw"):
             self.all_sprites.draw(self.screen)
-            self.all_sprites.update(dt)
-            self.check_highscores()
+        self.check_highscores()
+        with profiler.span("display"):
             pygame.display.flip()
-            dt = clock.tick(self.game_state.fps)
-            dt /= 100
-        self.update_highscore()
+
+    def render_dirty(self, alpha):
+        profiler = self.profiler
+        with profiler.span("draw_screens"):
+            dirty = self.gui.draw_dirty_screens()
+        with profiler.span("sprites_update"):
+            self.all_sprites.update(alpha)
+        with profiler.span("sprites_draw"):
+            dirty += self.all_sprites.draw(self.screen, self.gui.background)
+        self.check_highscores()
+        with profiler.span("display"):
+            pygame.display.update(dirty)
+
+    def main(self):
+        render = self.render_dirty if self.dirty_rendering else self.render_full
+        self.initialize_sounds()
+        self.initialize_highscore()
+        try:
+            self.loop(render)
+        finally:
+            if self.recorder is not None:
+                self.recorder.save(self.record)
+            if self.autopilot is not None:
+                self.autopilot.close()
+        logger.info("sprite cache: %s", SpriteCache().stats())
+        if self.profile_out and self.profiler.count:
+            self.profiler.export(self.profile_out)
+            logger.info("profile written to %s", self.profile_out)
+        if self.replay is None:
+            self.update_highscore()
+        self.simulation.close()
         pygame.quit()
         sys.exit()
+
+    def loop(self, render):
+        clock = pygame.time.Clock()
+        frames, frame_time = 0, 0.0
+        previous = time.perf_counter()
+        profiler = self.profiler
+        while self.game_state.running:
+            frame_start = time.perf_counter()
+            with profiler.span("frame"):
+                with profiler.span("events"):
+                    for event in pygame.event.get():
+                        self.events.handle_events(event)
+                with profiler.span("simulation"):
+                    events, alpha = self.step_simulation(frame_start - previous)
+                previous = frame_start
+                render(alpha)
+                with profiler.span("sounds"):
+                    self.play_event_sounds(events)
+            profiler.next_frame()
+            frame_time += time.perf_counter() - frame_start
+            frames += 1
+            clock.tick(self.render_fps)
+            fps = clock.get_fps()
+            # uncapped frames can be too short to measure, get_fps is inf then
+            if math.isfinite(fps):
+                self.gui.score_screen.fps = fps
+        logger.info("render mode: %s, frames: %s, avg frame time: %.3f ms",
+                    "dirty rects" if self.dirty_rendering else "full flip",
+                    frames, frame_time * 1000 / max(frames, 1))
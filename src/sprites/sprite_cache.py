@@ -0,0 +1,63 @@
+from pygame import display, image, transform
+
+from src.configs import PACMAN, GHOSTS
+from src.sprites.sprite_configs import PACMAN_PATHS, GHOST_PATHS
+
+
+class SpriteCache:
+    """
+    Process wide cache of loaded and scaled sprite surfaces keyed on
+    (path, size), so stage resets and level transitions never go back to disk.
+    The surfaces are shared between sprites and must not be drawn on.
+    """
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super(SpriteCache, cls).__new__(cls, *args, **kwargs)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, "_initialized"):
+            self._initialized = True
+            self._surfaces = {}
+            self.hits = 0
+            self.misses = 0
+
+    def _load(self, path):
+        surface = image.load(path)
+        # convert_alpha needs a display mode, headless runs keep the raw surface
+        if display.get_surface() is not None:
+            surface = surface.convert_alpha()
+        return surface
+
+    def get(self, path, size):
+        """Returns the image at `path` scaled to `size`, loading it on a miss."""
+        key = (path, tuple(size))
+        surface = self._surfaces.get(key)
+        if surface is None:
+            self.misses += 1
+            surface = transform.scale(self._load(path), size)
+            self._surfaces[key] = surface
+        else:
+            self.hits += 1
+        return surface
+
+    def preload(self):
+        """Loads every pacman and ghost frame once."""
+        for paths in PACMAN_PATHS.values():
+            for path in paths:
+                self.get(path, PACMAN)
+        for paths in GHOST_PATHS.values():
+            for path in paths:
+                self.get(path, GHOSTS)
+
+    def stats(self):
+        return {"entries": len(self._surfaces),
+                "hits": self.hits,
+                "misses": self.misses}
+
+    def clear(self):
+        self._surfaces.clear()
+        self.hits = 0
+        self.misses = 0
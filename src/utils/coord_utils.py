@@ -1,3 +1,10 @@
+import math
+from itertools import accumulate
+from operator import add
+
+from src.utils.tile_grid import Tile
+
+
 def center_element(screen_width, screen_height, element_width, element_height):
     return place_elements_offset(
         screen_width, screen_height, element_width, element_height, 0.5, 0.6
@@ -45,49 +52,122 @@ def precompute_matrix_coords(start_x, start_y, cell_size, num_rows, num_cols):
     return matrix_coords
 
 
+def round_coord(value):
+    """Rounds half away from zero, the way pygame.Rect attributes are assigned."""
+    if value >= 0:
+        return math.floor(value + 0.5)
+    return -math.floor(0.5 - value)
+
+
+def rects_collide(rect1, rect2):
+    """Same test as pygame.Rect.colliderect for (x, y, w, h) tuples of ints."""
+    x1, y1, w1, h1 = rect1
+    x2, y2, w2, h2 = rect2
+    if not (w1 and h1 and w2 and h2):
+        return False
+    return x1 < x2 + w2 and y1 < y2 + h2 and x1 + w1 > x2 and y1 + h1 > y2
+
+
+def interpolate_coords(previous, current, alpha, max_jump):
+    """
+    Position `alpha` (0 to 1) of the way from `previous` to `current`.
+    Moves longer than `max_jump` (tunnel wraps, resets) snap to `current`.
+    """
+    x1, y1 = previous
+    x2, y2 = current
+    if abs(x2 - x1) > max_jump or abs(y2 - y1) > max_jump:
+        return current
+    return x1 + (x2 - x1) * alpha, y1 + (y2 - y1) * alpha
+
+
 def get_idx_from_coords(x_coord, y_coord, start_x, start_y, cell_size):
     x_pos = int((x_coord - start_x) // cell_size)
     y_pos = int((y_coord - start_y) // cell_size)
     return y_pos, x_pos  # in matrix, horizontal is columns and vertical are rows
 
-def get_tiny_matrix(matrix, cell_size, pacman_speed):
+def get_tiny_occupancy(matrix, cell_size, pacman_speed, blocked=(Tile.WALL,)):
+    """
+    Matrix expanded to pacman steps (cell_size // pacman_speed per cell),
+    one bytearray per row with 1 where the cell type is in `blocked`.
+    """
     sub_div = cell_size // pacman_speed
-    num_rows = len(matrix) * sub_div
-    num_cols = len(matrix[0]) * sub_div
-    tiny_matrix = [["null"] * num_cols for _ in range(num_rows)]
-    tiny_r, tiny_c = 0, 0
+    occupancy = []
     for row in matrix:
+        tiny_row = bytearray()
         for cell in row:
-            if cell != "wall":
-                cell = "null"
-            for sx in range(sub_div):
-                for sy in range(sub_div):
-                    tiny_matrix[tiny_r + sx][tiny_c + sy] = cell
-            tiny_c += sub_div
-        tiny_r += sub_div
-        tiny_c = 0
-    return tiny_matrix
-
-def get_movable_locations(matrix, max_cell_size=20, 
-                          cell_size=20):
-    movables = []
-    rows, cols = len(matrix), len(matrix[0])  # Matrix dimensions
-    subdiv = max_cell_size // cell_size
-
-    def is_free(r, c):
-        return 0 <= r < rows and 0 <= c < cols and matrix[r][c] not in ('wall', 'elec')
-    
-    def is_valid(r, c):
-        for x in range(subdiv*2):
-            for y in range(subdiv*2):
-                if not is_free(r+x, c+y):
+            tiny_row += (b"\x01" if cell in blocked else b"\x00") * sub_div
+        occupancy.extend(bytearray(tiny_row) for _ in range(sub_div))
+    return occupancy
+
+
+class SummedAreaTable:
+    """
+    Integral image of a 0/1 grid, counts the set cells of any rectangle
+    with four lookups.
+    """
+    def __init__(self, grid):
+        self.num_rows = len(grid)
+        self.num_cols = len(grid[0])
+        width = self.num_cols + 1
+        self.width = width
+        # sums[(r * width) + c] = set cells above and left of (r, c), exclusive
+        sums = [0] * width
+        above = sums
+        for row in grid:
+            below = [0]
+            below.extend(map(add, above[1:], accumulate(row)))
+            sums.extend(below)
+            above = below
+        self.sums = sums
+
+    def count(self, top, left, bottom, right):
+        """Set cells in rows [top, bottom) and columns [left, right)."""
+        sums, width = self.sums, self.width
+        return sums[bottom * width + right] - sums[top * width + right] \
+            - sums[bottom * width + left] + sums[top * width + left]
+
+    def is_clear(self, top, left, bottom, right):
+        return self.count(top, left, bottom, right) == 0
+
+    def _spans(self, start, end, size):
+        # negative starts wrap around like python list indexing does
+        if start < 0:
+            if end <= 0:
+                return ((start + size, end + size),)
+            return ((start + size, size), (0, end))
+        return ((start, end),)
+
+    def is_strip_clear(self, row, col, height, width):
+        """
+        Rectangle of height x width from (row, col), where a row or column of
+        -1 means the last one, the same cells matrix[row + i][col + j] reads.
+        """
+        if row >= 0 and col >= 0:
+            # count() inlined, this is pacman's per tick wall check
+            sums, stride = self.sums, self.width
+            top, bottom = row * stride, (row + height) * stride
+            right = col + width
+            return sums[bottom + right] - sums[top + right] \
+                - sums[bottom + col] + sums[top + col] == 0
+        for top, bottom in self._spans(row, row + height, self.num_rows):
+            for left, right in self._spans(col, col + width, self.num_cols):
+                if self.count(top, left, bottom, right):
                     return False
         return True
 
-    for r_idx in range(rows):
-        for c_idx in range(cols):
-            if (r_idx + (subdiv*2) <= rows and \
-                 c_idx + (subdiv*2) <= cols) and is_valid(r_idx, c_idx):
+
+def get_movable_locations(matrix, max_cell_size=20,
+                          cell_size=20):
+    rows, cols = len(matrix), len(matrix[0])  # Matrix dimensions
+    subdiv = max_cell_size // cell_size
+    block = subdiv * 2
+    blocked = SummedAreaTable(
+        [[cell in (Tile.WALL, Tile.ELEC) for cell in row] for row in matrix]
+    )
+    movables = []
+    for r_idx in range(rows - block + 1):
+        for c_idx in range(cols - block + 1):
+            if blocked.is_clear(r_idx, c_idx, r_idx + block, c_idx + block):
                 movables.append((r_idx, c_idx))
 
     return movables
@@ -96,8 +176,8 @@ def is_any_wall(matrix, x, y):
     rows, cols = len(matrix), len(matrix[0])  # Matrix dimensions
 
     def is_wall(r, c):
-        """Check if the cell is 'wall' and within bounds."""
-        return 0 <= r < rows and 0 <= c < cols and matrix[r][c] == 'wall'
+        """Check if the cell is a wall and within bounds."""
+        return 0 <= r < rows and 0 <= c < cols and matrix[r][c] == Tile.WALL
 
     # Check all four positions
     return (
@@ -0,0 +1,186 @@
+"""
+All pairs maze distances.
+A BFS from every walkable ghost cell gives the shortest path length and the
+first step between any two cells, so distance and path queries become
+array lookups. Tables are cached on disk, keyed by the level digest.
+"""
+import os
+import struct
+import sys
+from array import array
+from collections import deque
+
+from src.utils.navigation_utils import NavigationIndex, DIRECTIONS, DIRECTION_DELTAS
+from src.log_handle import get_logger
+logger = get_logger(__name__)
+
+UNREACHABLE = 0xFFFF
+NO_HOP = 0xFF
+_MAGIC = b"PACDIST2"
+_HEADER = struct.Struct("<8sHH")
+# row, column of a cell, little endian like the header and the tables
+_CELL = struct.Struct("<HH")
+# tables already loaded by this process, keyed by level digest
+_loaded_tables = {}
+
+
+class DistanceTable:
+    def __init__(self, num_cols: int, cells: list, distances: array, next_hops: array):
+        self.num_cols = num_cols
+        self.cells = cells
+        self.size = len(cells)
+        self._index = {cell: idx for idx, cell in enumerate(cells)}
+        # size x size, row = source, column = destination
+        self.distances = distances
+        self.next_hops = next_hops
+
+    @classmethod
+    def build(cls, navigation: NavigationIndex):
+        cells = navigation.walkable_cells()
+        index = {cell: idx for idx, cell in enumerate(cells)}
+        size = len(cells)
+        distances = array("H", [UNREACHABLE]) * (size * size)
+        next_hops = array("B", [NO_HOP]) * (size * size)
+        # neighbours by index and the direction that reaches them
+        adjacency = []
+        for cell in cells:
+            edges = []
+            for direction in DIRECTIONS:
+                if not navigation.can_move(cell, direction):
+                    continue
+                dr, dc = DIRECTION_DELTAS[direction]
+                neighbor = (cell[0] + dr, (cell[1] + dc) % navigation.num_cols)
+                if neighbor in index:
+                    edges.append((index[neighbor], DIRECTIONS.index(direction)))
+            adjacency.append(edges)
+
+        for source in range(size):
+            row = source * size
+            distances[row + source] = 0
+            queue = deque()
+            for neighbor, direction in adjacency[source]:
+                if distances[row + neighbor] == UNREACHABLE:
+                    distances[row + neighbor] = 1
+                    next_hops[row + neighbor] = direction
+                    queue.append(neighbor)
+            while queue:
+                current = queue.popleft()
+                distance = distances[row + current] + 1
+                first_hop = next_hops[row + current]
+                for neighbor, _ in adjacency[current]:
+                    if distances[row + neighbor] == UNREACHABLE:
+                        distances[row + neighbor] = distance
+                        next_hops[row + neighbor] = first_hop
+                        queue.append(neighbor)
+        return cls(navigation.num_cols, cells, distances, next_hops)
+
+    def save(self, path):
+        # written next to the final path and renamed over it, so an
+        # interrupted save never leaves a partial table behind
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            self._write(temp_path)
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
+    def _write(self, path):
+        with open(path, "wb") as fp:
+            fp.write(_HEADER.pack(_MAGIC, self.num_cols, self.size))
+            for cell in self.cells:
+                fp.write(_CELL.pack(*cell))
+            distances = self.distances
+            if sys.byteorder == "big":
+                distances = array("H", distances)
+                distances.byteswap()
+            distances.tofile(fp)
+            # one byte per hop, the same on every host
+            self.next_hops.tofile(fp)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as fp:
+            header = fp.read(_HEADER.size)
+            if len(header) != _HEADER.size:
+                raise EOFError(f"{path} is truncated")
+            magic, num_cols, size = _HEADER.unpack(header)
+            if magic != _MAGIC:
+                raise ValueError(f"{path} is not a distance table")
+            raw_cells = fp.read(size * _CELL.size)
+            if len(raw_cells) != size * _CELL.size:
+                raise EOFError(f"{path} is truncated")
+            cells = list(_CELL.iter_unpack(raw_cells))
+            distances = array("H")
+            distances.fromfile(fp, size * size)
+            if sys.byteorder == "big":
+                distances.byteswap()
+            next_hops = array("B")
+            next_hops.fromfile(fp, size * size)
+        return cls(num_cols, cells, distances, next_hops)
+
+    @classmethod
+    def for_level(cls, navigation: NavigationIndex, digest: str, cache_dir: str):
+        """The table of a level: from this process, from the disk cache or built."""
+        table = _loaded_tables.get(digest)
+        if table is not None:
+            return table
+        path = os.path.join(cache_dir, f"{digest}.dist")
+        try:
+            table = cls.load(path)
+        except (OSError, ValueError, EOFError):
+            table = cls.build(navigation)
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                table.save(path)
+            except OSError:
+                logger.warning("could not write distance cache %s", path)
+            logger.info("distance table built for %s cells", table.size)
+        _loaded_tables[digest] = table
+        return table
+
+    def _pair(self, source, target):
+        source_idx = self._index.get(tuple(source))
+        target_idx = self._index.get(tuple(target))
+        if source_idx is None or target_idx is None:
+            return None
+        return source_idx * self.size + target_idx
+
+    def distance(self, source, target):
+        """Shortest number of tile moves, None if either cell is not walkable
+        or the target can not be reached."""
+        pair = self._pair(source, target)
+        if pair is None or self.distances[pair] == UNREACHABLE:
+            return None
+        return self.distances[pair]
+
+    def next_hop(self, source, target):
+        """Direction delta of the first move on a shortest path."""
+        pair = self._pair(source, target)
+        if pair is None or self.next_hops[pair] == NO_HOP:
+            return None
+        return DIRECTION_DELTAS[DIRECTIONS[self.next_hops[pair]]]
+
+    def path(self, source, target):
+        """Cells of a shortest path from source to target, both included."""
+        if self.distance(source, target) is None:
+            return []
+        path = [tuple(source)]
+        current = tuple(source)
+        while current != tuple(target):
+            dr, dc = self.next_hop(current, target)
+            current = (current[0] + dr, (current[1] + dc) % self.num_cols)
+            path.append(current)
+        return path
+
+    def nearest(self, source, targets):
+        """The closest of `targets` and its distance, (None, None) if none is reachable."""
+        best, best_distance = None, None
+        for target in targets:
+            distance = self.distance(source, target)
+            if distance is not None and (best_distance is None or distance < best_distance):
+                best, best_distance = target, distance
+        return best, best_distance
@@ -1,10 +1,12 @@
 import math
 
+from src.utils.tile_grid import Tile, TileGrid
+
 DIRECTION_MAPPER = {"up":[(-1, 0), (-1, 1)],
                     "left":[(0, -1), (1, -1)],
                     "down":[(2, 0), (2, 1)],
                     "right":[(0, 2), (1, 2)]}
-BLOCKERS = ['wall', 'elec']
+BLOCKERS = frozenset((Tile.WALL, Tile.ELEC))
 
 def get_is_move_valid(curr_pos, direction, matrix):
     next_indices = DIRECTION_MAPPER[direction]
@@ -21,7 +23,7 @@ def eucliad_distance(point1, point2):
 
 def get_direction(ghost_matrix_pos: tuple[int, int],
                 target_matrix_pos: tuple[int, int],
-                matrix: list[list[str]],
+                matrix: TileGrid,
                 prev: tuple[int, int]):
     g1, g2 = ghost_matrix_pos
     t1, t2 = target_matrix_pos
@@ -52,7 +54,7 @@ def get_direction(ghost_matrix_pos: tuple[int, int],
     return next_direction_mapper[target_dir]
 
 def get_is_intersection(ghost_matrix_pos: tuple[int, int], 
-                        matrix: list[list[str]],
+                        matrix: TileGrid,
                         prev=None):
     possible_moves = 0
     for k, _ in DIRECTION_MAPPER.items():
@@ -1,23 +1,70 @@
 import heapq
+from collections import deque
 
-def a_star(matrix, start, target, subdivs=4):
+from src.utils.tile_grid import Tile
+
+# Directions: Up, Down, Left, Right
+DIRECTIONS = [
+    (-1, 0), (1, 0), (0, -1), (0, 1)
+]
+
+
+def heuristic(a, b):
+    """Calculate Manhattan distance."""
+    return abs(a[0] - b[0]) + abs(a[1] - b[1])
+
+
+def build_clearance(matrix, subdivs=4):
+    """
+    Flat row major bytearray, 1 where a (subdivs*2) x (subdivs*2) block
+    with its top left corner on the cell is inside the matrix and wall free.
+    Built from a summed area table of walls, so every lookup is O(1).
+    """
     rows, cols = len(matrix), len(matrix[0])
+    block = subdivs * 2
+    # walls[r][c] = number of walls above and left of (r, c), exclusive
+    walls = [[0] * (cols + 1) for _ in range(rows + 1)]
+    wall = Tile.WALL
+    for r in range(rows):
+        row_total = 0
+        above, current = walls[r], walls[r + 1]
+        for c in range(cols):
+            row_total += matrix[r][c] == wall
+            current[c + 1] = above[c + 1] + row_total
+    clearance = bytearray(rows * cols)
+    for r in range(rows - block + 1):
+        top, bottom = walls[r], walls[r + block]
+        for c in range(cols - block + 1):
+            if bottom[c + block] - top[c + block] - bottom[c] + top[c] == 0:
+                clearance[r * cols + c] = 1
+    return clearance
+
+
+class PathFinder:
+    """
+    Grid path finding for a block of subdivs*2 cells.
+    Keeps the clearance map of the matrix so repeated queries only pay
+    for the search itself.
+    """
+    def __init__(self, matrix, subdivs=4):
+        self.rows, self.cols = len(matrix), len(matrix[0])
+        self.subdivs = subdivs
+        self.clearance = build_clearance(matrix, subdivs)
+
+    def is_valid(self, pos):
+        x, y = pos
+        return 0 <= x < self.rows and 0 <= y < self.cols \
+            and self.clearance[x * self.cols + y] == 1
 
-    def is_valid(x, y):
-        """Check if all cells in the subdivs x subdivs block are valid."""
-        if not (0 <= x < rows and 0 <= y < cols):
-            return False
-        for dx in range(subdivs*2):
-            for dy in range(subdivs*2):
-                if x + dx >= rows or y + dy >= cols or matrix[x + dx][y + dy] == 'wall':
-                    return False
-        return True
-
-    def heuristic(a, b):
-        """Calculate Manhattan distance."""
-        return abs(a[0] - b[0]) + abs(a[1] - b[1])
-    
-    def path_builder(current, came_from):
+    def _neighbors(self, pos):
+        x, y = pos
+        for dx, dy in DIRECTIONS:
+            neighbor = (x + dx, y + dy)
+            if self.is_valid(neighbor):
+                yield neighbor
+
+    @staticmethod
+    def _path_builder(start, current, came_from):
         path = []
         while current in came_from:
             path.append(current)
@@ -25,44 +72,82 @@ def a_star(matrix, start, target, subdivs=4):
         path.append(start)
         return path[::-1]
 
-    # Directions: Up, Down, Left, Right
-    directions = [
-        (-1, 0), (1, 0), (0, -1), (0, 1)
-    ]
+    def find(self, start, target):
+        """
+        Shortest path from start to target, both included.
+        When the target can not be reached the path leads to the explored
+        cell closest to it (Manhattan distance).
+        """
+        # (f, h, position): equal f prefers the cell nearer the target,
+        # then the smaller position, so results never depend on push order
+        start_h = heuristic(start, target)
+        open_set = [(start_h, start_h, start)]
+        g_score = {start: 0}
+        came_from = {}
+        closed = set()
+        closest_node, closest_distance = start, start_h
 
-    open_set = []
-    heapq.heappush(open_set, (0, start))  # (priority, position)
-    came_from = {}  # To reconstruct the path
+        while open_set:
+            _, _, current = heapq.heappop(open_set)
+            if current in closed:
+                # stale entry, the cell was pushed again with a better g
+                continue
+            if current == target:
+                return self._path_builder(start, current, came_from)
+            closed.add(current)
 
-    g_score = {start: 0}
-    f_score = {start: heuristic(start, target)}
-    closest_node = start
-    closest_distance = heuristic(start, target)
+            tentative_g_score = g_score[current] + 1  # All moves cost 1
+            for neighbor in self._neighbors(current):
+                if neighbor in closed:
+                    continue
+                if tentative_g_score < g_score.get(neighbor, tentative_g_score + 1):
+                    came_from[neighbor] = current
+                    g_score[neighbor] = tentative_g_score
+                    h_dist = heuristic(neighbor, target)
+                    heapq.heappush(open_set, (tentative_g_score + h_dist, h_dist, neighbor))
+                    if h_dist < closest_distance:
+                        closest_node, closest_distance = neighbor, h_dist
 
-    while open_set:
-        _, current = heapq.heappop(open_set)
+        return self._path_builder(start, closest_node, came_from)
 
-        if current == target:
-            # Reconstruct path
-            return path_builder(current, came_from) #
-            
+    def paths_to_many(self, start, targets):
+        """
+        Shortest paths from start to every target with a single breadth
+        first search, stopping once all targets are reached.
+        Returns {target: path}. Unreachable targets get find's path, to the
+        explored cell closest to them.
+        """
+        remaining = set(targets)
+        paths = {}
+        came_from = {}
+        seen = {start}
+        queue = deque([start])
+        if start in remaining:
+            paths[start] = [start]
+            remaining.discard(start)
 
-        for dx, dy in directions:
-            neighbor = (current[0] + dx, current[1] + dy)
+        while queue and remaining:
+            current = queue.popleft()
+            for neighbor in self._neighbors(current):
+                if neighbor in seen:
+                    continue
+                seen.add(neighbor)
+                came_from[neighbor] = current
+                queue.append(neighbor)
+                if neighbor in remaining:
+                    paths[neighbor] = self._path_builder(start, neighbor, came_from)
+                    remaining.discard(neighbor)
 
-            if is_valid(neighbor[0], neighbor[1]):
-                tentative_g_score = g_score[current] + 1  # All moves cost 1
-                if neighbor not in g_score or tentative_g_score < g_score[neighbor]:
-                    came_from[neighbor] = current
-                    g_score[neighbor] = tentative_g_score
-                    f_score[neighbor] = tentative_g_score + heuristic(neighbor, target)
+        # the breadth first search has no closest cell of its own: which of
+        # the equally close cells wins and the path to it are find's
+        for target in remaining:
+            paths[target] = self.find(start, target)
+        return paths
+
+
+def a_star(matrix, start, target, subdivs=4):
+    return PathFinder(matrix, subdivs).find(start, target)
 
-                    if neighbor not in [pos for _, pos in open_set]:
-                        heapq.heappush(open_set, (f_score[neighbor], neighbor))
-                
-                h_dist = heuristic(neighbor, target)
-                if h_dist < closest_distance:
-                    closest_node = neighbor
-                    closest_distance = h_dist
 
-    return path_builder(closest_node, came_from)  #
\ No newline at end of file
+def paths_to_many(matrix, start, targets, subdivs=4):
+    return PathFinder(matrix, subdivs).paths_to_many(start, targets)
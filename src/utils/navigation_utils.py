@@ -0,0 +1,186 @@
+"""
+Navigation index for the ghosts.
+The level matrix is compiled once into a per cell bitmask of the moves
+get_is_move_valid allows, so a ghost decision becomes a couple of table
+lookups instead of rebuilding mappers and scanning the matrix.
+It also keeps the tunnel wrap links and the maze collapsed into a graph of
+junctions joined by weighted corridors.
+Ghost decisions are memoized in a bounded LRU cache keyed on (cell, target,
+forbidden move): the index belongs to the level, so every ghost of every
+simulation on the level shares it and a new level starts with an empty one.
+"""
+from functools import lru_cache
+
+from src.configs import GHOST_DECISION_CACHE_SIZE
+from src.utils.ghost_movement_utils import (BLOCKERS, get_direction,
+                                            get_is_intersection,
+                                            get_is_move_valid)
+from src.utils.tile_grid import TileGrid
+
+# same order get_direction tries them in, it decides ties
+DIRECTIONS = ["up", "left", "down", "right"]
+DIRECTION_DELTAS = {"up": (-1, 0), "left": (0, -1), "down": (1, 0), "right": (0, 1)}
+DIRECTION_BITS = {"up": 1, "left": 2, "down": 4, "right": 8}
+POPCOUNT = [bin(mask).count("1") for mask in range(16)]
+
+
+class NavigationIndex:
+    def __init__(self, matrix: TileGrid,
+                 decision_cache_size: int = GHOST_DECISION_CACHE_SIZE):
+        self._matrix = matrix
+        self.num_rows = len(matrix)
+        self.num_cols = len(matrix[0])
+        self.moves = bytearray(self.num_rows * self.num_cols)
+        # cells get_is_move_valid can not evaluate, they keep using it
+        # so they fail the same way
+        self._unchecked = set()
+        self._candidates = [()] * (self.num_rows * self.num_cols)
+        self.wrap_links = {}
+        self.compile_moves()
+        self.wrap_links = {link: pos for link, pos in self.wrap_links.items()
+                           if self.is_walkable(link[0])}
+        self.junctions = self.collapse_corridors()
+        # find_direction through the decision cache
+        self.get_direction = lru_cache(maxsize=decision_cache_size)(self.find_direction)
+
+    def compile_moves(self):
+        for r in range(self.num_rows):
+            for c in range(self.num_cols):
+                idx = r * self.num_cols + c
+                mask = 0
+                try:
+                    for direction in DIRECTIONS:
+                        if get_is_move_valid((r, c), direction, self._matrix):
+                            mask |= DIRECTION_BITS[direction]
+                except IndexError:
+                    self._unchecked.add((r, c))
+                    continue
+                self.moves[idx] = mask
+                candidates = []
+                for direction in DIRECTIONS:
+                    if not mask & DIRECTION_BITS[direction]:
+                        continue
+                    dr, dc = DIRECTION_DELTAS[direction]
+                    next_r, next_c = r + dr, c + dc
+                    if next_r >= self.num_rows or next_r < 0:
+                        continue
+                    candidates.append(((dr, dc), next_r, next_c))
+                    if not 0 <= next_c < self.num_cols:
+                        self.wrap_links[((r, c), direction)] = (next_r, next_c % self.num_cols)
+                self._candidates[idx] = tuple(candidates)
+
+    def _index(self, pos):
+        r, c = pos
+        if 0 <= r < self.num_rows and 0 <= c < self.num_cols and \
+                pos not in self._unchecked:
+            return r * self.num_cols + c
+        return None
+
+    def is_compiled(self, pos):
+        """Whether the moves of the cell are in the precompiled tables."""
+        return self._index(pos) is not None
+
+    def can_move(self, pos, direction):
+        idx = self._index(pos)
+        if idx is None:
+            return get_is_move_valid(pos, direction, self._matrix)
+        return bool(self.moves[idx] & DIRECTION_BITS[direction])
+
+    def is_intersection(self, pos, prev=None):
+        """get_is_intersection: more than one move left once `prev` is excluded."""
+        idx = self._index(pos)
+        if idx is None:
+            return get_is_intersection(pos, self._matrix, prev)
+        mask = self.moves[idx]
+        if prev is not None:
+            mask &= ~DIRECTION_BITS[prev]
+        return POPCOUNT[mask] > 1
+
+    def find_direction(self, pos, target, prev):
+        """
+        get_direction from the precompiled candidates: the legal move closest
+        (straight line) to `target` that is not `prev`. Uncached, the ghosts
+        call it through get_direction.
+        """
+        idx = self._index(pos)
+        if idx is None:
+            return get_direction(pos, target, self._matrix, prev)
+        t1, t2 = target
+        curr_min = None
+        target_dir = None
+        for delta, next_r, next_c in self._candidates[idx]:
+            if delta == prev:
+                continue
+            # squared distance orders the same as the euclidean one
+            distance = (next_r - t1) ** 2 + (next_c - t2) ** 2
+            if curr_min is None or distance < curr_min:
+                curr_min = distance
+                target_dir = delta
+        if target_dir is None:
+            raise ValueError("Oh my god, I don't know what to do, im crashing the game")
+        return target_dir
+
+    def decision_stats(self):
+        info = self.get_direction.cache_info()
+        lookups = info.hits + info.misses
+        return {"entries": info.currsize,
+                "hits": info.hits,
+                "misses": info.misses,
+                "hit_rate": round(info.hits / lookups, 3) if lookups else 0.0}
+
+    def clear_decisions(self):
+        self.get_direction.cache_clear()
+
+    def is_walkable(self, pos):
+        """Whether the 2x2 ghost footprint at `pos` is free."""
+        r, c = pos
+        if not (0 <= r < self.num_rows - 1 and 0 <= c < self.num_cols):
+            return False
+        for dr in range(2):
+            for dc in range(2):
+                # the footprint may hang over the tunnel exit
+                if c + dc < self.num_cols and self._matrix[r + dr][c + dc] in BLOCKERS:
+                    return False
+        return True
+
+    def walkable_cells(self):
+        """Every cell a ghost can stand on, in row major order."""
+        return [(r, c) for r in range(self.num_rows) for c in range(self.num_cols)
+                if self.is_walkable((r, c)) and self._index((r, c)) is not None]
+
+    def neighbors(self, pos):
+        """Cells a ghost at `pos` can move to, tunnel wraps included."""
+        idx = self._index(pos)
+        if idx is None:
+            return []
+        return [(next_r, next_c % self.num_cols)
+                for _, next_r, next_c in self._candidates[idx]]
+
+    def collapse_corridors(self):
+        """
+        Maps every junction (walkable cell that is not the middle of a
+        corridor) to its (junction, distance, first step) neighbours.
+        """
+        walkable = set(self.walkable_cells())
+
+        def walkable_neighbors(pos):
+            return [n for n in self.neighbors(pos) if n in walkable]
+
+        junctions = {pos for pos in walkable if len(walkable_neighbors(pos)) != 2}
+        graph = {}
+        for junction in junctions:
+            edges = []
+            for first in walkable_neighbors(junction):
+                prev, curr, distance = junction, first, 1
+                while curr not in junctions:
+                    nxt = [n for n in walkable_neighbors(curr) if n != prev]
+                    if not nxt:
+                        break
+                    prev, curr = curr, nxt[0]
+                    distance += 1
+                    if curr == junction:
+                        break
+                if curr in junctions:
+                    edges.append((curr, distance, first))
+            graph[junction] = edges
+        return graph
@@ -0,0 +1,163 @@
+"""
+Frame profiler.
+Spans are timed with perf_counter_ns and kept in a fixed size ring buffer
+(preallocated arrays, nothing is allocated per span), so the last
+`capacity` spans are always available for percentiles or export.
+The last `window` durations of each stage are also kept apart, so the
+overlay's live percentiles never scan the whole buffer.
+Disabled, `span` hands out a shared no-op context and costs one check.
+
+    profiler = Profiler()
+    with profiler.span("draw_screens"):
+        ...
+"""
+from array import array
+from collections import deque
+from contextlib import nullcontext
+import csv
+import json
+from time import perf_counter_ns
+
+_NULL_SPAN = nullcontext()
+
+
+class _Span:
+    __slots__ = ("_profiler", "_name", "_start")
+
+    def __init__(self, profiler, name):
+        self._profiler = profiler
+        self._name = name
+
+    def __enter__(self):
+        self._start = perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self._profiler.record(self._name, self._start, perf_counter_ns())
+        return False
+
+
+class Profiler:
+    """Process wide span recorder, a singleton like SpriteCache."""
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super(Profiler, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self, capacity: int = 65536, window: int = 240):
+        if not hasattr(self, "_initialized"):
+            self._initialized = True
+            self.enabled = False
+            self.configure(capacity, window)
+
+    def configure(self, capacity: int, window: int | None = None):
+        """Sets the ring buffer and per stage window sizes, dropping
+        everything recorded."""
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        if window is not None:
+            if window <= 0:
+                raise ValueError("window must be positive")
+            self.window = window
+        self.capacity = capacity
+        self._stage_ids = {}
+        self.stages = []
+        # latest durations per stage id
+        self._recent = []
+        self._stage = array("H", [0]) * capacity
+        self._frame = array("L", [0]) * capacity
+        self._start = array("q", [0]) * capacity
+        self._duration = array("q", [0]) * capacity
+        self._head = 0
+        self.count = 0
+        self.frame = 0
+        self._origin = perf_counter_ns()
+
+    def clear(self):
+        self.configure(self.capacity)
+
+    def next_frame(self):
+        self.frame += 1
+
+    def span(self, name: str):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def record(self, name: str, start_ns: int, end_ns: int):
+        stage = self._stage_ids.get(name)
+        if stage is None:
+            stage = self._stage_ids[name] = len(self.stages)
+            self.stages.append(name)
+            self._recent.append(deque(maxlen=self.window))
+        self._recent[stage].append(end_ns - start_ns)
+        head = self._head
+        self._stage[head] = stage
+        self._frame[head] = self.frame
+        self._start[head] = start_ns - self._origin
+        self._duration[head] = end_ns - start_ns
+        self._head = (head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def spans(self):
+        """(frame, stage, start ns, duration ns) from the oldest to the newest."""
+        first = (self._head - self.count) % self.capacity
+        for offset in range(self.count):
+            idx = (first + offset) % self.capacity
+            yield (self._frame[idx], self.stages[self._stage[idx]],
+                   self._start[idx], self._duration[idx])
+
+    @staticmethod
+    def _quantiles(values, quantiles):
+        values = sorted(values)
+        return [values[min(len(values) - 1, int(q * len(values)))] for q in quantiles]
+
+    def percentiles(self, quantiles=(0.5, 0.95, 0.99)):
+        """{stage: [duration ns at each quantile]} over the buffered spans,
+        scans the whole buffer."""
+        durations = {}
+        for _, stage, _, duration in self.spans():
+            durations.setdefault(stage, []).append(duration)
+        return {stage: self._quantiles(values, quantiles)
+                for stage, values in durations.items()}
+
+    def recent_percentiles(self, quantiles=(0.5, 0.95, 0.99)):
+        """The same over the last `window` spans of each stage, cheap enough
+        to call while profiling."""
+        return {stage: self._quantiles(recent, quantiles)
+                for stage, recent in zip(self.stages, self._recent) if recent}
+
+    def export_csv(self, path: str):
+        with open(path, "w", newline="") as fp:
+            writer = csv.writer(fp)
+            writer.writerow(["frame", "stage", "start_us", "duration_us"])
+            for frame, stage, start, duration in self.spans():
+                writer.writerow([frame, stage, start / 1000, duration / 1000])
+
+    def export_chrome_trace(self, path: str):
+        """Trace Event Format, opens in chrome://tracing or Perfetto."""
+        events = [{"name": stage, "ph": "X", "ts": start / 1000,
+                   "dur": duration / 1000, "pid": 0, "tid": 0,
+                   "args": {"frame": frame}}
+                  for frame, stage, start, duration in self.spans()]
+        with open(path, "w") as fp:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, fp)
+
+    def export(self, path: str):
+        """CSV for .csv paths, Chrome trace json otherwise."""
+        if path.endswith(".csv"):
+            self.export_csv(path)
+        else:
+            self.export_chrome_trace(path)
+
+
+class NullProfiler:
+    """Records nothing, for simulations that must stay out of the process
+    profile, e.g. the autopilot's search copies."""
+    enabled = False
+
+    def span(self, name: str):
+        return _NULL_SPAN
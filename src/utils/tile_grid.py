@@ -0,0 +1,69 @@
+"""
+Integer coded level grid.
+The level json stores one string per cell, the game converts it once at
+load into a TileGrid: a single bytearray of Tile values, one byte per cell.
+TileGrid is a list of row memoryviews into that buffer, so grid[r][c]
+(negative indexes included) reads and writes the shared buffer like the old
+list of lists did, at list indexing speed.
+"""
+from enum import IntEnum
+
+
+class Tile(IntEnum):
+    NULL = 0
+    VOID = 1
+    WALL = 2
+    DOT = 3
+    POWER = 4
+    ELEC = 5
+    SPOINT = 6
+
+
+TILE_NAMES = {
+    "null": Tile.NULL,
+    "void": Tile.VOID,
+    "wall": Tile.WALL,
+    "dot": Tile.DOT,
+    "power": Tile.POWER,
+    "elec": Tile.ELEC,
+    "spoint": Tile.SPOINT,
+}
+NAMES_BY_TILE = {tile: name for name, tile in TILE_NAMES.items()}
+COLLECTIBLES = frozenset((Tile.DOT, Tile.POWER))
+
+
+class TileGrid(list):
+    def __init__(self, num_rows: int, num_cols: int, data: bytearray | None = None):
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        if data is None:
+            data = bytearray(num_rows * num_cols)
+        if len(data) != num_rows * num_cols:
+            raise ValueError(f"expected {num_rows * num_cols} tiles, got {len(data)}")
+        self.data = data
+        view = memoryview(data)
+        super().__init__(view[r * num_cols:(r + 1) * num_cols] for r in range(num_rows))
+
+    @classmethod
+    def from_matrix(cls, matrix: list[list[str]]):
+        num_rows, num_cols = len(matrix), len(matrix[0])
+        data = bytearray(TILE_NAMES[cell] for row in matrix for cell in row)
+        return cls(num_rows, num_cols, data)
+
+    def to_matrix(self):
+        """The list of lists of names the level json stores."""
+        return [[NAMES_BY_TILE[tile] for tile in row] for row in self]
+
+    def copy(self):
+        return TileGrid(self.num_rows, self.num_cols, bytearray(self.data))
+
+    def count_tiles(self, tiles):
+        """Number of cells holding any of `tiles`."""
+        return sum(self.data.count(tile) for tile in set(tiles))
+
+    def __eq__(self, other):
+        if not isinstance(other, TileGrid):
+            return NotImplemented
+        return self.num_cols == other.num_cols and self.data == other.data
+
+    __hash__ = None